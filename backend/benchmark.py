@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the calibration pipeline.
+
+Usage:
+    python -m backend.benchmark pyramid --images DIR --columns COLS --rows ROWS
+    python -m backend.benchmark memory --images DIR --columns COLS --rows ROWS
+    python -m backend.benchmark decode --images DIR [--max-size PX]
+    python -m backend.benchmark reprojection [--views N] [--columns COLS] [--rows ROWS]
+    python -m backend.benchmark selection --images DIR --columns COLS --rows ROWS --max-views N
+    python -m backend.benchmark undistort --images DIR [--calibration FILE] [--max-size PX]
+    python -m backend.benchmark stereo --left DIR --right DIR --columns COLS --rows ROWS [--workers N]
+    python -m backend.benchmark depth [--left IMAGE --right IMAGE] [--num-disparities N] [--workers N]
+    python -m backend.benchmark coverage [--points N,N,...]
+    python -m backend.benchmark heatmap [--width W --height H] [--points N] [--grid-size N]
+
+Commands:
+    pyramid     Compare full-resolution and coarse-to-fine checkerboard detection
+    memory      Report peak RSS of a calibration plus preview rendering
+    decode      Compare full BGR decodes with the image_io loading paths
+    reprojection  Compare per-view projectPoints loops with batched reprojection
+    selection   Compare solving on all views with solving on a selected subset
+    undistort   Compare per-image cv2.undistort with cached remap tables
+    stereo      Compare sequential and concurrent left/right calibration passes
+    depth       Compare single-pass and strip-parallel StereoSGBM matching
+    coverage    Compare the per-point coverage loop with vectorized region masks
+    heatmap     Compare per-point full-image Gaussians with the histogram heatmap
+"""
+
+import argparse
+import base64
+import glob
+import json
+import os
+import resource
+import time
+import cv2
+import numpy as np
+
+from .config import PYRAMID_MIN_SIZE
+from .utils.calibration import calibrate_camera, calibrate_camera_pair, holdout_errors, scale_camera_matrix, split_workers
+from .utils import detection_cache
+from .utils.coverage import analyze_coverage, create_coverage_heatmap
+from .utils.depth import compute_disparity
+from .utils.detection import detect_images, resolve_workers
+from .utils.detection import find_chessboard_corners, render_detection
+from .utils.image_io import read_color, read_gray, read_image_size, scale_to_max_size
+from .utils.patterns import get_object_points
+from .utils.reprojection import reprojection_residuals
+from .utils import undistort
+
+def list_images(images_dir):
+    images = sorted(glob.glob(os.path.join(images_dir, '*')))
+    if not images:
+        raise SystemExit(f"No images found in {images_dir}")
+    return images
+
+def benchmark_pyramid(args):
+    """
+    Detect every image at full resolution and coarse-to-fine, then report
+    throughput and how far the coarse-to-fine corners land from the
+    full-resolution ones.
+    """
+    checkerboard_size = (args.columns, args.rows)
+    grays = []
+    for fname in list_images(args.images):
+        img = read_gray(fname)
+        if img is not None:
+            grays.append((fname, img))
+
+    megapixels = sum(gray.size for _, gray in grays) / 1e6
+    print(f"Benchmarking {len(grays)} images ({megapixels:.1f} MP total)\n")
+
+    results = {}
+    for mode, min_size in (("full", 0), ("pyramid", args.min_size)):
+        corners_by_image = {}
+        start = time.perf_counter()
+        for fname, gray in grays:
+            found, corners = find_chessboard_corners(gray, checkerboard_size, pyramid_min_size=min_size)
+            corners_by_image[fname] = corners.reshape(-1, 2) if found else None
+        elapsed = time.perf_counter() - start
+        results[mode] = corners_by_image
+
+        found = sum(1 for corners in corners_by_image.values() if corners is not None)
+        print(f"{mode:>8}: {elapsed:.2f}s, {len(grays) / elapsed:.2f} images/s, "
+              f"{megapixels / elapsed:.1f} MP/s, found {found}/{len(grays)}")
+
+    deviations = [
+        np.linalg.norm(results["pyramid"][fname] - results["full"][fname], axis=1)
+        for fname, _ in grays
+        if results["full"][fname] is not None and results["pyramid"][fname] is not None
+    ]
+    if deviations:
+        deviations = np.concatenate(deviations)
+        print(f"\nCorner deviation from full resolution over {len(deviations)} corners: "
+              f"mean {deviations.mean():.4f}px, max {deviations.max():.4f}px")
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its finished children, in MB"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / 1024, children / 1024
+
+def benchmark_memory(args):
+    """
+    Calibrate a directory and encode every detection preview, the way the
+    preview and calibrate endpoints do, then report peak memory use.
+    """
+    checkerboard_size = (args.columns, args.rows)
+    start = time.perf_counter()
+    result = calibrate_camera(
+        args.images, checkerboard_size, args.square_size, args.pattern_type,
+        args.marker_size, args.aruco_dict_name, workers=args.workers
+    )
+    image_detection_map = result[9]
+
+    encoded_bytes = 0
+    for detection in image_detection_map.values():
+        preview = render_detection(detection, args.pattern_type, checkerboard_size, args.max_size)
+        _, buffer = cv2.imencode('.jpg', preview)
+        encoded_bytes += len(base64.b64encode(buffer))
+    elapsed = time.perf_counter() - start
+
+    own, children = peak_rss_mb()
+    print(f"Calibrated {len(image_detection_map)} images in {elapsed:.2f}s "
+          f"({encoded_bytes / 1e6:.1f} MB of encoded previews)")
+    print(f"Peak RSS: {own:.0f} MB (main process), {children:.0f} MB (largest detection worker)")
+
+def time_per_image(images, load):
+    start = time.perf_counter()
+    for fname in images:
+        load(fname)
+    return (time.perf_counter() - start) / len(images)
+
+def benchmark_decode(args):
+    """
+    Time each way the pipeline loads an image, before and after image_io
+    """
+    images = list_images(args.images)
+
+    def full_size(fname):
+        return cv2.imread(fname).shape[:2]
+
+    def full_preview(fname):
+        return scale_to_max_size(cv2.imread(fname), args.max_size)
+
+    stages = [
+        ("detection", lambda f: cv2.cvtColor(cv2.imread(f), cv2.COLOR_BGR2GRAY), read_gray),
+        ("image size", full_size, read_image_size),
+        (f"preview ({args.max_size}px)", full_preview, lambda f: read_color(f, args.max_size))
+    ]
+
+    saved_per_image = 0.0
+    print(f"Per-image decode time over {len(images)} images:\n")
+    for name, before, after in stages:
+        before_time = time_per_image(images, before)
+        after_time = time_per_image(images, after)
+        saved_per_image += before_time - after_time
+        print(f"{name:>20}: {before_time * 1000:8.2f}ms -> {after_time * 1000:8.2f}ms "
+              f"({before_time / after_time:.1f}x)")
+
+    print(f"\nSaved per session: {saved_per_image * len(images):.2f}s "
+          f"(one detection, size read and preview per image)")
+
+def synthetic_views(num_views, checkerboard_size, camera_model, seed=0):
+    """
+    Random board poses in front of a 1920x1080 camera, with noisy projected
+    corners. Returns (objpoints, imgpoints, rvecs, tvecs, mtx, dist).
+    """
+    rng = np.random.default_rng(seed)
+    objp = np.array(get_object_points(checkerboard_size[0], checkerboard_size[1], 0.03))
+    objp -= objp.mean(axis=0)
+    mtx = np.array([[1400.0, 0.0, 960.0], [0.0, 1400.0, 540.0], [0.0, 0.0, 1.0]])
+    if camera_model == "Fisheye":
+        dist = np.array([[0.05], [-0.01], [0.002], [0.0]])
+    else:
+        dist = np.array([[-0.2, 0.08, 0.001, -0.001, -0.01]])
+
+    objpoints, imgpoints, rvecs, tvecs = [], [], [], []
+    for _ in range(num_views):
+        rvec = rng.normal(0, 0.3, (3, 1))
+        tvec = np.array([[rng.normal(0, 0.05)], [rng.normal(0, 0.05)], [rng.uniform(0.5, 1.2)]])
+        if camera_model == "Fisheye":
+            projected, _ = cv2.fisheye.projectPoints(objp.reshape(-1, 1, 3), rvec, tvec, mtx, dist)
+        else:
+            projected, _ = cv2.projectPoints(objp, rvec, tvec, mtx, dist)
+        noise = rng.normal(0, 0.2, projected.shape)
+        objpoints.append(objp.reshape(-1, 1, 3) if camera_model == "Fisheye" else objp)
+        imgpoints.append((projected + noise).astype(np.float32))
+        rvecs.append(rvec)
+        tvecs.append(tvec)
+    return objpoints, imgpoints, rvecs, tvecs, mtx, dist
+
+def benchmark_reprojection(args):
+    """
+    Per-view reprojection errors with one projectPoints + cv2.norm call per
+    view (the previous implementation) against one batched NumPy pass
+    """
+    checkerboard_size = (args.columns, args.rows)
+    corners = args.columns * args.rows
+    print(f"{args.views} views x {corners} corners\n")
+
+    for camera_model in ("Standard", "Fisheye"):
+        objpoints, imgpoints, rvecs, tvecs, mtx, dist = synthetic_views(args.views, checkerboard_size, camera_model)
+        project = cv2.fisheye.projectPoints if camera_model == "Fisheye" else cv2.projectPoints
+
+        start = time.perf_counter()
+        loop_errors = []
+        for i in range(len(objpoints)):
+            imgpoints2, _ = project(objpoints[i], rvecs[i], tvecs[i], mtx, dist)
+            observed = np.asarray(imgpoints[i], dtype=np.float32).reshape(-1, 1, 2)
+            imgpoints2 = np.asarray(imgpoints2, dtype=np.float32)
+            loop_errors.append(cv2.norm(observed, imgpoints2, cv2.NORM_L2) / len(imgpoints2))
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        view_rms, residuals, offsets = reprojection_residuals(objpoints, imgpoints, rvecs, tvecs, mtx, dist, camera_model)
+        batch_errors = view_rms / np.sqrt(np.diff(offsets))
+        batch_time = time.perf_counter() - start
+
+        difference = np.abs(np.asarray(loop_errors) - batch_errors).max()
+        print(f"{camera_model:>9}: loop {loop_time * 1000:8.1f}ms, batched {batch_time * 1000:8.1f}ms "
+              f"({loop_time / batch_time:.1f}x), max error difference {difference:.2e}px")
+
+def benchmark_selection(args):
+    """
+    Solve on every detected view and on `max_views` selected views, then
+    report solve time and the reprojection error over all views (held-out
+    views posed with solvePnP against the subset's intrinsics)
+    """
+    checkerboard_size = (args.columns, args.rows)
+    detections = detect_images(args.images, checkerboard_size, args.square_size, "Checkerboard")
+    objpoints = [d["obj_points"] for d in detections if d["found"]]
+    imgpoints = [d["img_points"] for d in detections if d["found"]]
+    print(f"{len(objpoints)} views detected\n")
+
+    for label, max_views in (("all views", None), (f"{args.max_views} selected", args.max_views)):
+        details = {}
+        start = time.perf_counter()
+        mtx, dist, mean_error, *_ = calibrate_camera(
+            args.images, checkerboard_size, args.square_size, "Checkerboard",
+            detections=detections, max_views=max_views, details=details
+        )
+        elapsed = time.perf_counter() - start
+        all_errors = holdout_errors(objpoints, imgpoints, mtx, dist, "Standard")
+        print(f"{label:>14}: {elapsed:.2f}s, fx {mtx[0, 0]:.2f} fy {mtx[1, 1]:.2f} "
+              f"cx {mtx[0, 2]:.2f} cy {mtx[1, 2]:.2f}, error over all views {all_errors.mean():.4f}px")
+        if "view_selection" in details:
+            print(f"{'':>14}  held-out validation error {details['view_selection']['validation_mean_error']:.4f}px "
+                  f"(max {details['view_selection']['validation_max_error']:.4f}px)")
+
+def benchmark_undistort(args):
+    """
+    Undistort every image with getOptimalNewCameraMatrix + cv2.undistort (the
+    old preview path) and with the cached remap tables, and report the
+    per-image cost and the largest pixel difference
+    """
+    images = [read_color(fname, args.max_size) for fname in list_images(args.images)]
+    images = [img for img in images if img is not None]
+    h, w = images[0].shape[:2]
+
+    if args.calibration:
+        with open(args.calibration) as f:
+            calibration = json.load(f)
+        mtx = np.array(calibration["camera_matrix"])
+        dist = np.array(calibration["distortion"])
+        full_width = args.full_width or w
+        mtx = scale_camera_matrix(mtx, w / full_width)
+    else:
+        # A plausible wide-angle lens for the image size
+        mtx = np.array([[0.8 * w, 0, w / 2], [0, 0.8 * w, h / 2], [0, 0, 1]])
+        dist = np.array([[-0.3, 0.1, 0.001, -0.001, -0.02]])
+
+    def undistort_before(img):
+        height, width = img.shape[:2]
+        newcameramtx, roi = cv2.getOptimalNewCameraMatrix(mtx, dist, (width, height), args.alpha, (width, height))
+        undistorted = cv2.undistort(img, mtx, dist, None, newcameramtx)
+        x, y, w_roi, h_roi = roi
+        return undistorted[y:y+h_roi, x:x+w_roi] if w_roi > 0 and h_roi > 0 else undistorted
+
+    def undistort_after(img):
+        return undistort.undistort_image(img, mtx, dist, alpha=args.alpha)
+
+    undistort.clear()
+    start = time.perf_counter()
+    undistort.undistortion_maps(mtx, dist, (w, h), args.alpha)
+    build_time = time.perf_counter() - start
+
+    before = time_per_image(images, undistort_before)
+    after = time_per_image(images, undistort_after)
+    difference = max(
+        int(np.abs(undistort_before(img).astype(np.int16) - undistort_after(img)).max()) for img in images
+    )
+    map1, map2, _, _ = undistort.undistortion_maps(mtx, dist, (w, h), args.alpha)
+
+    print(f"{len(images)} images at {w}x{h}, alpha {args.alpha}\n")
+    print(f"  cv2.undistort: {before * 1000:8.2f}ms per image")
+    print(f"  cached remap:  {after * 1000:8.2f}ms per image ({before / after:.1f}x), "
+          f"map built once in {build_time * 1000:.2f}ms, {(map1.nbytes + map2.nbytes) / 1e6:.1f}MB")
+    print(f"  max pixel difference: {difference}")
+
+def benchmark_stereo(args):
+    """
+    Time the two per-camera detection-and-calibration passes of a stereo
+    calibration run one after the other (each with the full worker budget)
+    and concurrently (splitting the budget), starting from a cold detection
+    cache each time (this clears the configured detection cache)
+    """
+    checkerboard_size = (args.columns, args.rows)
+    budget = resolve_workers(args.workers)
+    arguments = (checkerboard_size, args.square_size, "Checkerboard", None, None)
+
+    detection_cache.clear()
+    start = time.perf_counter()
+    sequential = [calibrate_camera(path, *arguments, workers=budget) for path in (args.left, args.right)]
+    sequential_time = time.perf_counter() - start
+
+    detection_cache.clear()
+    start = time.perf_counter()
+    concurrent = calibrate_camera_pair(args.left, args.right, *arguments, workers=budget)
+    concurrent_time = time.perf_counter() - start
+
+    budgets = split_workers(budget)
+    split = f"{budgets[0]} + {budgets[1]} workers" if budgets else "too small to split, run in turn"
+    print(f"\nCPU budget {budget} ({split})\n")
+    print(f"  sequential: {sequential_time:.2f}s")
+    print(f"  concurrent: {concurrent_time:.2f}s ({sequential_time / concurrent_time:.2f}x)")
+    for side, before, after in zip(("left", "right"), sequential, concurrent):
+        if before[0] is not None and after[0] is not None:
+            print(f"  {side} camera matrix difference: {np.abs(before[0] - after[0]).max():.2e}")
+
+def benchmark_depth(args):
+    """
+    Time StereoSGBM disparity matching of a rectified pair as one pass and
+    split into parallel strips, in megapixels per second. Without images,
+    a random texture shifted by a known disparity is matched.
+    """
+    if args.left and args.right:
+        left, right = read_color(args.left), read_color(args.right)
+        if left is None or right is None:
+            raise SystemExit("Could not read the image pair")
+    else:
+        rng = np.random.default_rng(0)
+        left = cv2.GaussianBlur(rng.integers(0, 256, (960, 1280), dtype=np.uint8), (3, 3), 0)
+        right = np.roll(left, -args.shift, axis=1)
+
+    workers = resolve_workers(args.workers)
+    h, w = left.shape[:2]
+
+    def throughput(worker_count):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            disparity = compute_disparity(left, right, args.num_disparities, args.block_size, worker_count)
+            best = min(best, time.perf_counter() - start)
+        return disparity, best
+
+    single, single_time = throughput(1)
+    tiled, tiled_time = throughput(workers)
+    both_valid = (single > 0) & (tiled > 0)
+    differing = np.abs(single - tiled)[both_valid] > 1
+
+    print(f"{w}x{h} pair, {args.num_disparities} disparities, block size {args.block_size}\n")
+    print(f"  single pass:        {single_time:.3f}s ({w * h / 1e6 / single_time:.2f} MP/s)")
+    print(f"  {workers} strip thread(s): {tiled_time:.3f}s ({w * h / 1e6 / tiled_time:.2f} MP/s, {single_time / tiled_time:.2f}x)")
+    print(f"  valid pixels: {(single > 0).mean():.1%} single, {(tiled > 0).mean():.1%} strips; "
+          f"{differing.mean() if differing.size else 0:.2%} differ by more than 1px")
+    if not (args.left and args.right):
+        print(f"  median disparity {np.median(tiled[tiled > 0]):.2f}px (true {args.shift}px)")
+
+def analyze_coverage_loop(imgpoints, image_shape):
+    """The quality advisor's original per-point coverage classification, for comparison"""
+    h, w = image_shape
+    center_region = (w*0.25, h*0.25, w*0.75, h*0.75)
+    corner_regions = [(0, 0, w*0.3, h*0.3), (w*0.7, 0, w, h*0.3), (0, h*0.7, w*0.3, h), (w*0.7, h*0.7, w, h)]
+    edge_regions = [(w*0.3, 0, w*0.7, h*0.2), (w*0.3, h*0.8, w*0.7, h), (0, h*0.3, w*0.2, h*0.7), (w*0.8, h*0.3, w, h*0.7)]
+
+    center_coverage = 0
+    corner_coverage = 0
+    edge_coverage = 0
+    all_points = np.vstack([pts.reshape(-1, 2) for pts in imgpoints])
+    for point in all_points:
+        x, y = point
+        if center_region[0] <= x <= center_region[2] and center_region[1] <= y <= center_region[3]:
+            center_coverage += 1
+        for corner in corner_regions:
+            if corner[0] <= x <= corner[2] and corner[1] <= y <= corner[3]:
+                corner_coverage += 1
+                break
+        for edge in edge_regions:
+            if edge[0] <= x <= edge[2] and edge[1] <= y <= edge[3]:
+                edge_coverage += 1
+                break
+
+    total_points = len(all_points)
+    return {
+        "center_coverage": center_coverage / total_points if total_points > 0 else 0,
+        "corner_coverage": corner_coverage / total_points if total_points > 0 else 0,
+        "edge_coverage": edge_coverage / total_points if total_points > 0 else 0,
+        "coverage_score": (center_coverage + corner_coverage + edge_coverage) / (3 * total_points) if total_points > 0 else 0
+    }
+
+def synthetic_corners(num_points, image_shape, seed=0):
+    """
+    float32 corner views (408 points each, a 24x17 board) spread over and
+    slightly beyond the image, a tenth of them snapped onto region bounds
+    """
+    h, w = image_shape
+    rng = np.random.default_rng(seed)
+    points = np.column_stack([rng.uniform(-0.05 * w, 1.05 * w, num_points), rng.uniform(-0.05 * h, 1.05 * h, num_points)])
+    bounds_x = np.array([0, w*0.2, w*0.25, w*0.3, w*0.7, w*0.75, w*0.8, w])
+    bounds_y = np.array([0, h*0.2, h*0.25, h*0.3, h*0.7, h*0.75, h*0.8, h])
+    snap = rng.random(num_points) < 0.1
+    points[snap, 0] = rng.choice(bounds_x, snap.sum())
+    points[snap, 1] = rng.choice(bounds_y, snap.sum())
+    points = points.astype(np.float32)
+    return [points[i:i + 408].reshape(-1, 1, 2) for i in range(0, num_points, 408)]
+
+def benchmark_coverage(args):
+    """
+    Time the per-point coverage loop against the vectorized classifier on
+    synthetic corners and check that both give identical results
+    """
+    image_shape = (args.height, args.width)
+    print(f"{args.width}x{args.height} image\n")
+    for num_points in (int(n) for n in args.points.split(",")):
+        imgpoints = synthetic_corners(num_points, image_shape)
+
+        start = time.perf_counter()
+        before = analyze_coverage_loop(imgpoints, image_shape)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        after = analyze_coverage(imgpoints, image_shape)
+        vectorized_time = time.perf_counter() - start
+
+        status = "identical" if before == after else f"MISMATCH {before} != {after}"
+        print(f"  {num_points:>8} points: loop {loop_time * 1000:9.1f}ms, vectorized {vectorized_time * 1000:7.2f}ms "
+              f"({loop_time / vectorized_time:.0f}x), {status}")
+
+def create_coverage_heatmap_per_point(imgpoints, image_shape, grid_size=20):
+    """The quality advisor's original full-resolution heatmap, for comparison"""
+    h, w = image_shape
+    heatmap = np.zeros((h, w), dtype=np.float32)
+    all_points = np.vstack([pts.reshape(-1, 2) for pts in imgpoints])
+    sigma = min(h, w) * 0.05
+    for point in all_points:
+        x, y = int(point[0]), int(point[1])
+        if 0 <= x < w and 0 <= y < h:
+            y_grid, x_grid = np.ogrid[-y:h-y, -x:w-x]
+            heatmap += np.exp(-(x_grid*x_grid + y_grid*y_grid) / (2 * sigma * sigma))
+    if heatmap.max() > 0:
+        heatmap = heatmap / heatmap.max()
+
+    h_step = h // grid_size
+    w_step = w // grid_size
+    return [
+        [float(heatmap[i*h_step:(i+1)*h_step, j*w_step:(j+1)*w_step].mean()) for j in range(grid_size)]
+        for i in range(grid_size)
+    ]
+
+def benchmark_heatmap(args):
+    """
+    Time the per-point full-image heatmap against the histogram heatmap on
+    synthetic corners and report how far apart their grids are. The
+    per-point version is O(points x pixels); skip it with --no-reference
+    to time the histogram alone on large images.
+    """
+    image_shape = (args.height, args.width)
+    imgpoints = synthetic_corners(args.points, image_shape)
+
+    start = time.perf_counter()
+    after = np.array(create_coverage_heatmap(imgpoints, image_shape, args.grid_size))
+    histogram_time = time.perf_counter() - start
+
+    print(f"{args.width}x{args.height} image, {args.points} points, {args.grid_size}x{args.grid_size} grid\n")
+    print(f"  histogram: {histogram_time * 1000:10.1f}ms")
+    if args.no_reference:
+        return
+
+    start = time.perf_counter()
+    before = np.array(create_coverage_heatmap_per_point(imgpoints, image_shape, args.grid_size))
+    per_point_time = time.perf_counter() - start
+    print(f"  per point: {per_point_time * 1000:10.1f}ms ({per_point_time / histogram_time:.0f}x)")
+    print(f"  max cell difference {np.abs(before - after).max():.4f}, mean {np.abs(before - after).mean():.4f}")
+
+def add_pattern_arguments(parser):
+    parser.add_argument("--images", required=True, help="Directory of calibration images")
+    parser.add_argument("--columns", type=int, required=True, help="Inner corners per row")
+    parser.add_argument("--rows", type=int, required=True, help="Inner corners per column")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the calibration pipeline")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    pyramid = subparsers.add_parser("pyramid", help="Full-resolution vs coarse-to-fine checkerboard detection")
+    add_pattern_arguments(pyramid)
+    pyramid.add_argument(
+        "--min-size",
+        type=int,
+        default=PYRAMID_MIN_SIZE or 1,
+        help=f"Pyramid threshold in pixels (default: {PYRAMID_MIN_SIZE})"
+    )
+    pyramid.set_defaults(func=benchmark_pyramid)
+
+    memory = subparsers.add_parser("memory", help="Peak RSS of calibration and preview rendering")
+    add_pattern_arguments(memory)
+    memory.add_argument("--square-size", type=float, default=0.03, help="Square size (default: 0.03)")
+    memory.add_argument("--pattern-type", default="Checkerboard", choices=["Checkerboard", "ChArUcoboard"])
+    memory.add_argument("--marker-size", type=float, default=None, help="ChArUco marker size")
+    memory.add_argument("--aruco-dict-name", default=None, help="ChArUco dictionary, e.g. DICT_6X6_250")
+    memory.add_argument("--max-size", type=int, default=None, help="Longer side of rendered previews")
+    memory.add_argument("--workers", type=int, default=None, help="Detection worker processes")
+    memory.set_defaults(func=benchmark_memory)
+
+    decode = subparsers.add_parser("decode", help="Image decode cost before and after image_io")
+    decode.add_argument("--images", required=True, help="Directory of calibration images")
+    decode.add_argument("--max-size", type=int, default=1024, help="Preview size in pixels (default: 1024)")
+    decode.set_defaults(func=benchmark_decode)
+
+    reprojection = subparsers.add_parser("reprojection", help="Per-view vs batched reprojection errors")
+    reprojection.add_argument("--views", type=int, default=2000, help="Number of synthetic views (default: 2000)")
+    reprojection.add_argument("--columns", type=int, default=20, help="Inner corners per row (default: 20)")
+    reprojection.add_argument("--rows", type=int, default=20, help="Inner corners per column (default: 20)")
+    reprojection.set_defaults(func=benchmark_reprojection)
+
+    selection = subparsers.add_parser("selection", help="Solve on all views vs a selected subset")
+    add_pattern_arguments(selection)
+    selection.add_argument("--square-size", type=float, default=0.03, help="Square size (default: 0.03)")
+    selection.add_argument("--max-views", type=int, default=20, help="Views to select (default: 20)")
+    selection.set_defaults(func=benchmark_selection)
+
+    undistort_parser = subparsers.add_parser("undistort", help="cv2.undistort vs cached remap tables")
+    undistort_parser.add_argument("--images", required=True, help="Directory of images (all the same size)")
+    undistort_parser.add_argument("--calibration", default=None, help="calibration_data.json to use (default: a synthetic lens)")
+    undistort_parser.add_argument("--full-width", type=int, default=None, help="Image width the calibration was made at")
+    undistort_parser.add_argument("--max-size", type=int, default=None, help="Longer side of the images to undistort")
+    undistort_parser.add_argument("--alpha", type=float, default=1.0, help="Free scaling parameter (default: 1)")
+    undistort_parser.set_defaults(func=benchmark_undistort)
+
+    stereo = subparsers.add_parser("stereo", help="Sequential vs concurrent stereo calibration passes")
+    stereo.add_argument("--left", required=True, help="Directory of left camera images")
+    stereo.add_argument("--right", required=True, help="Directory of right camera images")
+    stereo.add_argument("--columns", type=int, required=True, help="Inner corners per row")
+    stereo.add_argument("--rows", type=int, required=True, help="Inner corners per column")
+    stereo.add_argument("--square-size", type=float, default=0.03, help="Square size (default: 0.03)")
+    stereo.add_argument("--workers", type=int, default=None, help="CPU budget (default: one per core)")
+    stereo.set_defaults(func=benchmark_stereo)
+
+    depth = subparsers.add_parser("depth", help="Single-pass vs strip-parallel disparity matching")
+    depth.add_argument("--left", default=None, help="Rectified left image (default: synthetic texture)")
+    depth.add_argument("--right", default=None, help="Rectified right image")
+    depth.add_argument("--shift", type=int, default=24, help="Disparity of the synthetic pair (default: 24)")
+    depth.add_argument("--num-disparities", type=int, default=64, help="Disparity search range (default: 64)")
+    depth.add_argument("--block-size", type=int, default=5, help="Matching block size (default: 5)")
+    depth.add_argument("--workers", type=int, default=None, help="Matching threads (default: one per core)")
+    depth.add_argument("--repeat", type=int, default=3, help="Runs per variant, best is reported (default: 3)")
+    depth.set_defaults(func=benchmark_depth)
+
+    coverage = subparsers.add_parser("coverage", help="Per-point loop vs vectorized coverage analysis")
+    coverage.add_argument("--points", default="10000,100000,1000000", help="Comma-separated point counts")
+    coverage.add_argument("--width", type=int, default=1279, help="Image width (default: 1279)")
+    coverage.add_argument("--height", type=int, default=957, help="Image height (default: 957)")
+    coverage.set_defaults(func=benchmark_coverage)
+
+    heatmap = subparsers.add_parser("heatmap", help="Per-point vs histogram coverage heatmap")
+    heatmap.add_argument("--width", type=int, default=1280, help="Image width (default: 1280)")
+    heatmap.add_argument("--height", type=int, default=960, help="Image height (default: 960)")
+    heatmap.add_argument("--points", type=int, default=2000, help="Number of corners (default: 2000)")
+    heatmap.add_argument("--grid-size", type=int, default=20, help="Cells per side (default: 20)")
+    heatmap.add_argument("--no-reference", action="store_true", help="Skip the per-point version")
+    heatmap.set_defaults(func=benchmark_heatmap)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,13 @@ from dotenv import load_dotenv
 # Load environment variables from .env file (optional in Docker/Railway)
 load_dotenv()
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # Prefer a full DATABASE_URL if provided (e.g., from Railway Postgres)
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
     # Fallback to SQLite file for zero-config deployments
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     SQLITE_PATH = os.path.join(BASE_DIR, "calibration.db")
     DATABASE_URL = f"sqlite:///{SQLITE_PATH}"
 
@@ -21,6 +22,41 @@ APP_DESCRIPTION = "API for camera calibration"
 # Upload directory
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "backend", "uploads")
 
+# Pattern detection worker processes (0 = one per CPU core)
+DETECTION_WORKERS = int(os.getenv("DETECTION_WORKERS", "0"))
+
+# Coarse-to-fine checkerboard detection: images whose longer side is at least
+# PYRAMID_MIN_SIZE pixels are searched on a pyramid level no larger than
+# PYRAMID_TARGET_SIZE (0 disables)
+PYRAMID_MIN_SIZE = int(os.getenv("PYRAMID_MIN_SIZE", "3000"))
+PYRAMID_TARGET_SIZE = int(os.getenv("PYRAMID_TARGET_SIZE", "1280"))
+
+# Detection cache shared by preview, calibration and quality analysis
+DETECTION_CACHE_PATH = os.getenv("DETECTION_CACHE_PATH", os.path.join(BASE_DIR, "detection_cache.db"))
+DETECTION_CACHE_MAX_BYTES = int(os.getenv("DETECTION_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+# Rendered-preview cache: standard preview sizes (longer side in pixels;
+# requested sizes are rounded up to one of these) and the per-session limit
+PREVIEW_SIZES = [int(size) for size in os.getenv("PREVIEW_SIZES", "160,400,800,1600").split(",") if size.strip()]
+PREVIEW_CACHE_MAX_BYTES = int(os.getenv("PREVIEW_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+# In-memory cache of undistortion remap tables, per process
+UNDISTORT_MAP_CACHE_MAX_BYTES = int(os.getenv("UNDISTORT_MAP_CACHE_MB", "128")) * 1024 * 1024
+
+# Outlier view rejection never treats views with a per-view reprojection
+# error below this as outliers, however tight the other views are
+OUTLIER_MIN_CUTOFF = float(os.getenv("OUTLIER_MIN_CUTOFF", "0.1"))
+
+# Quality advisor coverage heatmap: cells per side of the returned grid
+COVERAGE_HEATMAP_GRID_SIZE = int(os.getenv("COVERAGE_HEATMAP_GRID_SIZE", "20"))
+
+# Background calibration jobs: how many run at once, how many may be queued
+# or running in total before new submissions are refused, and how long
+# finished jobs stay available for polling
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "16"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+
 # FastAPI app settings
 APP_NAME = "Camera Calibration API"
 APP_VERSION = "0.1.0"
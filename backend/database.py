@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime, Boolean
+from sqlalchemy import create_engine, inspect, text, Column, Integer, String, Float, ForeignKey, DateTime, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, relationship
 from datetime import datetime
@@ -30,6 +30,7 @@ class Session(Base):
     # Relationships
     images = relationship("CalibrationImage", back_populates="session", cascade="all, delete-orphan")
     calibration_result = relationship("CalibrationResult", back_populates="session", uselist=False, cascade="all, delete-orphan")
+    calibration_uncertainty = relationship("CalibrationUncertainty", back_populates="session", uselist=False, cascade="all, delete-orphan")
 
 class CalibrationImage(Base):
     __tablename__ = "calibration_images"
@@ -49,6 +50,7 @@ class CalibrationResult(Base):
     session_id = Column(String, ForeignKey("sessions.id", ondelete="CASCADE"), unique=True)
     camera_matrix = Column(String, nullable=False)  # JSON string
     distortion_coefficients = Column(String, nullable=False)  # JSON string
+    camera_model = Column(String, nullable=True)  # Standard or Fisheye; unknown for results stored before it was recorded
     reprojection_error = Column(Float, nullable=False)
     pattern_type = Column(String, nullable=False)
     columns = Column(Integer, nullable=False)
@@ -60,6 +62,26 @@ class CalibrationResult(Base):
     # Relationships
     session = relationship("Session", back_populates="calibration_result")
 
+class CalibrationUncertainty(Base):
+    __tablename__ = "calibration_uncertainties"
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String, ForeignKey("sessions.id", ondelete="CASCADE"), unique=True)
+
+    # Per-parameter variance of the intrinsics in the session's CalibrationResult
+    parameter_names = Column(String, nullable=False)  # JSON array (fx, fy, cx, cy, k1, ...)
+    intrinsics_variance = Column(String, nullable=True)  # JSON object, from stdDeviationsIntrinsics (Standard model only)
+    bootstrap_variance = Column(String, nullable=True)  # JSON object, from resampling views
+    bootstrap_intervals = Column(String, nullable=True)  # JSON object of [2.5%, 97.5%] percentiles
+    bootstrap_samples = Column(Integer, nullable=True)
+    bootstrap_seed = Column(Integer, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    session = relationship("Session", back_populates="calibration_uncertainty")
+
 class CalibrationParameters(Base):
     __tablename__ = "calibration_parameters"
 
@@ -118,9 +140,84 @@ class StereoCalibrationResult(Base):
     rows = Column(Integer, nullable=False)
     square_size = Column(Float, nullable=False)
 
+    # How left and right images were paired ("index" or "name"); unknown
+    # (index pairing) for results stored before it was recorded
+    pair_by = Column(String, nullable=True)
+    pair_pattern = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RigCalibrationResult(Base):
+    __tablename__ = "rig_calibration_results"
+
+    id = Column(Integer, primary_key=True)
+    rig_id = Column(String, unique=True, nullable=False)  # "rig_" + the camera session ids joined by "_"
+    session_ids = Column(String, nullable=False)  # JSON array, in camera order
+    reference_session_id = Column(String, nullable=False)  # Camera the extrinsics are relative to
+
+    # View graph and solve
+    spanning_tree = Column(String, nullable=False)  # JSON array of [parent, child] camera indices
+    frames = Column(String, nullable=False)  # JSON array of per-camera image names (null where missing)
+    initial_reprojection_error = Column(Float, nullable=False)  # After chaining, before joint refinement
+    reprojection_error = Column(Float, nullable=False)
+
+    # Pattern information
+    pattern_type = Column(String, nullable=False)
+    columns = Column(Integer, nullable=False)
+    rows = Column(Integer, nullable=False)
+    square_size = Column(Float, nullable=False)
+
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Relationships
+    cameras = relationship("RigCameraResult", back_populates="rig", cascade="all, delete-orphan", order_by="RigCameraResult.camera_index")
+    pairs = relationship("RigPairResult", back_populates="rig", cascade="all, delete-orphan")
+
+class RigCameraResult(Base):
+    __tablename__ = "rig_camera_results"
+
+    id = Column(Integer, primary_key=True)
+    rig_id = Column(String, ForeignKey("rig_calibration_results.rig_id", ondelete="CASCADE"))
+    session_id = Column(String, ForeignKey("sessions.id", ondelete="CASCADE"))
+    camera_index = Column(Integer, nullable=False)
+
+    # Intrinsics, from the camera's own calibration
+    camera_matrix = Column(String, nullable=False)  # JSON string
+    distortion_coefficients = Column(String, nullable=False)  # JSON string
+    image_size = Column(String, nullable=False)  # JSON [width, height]
+    reprojection_error = Column(Float, nullable=False)
+
+    # Extrinsics relative to the reference camera (x_camera = R x_reference + T)
+    rotation_matrix = Column(String, nullable=False)  # JSON string (R)
+    translation_vector = Column(String, nullable=False)  # JSON string (T)
+    rig_reprojection_error = Column(Float, nullable=False)
+
+    # Board observations per frame, so the rig can be re-solved without detecting
+    observations = Column(String, nullable=False)  # JSON object
+
+    # Relationships
+    rig = relationship("RigCalibrationResult", back_populates="cameras")
+
+class RigPairResult(Base):
+    __tablename__ = "rig_pair_results"
+
+    id = Column(Integer, primary_key=True)
+    rig_id = Column(String, ForeignKey("rig_calibration_results.rig_id", ondelete="CASCADE"))
+    first_camera_index = Column(Integer, nullable=False)
+    second_camera_index = Column(Integer, nullable=False)
+
+    # Second camera relative to the first (x_second = R x_first + T)
+    rotation_matrix = Column(String, nullable=False)  # JSON string (R)
+    translation_vector = Column(String, nullable=False)  # JSON string (T)
+    reprojection_error = Column(Float, nullable=False)
+    shared_frames = Column(Integer, nullable=False)
+    in_spanning_tree = Column(Boolean, default=False)
+
+    # Relationships
+    rig = relationship("RigCalibrationResult", back_populates="pairs")
+
 class LiveCaptureSession(Base):
     __tablename__ = "live_capture_sessions"
 
@@ -154,9 +251,26 @@ class CalibrationQualityMetrics(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+def add_missing_columns():
+    """
+    Add nullable columns introduced after a table was first created;
+    create_all only creates missing tables, not missing columns
+    """
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=engine.dialect)
+                with engine.begin() as connection:
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
 def create_tables():
     """Create all database tables"""
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
 
 # Create tables when this module is imported
 create_tables() 
@@ -8,8 +8,8 @@ import threading
 import time
 
 # Import routers
-from .routers import upload, calibration, stereo_calibration, live_calibration, quality_advisor
-from .utils.cleanup import cleanup_old_sessions, cleanup_orphaned_files
+from .routers import upload, calibration, stereo_calibration, rig_calibration, live_calibration, quality_advisor, jobs, undistort
+from .utils.cleanup import cleanup_old_sessions, cleanup_orphaned_files, cleanup_preview_caches
 
 def run_cleanup_task():
     """Background task to cleanup old sessions periodically"""
@@ -20,6 +20,7 @@ def run_cleanup_task():
             print("Running scheduled cleanup...")
             cleanup_old_sessions(hours_old=24)
             cleanup_orphaned_files()
+            cleanup_preview_caches()
         except Exception as e:
             print(f"Error in cleanup task: {e}")
 
@@ -34,6 +35,7 @@ async def lifespan(app: FastAPI):
     print("Running initial cleanup on startup...")
     cleanup_old_sessions(hours_old=24)
     cleanup_orphaned_files()
+    cleanup_preview_caches()
 
     yield
     # Shutdown: Nothing to cleanup
@@ -66,8 +68,11 @@ app.mount("/files", StaticFiles(directory=UPLOAD_DIR), name="files")
 app.include_router(upload.router, prefix="/api/v1/upload", tags=["upload"])
 app.include_router(calibration.router, prefix="/api/v1/calibration", tags=["calibration"])
 app.include_router(stereo_calibration.router, prefix="/api/v1/stereo", tags=["stereo-calibration"])
+app.include_router(rig_calibration.router, prefix="/api/v1/rig", tags=["rig-calibration"])
 app.include_router(live_calibration.router, prefix="/api/v1/live", tags=["live-calibration"])
 app.include_router(quality_advisor.router, prefix="/api/v1/quality", tags=["quality-advisor"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["jobs"])
+app.include_router(undistort.router, prefix="/api/v1/undistort", tags=["undistort"])
 
 @app.get("/api")
 async def api_root():
@@ -1,17 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
-import cv2
 import numpy as np
 import json
 import base64
 import glob
 import os
+import calendar
 from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
 
-from ..database import get_db, CalibrationResult, Session as DBSession
-from ..utils.calibration import calibrate_camera
+from ..database import get_db, CalibrationResult, CalibrationUncertainty, Session as DBSession
+from ..utils.calibration import MAX_BOOTSTRAP_SAMPLES, calibrate_camera, intrinsic_guess, parameter_changes
+from ..utils.detection import detect_images, render_detection
+from ..utils import preview_cache
+from ..utils.view_selection import MIN_SELECTED_VIEWS
+from ..utils.previews import PREVIEW_KINDS, encode_jpeg, image_url, render_detection_preview, render_original, render_undistorted
+from ..utils.jobs import JobCancelled, detection_progress, run_job
 
 router = APIRouter()
 
@@ -25,6 +32,15 @@ class CalibrationRequest(BaseModel):
     run_optimization: bool
     marker_size: Optional[float] = None
     aruco_dict_name: Optional[str] = None
+    preview_max_size: Optional[int] = None  # Longer side of preview images in pixels (None = full size)
+    incremental: bool = False  # Warm-start from this session's previous calibration
+    reject_outliers: bool = False  # Drop high-error views and re-solve
+    outlier_threshold: Optional[float] = None  # Per-view error cutoff (None = median + 3 * scaled MAD, at least OUTLIER_MIN_CUTOFF)
+    max_rejection_iterations: int = 5
+    uncertainty: bool = False  # Estimate per-parameter variance of the intrinsics
+    bootstrap_samples: int = Field(0, ge=0, le=MAX_BOOTSTRAP_SAMPLES)  # Bootstrap resamples over views (0 = analytic variance only)
+    bootstrap_seed: int = 0
+    max_views: Optional[int] = Field(None, ge=MIN_SELECTED_VIEWS)  # Solve on this many views picked for coverage/pose spread, validate on the rest
 
 class PreviewRequest(BaseModel):
     calibration_type: str
@@ -34,15 +50,25 @@ class PreviewRequest(BaseModel):
     square_size: float
     marker_size: Optional[float] = None
     aruco_dict_name: Optional[str] = None
+    preview_max_size: Optional[int] = None  # Longer side of preview images in pixels (None = full size)
 
 @router.post("/calibrate/{session_id}")
 async def run_calibration(
     session_id: str,
     params: CalibrationRequest,
-    db: Session = Depends(get_db)
+    job_id: Optional[str] = None
 ):
     """
-    Run camera calibration for a specific session using parameters from request body
+    Run camera calibration for a specific session using parameters from request body.
+    The work runs on the job queue (see /api/v1/jobs to submit without waiting);
+    pass a client-generated `job_id` to follow its progress events at
+    /api/v1/jobs/{job_id}/events while this request is pending.
+    """
+    return await run_job("calibration", calibrate_session, session_id, params, job_id=job_id)
+
+def calibrate_session(session_id: str, params: CalibrationRequest, db: Session, progress):
+    """
+    Calibrate a session and store the result; runs as a background job
     """
     # Get session from database
     session = db.query(DBSession).filter(DBSession.id == session_id).first()
@@ -53,7 +79,37 @@ async def run_calibration(
         raise HTTPException(status_code=400, detail="Session has no images directory")
 
     try:
+        # Detect patterns in parallel across all images
+        detections = detect_images(
+            images_path=session.images_dir,
+            checkerboard_size=(params.checkerboard_columns, params.checkerboard_rows),
+            square_size=params.square_size,
+            pattern_type=params.pattern_type,
+            marker_size=params.marker_size,
+            aruco_dict_name=params.aruco_dict_name,
+            progress=detection_progress(progress, 0, 50)
+        )
+        detection_times = {d["path"]: d["elapsed"] for d in detections}
+
+        # Reuse the previous intrinsics when recalibrating after new images were added
+        previous = db.query(CalibrationResult).filter(CalibrationResult.session_id == session_id).first()
+        initial_mtx = initial_dist = None
+        if params.incremental and previous is not None and (
+            previous.camera_model == params.camera_model
+            and previous.pattern_type == params.pattern_type
+            and previous.columns == params.checkerboard_columns
+            and previous.rows == params.checkerboard_rows
+            and previous.square_size == params.square_size
+        ):
+            initial_mtx, initial_dist = intrinsic_guess(
+                params.camera_model,
+                json.loads(previous.camera_matrix),
+                json.loads(previous.distortion_coefficients)
+            )
+
         # Run calibration using the utility function
+        progress("solving", 50, event="solver_started", num_views=sum(1 for d in detections if d["found"]))
+        calibration_details = {}
         mtx, dist, mean_error, rvecs, tvecs, imgpoints, objpoints, reprojection_errors, images_with_detections, image_detection_map = calibrate_camera(
             images_path=session.images_dir,
             checkerboard_size=(params.checkerboard_columns, params.checkerboard_rows),
@@ -62,81 +118,139 @@ async def run_calibration(
             marker_size=params.marker_size,
             aruco_dict_name=params.aruco_dict_name,
             camera_model=params.camera_model,
-            optimize=params.run_optimization
+            optimize=params.run_optimization,
+            detections=detections,
+            initial_mtx=initial_mtx,
+            initial_dist=initial_dist,
+            reject_outliers=params.reject_outliers,
+            outlier_threshold=params.outlier_threshold,
+            max_rejection_iterations=params.max_rejection_iterations,
+            details=calibration_details,
+            uncertainty=params.uncertainty,
+            bootstrap_samples=params.bootstrap_samples,
+            bootstrap_seed=params.bootstrap_seed,
+            max_views=params.max_views,
+            bootstrap_progress=lambda done, total: progress(
+                "bootstrapping", 50 + 10 * done / total, event="bootstrap",
+                samples_done=done, samples_total=total
+            )
         )
         
         if mtx is None:
             raise HTTPException(status_code=400, detail="Calibration failed - no valid calibration patterns found in images")
 
+        progress(
+            "solving", 60, event="reprojection_done",
+            reprojection_error=float(mean_error),
+            reprojection_errors=[float(e) for e in reprojection_errors],
+            num_images_calibrated=len(objpoints)
+        )
+
+        incremental = None
+        if initial_mtx is not None:
+            incremental = {
+                "warm_started": True,
+                "previous_reprojection_error": previous.reprojection_error,
+                "parameter_changes": parameter_changes(initial_mtx, initial_dist, mtx, dist),
+                "new_detections": sum(1 for d in detections if not d["cached"])
+            }
+
         # Save results to database
         calibration_result = CalibrationResult(
             session_id=session_id,
             camera_matrix=json.dumps(mtx.tolist()),
             distortion_coefficients=json.dumps(dist.tolist()),
+            camera_model=params.camera_model,
             reprojection_error=float(mean_error),
             pattern_type=params.pattern_type,
             columns=params.checkerboard_columns,
             rows=params.checkerboard_rows,
             square_size=params.square_size
         )
-        db.add(calibration_result)
+
+        # Check if result already exists and update or create
+        if previous:
+            for key, value in calibration_result.__dict__.items():
+                if key != '_sa_instance_state' and key != 'id':
+                    setattr(previous, key, value)
+            previous.updated_at = datetime.utcnow()
+        else:
+            db.add(calibration_result)
+
+        # Keep the stored uncertainty in step with the stored result
+        existing_uncertainty = db.query(CalibrationUncertainty).filter(CalibrationUncertainty.session_id == session_id).first()
+        uncertainty = calibration_details.get("uncertainty")
+        if uncertainty is not None:
+            calibration_uncertainty = CalibrationUncertainty(
+                session_id=session_id,
+                parameter_names=json.dumps(uncertainty["parameter_names"]),
+                intrinsics_variance=json.dumps(uncertainty["intrinsics_variance"]),
+                bootstrap_variance=json.dumps(uncertainty["bootstrap_variance"]),
+                bootstrap_intervals=json.dumps(uncertainty["bootstrap_intervals"]),
+                bootstrap_samples=uncertainty["bootstrap_samples"],
+                bootstrap_seed=uncertainty["bootstrap_seed"]
+            )
+            if existing_uncertainty:
+                for key, value in calibration_uncertainty.__dict__.items():
+                    if key != '_sa_instance_state' and key != 'id':
+                        setattr(existing_uncertainty, key, value)
+                existing_uncertainty.updated_at = datetime.utcnow()
+            else:
+                db.add(calibration_uncertainty)
+        elif existing_uncertainty:
+            db.delete(existing_uncertainty)
         db.commit()
 
-        # Get image paths for per-image results and generate undistorted previews
+        # Get image paths for per-image results; previews are linked, not embedded
         images = sorted(glob.glob(os.path.join(session.images_dir, '*')))
         per_image_results = []
         undistorted_previews = []
+        pattern_query = {
+            "pattern_type": params.pattern_type,
+            "columns": params.checkerboard_columns,
+            "rows": params.checkerboard_rows,
+            "square_size": params.square_size,
+            "marker_size": params.marker_size,
+            "aruco_dict_name": params.aruco_dict_name,
+            "max_size": params.preview_max_size
+        }
+
+        # Calibrated views (and any rejected as outliers or held out for validation), in image order
+        image_indices = {path: index for index, path in enumerate(images)}
+        view_selection = calibration_details.get("view_selection")
+        views = [(d["path"], error, True) for d, error in zip(images_with_detections, reprojection_errors)]
+        views += [(v["image_path"], v["error"], False) for v in calibration_details.get("rejected_views", [])]
+        if view_selection:
+            views += [(v["image_path"], v["error"], False) for v in view_selection["held_out_views"]]
+        views.sort(key=lambda view: image_indices.get(view[0], len(images)))
+
+        for rendered, (img_path, error, used_in_calibration) in enumerate(views):
+            i = image_indices.get(img_path)
+            image_name = os.path.basename(img_path)
+            if img_path not in image_detection_map:
+                continue
+
+            undistorted_previews.append({
+                "image_index": i,
+                "image_name": image_name,
+                "original_image_url": image_url(session_id, image_name, "original", max_size=params.preview_max_size),
+                "undistorted_image_url": image_url(session_id, image_name, "undistorted", max_size=params.preview_max_size)
+            })
 
-        for i, (img_path, error) in enumerate(zip(images, reprojection_errors)):
-            # Get image from detection map
-            detection_found = img_path in image_detection_map
-            if detection_found:
-                _, img_with_detections = image_detection_map[img_path]
-
-                # Convert detection image to base64
-                _, buffer = cv2.imencode('.jpg', img_with_detections)
-                img_base64 = base64.b64encode(buffer).decode('utf-8')
-
-                # Generate undistorted version for preview
-                original_img = cv2.imread(img_path)
-                if original_img is not None:
-                    h, w = original_img.shape[:2]
-
-                    # Get optimal camera matrix for undistortion
-                    newcameramtx, roi = cv2.getOptimalNewCameraMatrix(mtx, dist, (w, h), 1, (w, h))
-
-                    # Undistort image
-                    undistorted = cv2.undistort(original_img, mtx, dist, None, newcameramtx)
-
-                    # Crop to region of interest
-                    x, y, w_roi, h_roi = roi
-                    if h_roi > 0 and w_roi > 0:
-                        undistorted_cropped = undistorted[y:y+h_roi, x:x+w_roi]
-                    else:
-                        undistorted_cropped = undistorted
-
-                    # Convert undistorted to base64
-                    _, undist_buffer = cv2.imencode('.jpg', undistorted_cropped)
-                    undist_base64 = base64.b64encode(undist_buffer).decode('utf-8')
-
-                    # Also convert original for comparison
-                    _, orig_buffer = cv2.imencode('.jpg', original_img)
-                    orig_base64 = base64.b64encode(orig_buffer).decode('utf-8')
-
-                    undistorted_previews.append({
-                        "image_index": i,
-                        "image_name": os.path.basename(img_path),
-                        "original_image": orig_base64,
-                        "undistorted_image": undist_base64
-                    })
-
-                per_image_results.append({
-                    "image_index": i,
-                    "image_name": os.path.basename(img_path),
-                    "reprojection_error": float(error),
-                    "detection_image": img_base64,
-                    "used_in_calibration": True
-                })
+            per_image_results.append({
+                "image_index": i,
+                "image_name": image_name,
+                "reprojection_error": float(error),
+                "detection_image_url": image_url(session_id, image_name, "detection", **pattern_query),
+                "detection_time": detection_times.get(img_path),
+                "used_in_calibration": used_in_calibration
+            })
+            progress(
+                "listing previews", 60 + 40 * (rendered + 1) / len(views), event="preview",
+                image_index=i, image_name=image_name,
+                reprojection_error=float(error), used_in_calibration=used_in_calibration,
+                detection_image_url=per_image_results[-1]["detection_image_url"]
+            )
 
         return {
             "status": "success",
@@ -150,15 +264,129 @@ async def run_calibration(
                 "per_image_results": per_image_results,
                 "reprojection_errors": [float(e) for e in reprojection_errors],
                 "undistorted_previews": undistorted_previews,
+                "incremental": incremental,
+                "uncertainty": uncertainty,
+                "view_selection": view_selection,
+                "outlier_rejection": {
+                    "rejected_views": [
+                        dict(view, image_name=os.path.basename(view["image_path"]))
+                        for view in calibration_details["rejected_views"]
+                    ],
+                    "error_history": calibration_details["error_history"]
+                } if params.reject_outliers else None,
+                "detection_timings": [
+                    {"image_name": os.path.basename(d["path"]), "found": d["found"], "seconds": d["elapsed"]}
+                    for d in detections
+                ],
                 "checkerboard_rows": params.checkerboard_rows,
                 "checkerboard_cols": params.checkerboard_columns,
                 "square_size": params.square_size
             }
         }
         
+    except JobCancelled:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/images/{session_id}/{image_name}/{kind}")
+def get_calibration_image(
+    session_id: str,
+    image_name: str,
+    kind: str,
+    request: Request,
+    max_size: Optional[int] = None,
+    pattern_type: str = "Checkerboard",
+    columns: Optional[int] = None,
+    rows: Optional[int] = None,
+    square_size: Optional[float] = None,
+    marker_size: Optional[float] = None,
+    aruco_dict_name: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Render one session image as a JPEG: the original, its detection overlay
+    (pattern given by the query parameters) or undistorted with the session's
+    calibration, at the standard preview size covering `max_size`. Renders
+    are kept in the session's preview cache and served from disk afterwards.
+    Responses carry ETag/Last-Modified and conditional requests get 304 Not
+    Modified.
+    """
+    if kind not in PREVIEW_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown preview kind: {kind}")
+
+    session = db.query(DBSession).filter(DBSession.id == session_id).first()
+    if not session or not session.images_dir:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    img_path = os.path.join(session.images_dir, os.path.basename(image_name))
+    if image_name != os.path.basename(image_name) or not os.path.isfile(img_path):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    if kind == "detection" and (columns is None or rows is None or square_size is None):
+        raise HTTPException(status_code=400, detail="Detection previews need columns, rows and square_size")
+
+    # Everything the rendered bytes depend on goes into the cache key
+    modified = os.stat(img_path).st_mtime
+    render_params = None
+    result = None
+    if kind == "detection":
+        render_params = [pattern_type, columns, rows, square_size, marker_size, aruco_dict_name]
+    elif kind == "undistorted":
+        result = db.query(CalibrationResult).filter(CalibrationResult.session_id == session_id).first()
+        if not result:
+            raise HTTPException(status_code=404, detail="Calibration results not found")
+        render_params = [result.camera_matrix, result.distortion_coefficients]
+        modified = max(modified, calendar.timegm(result.updated_at.utctimetuple()))
+
+    def render(size):
+        if kind == "original":
+            return render_original(img_path, size)
+        if kind == "detection":
+            return render_detection_preview(
+                img_path, (columns, rows), square_size, pattern_type, marker_size, aruco_dict_name, size
+            )
+        return render_undistorted(
+            img_path,
+            np.array(json.loads(result.camera_matrix)),
+            np.array(json.loads(result.distortion_coefficients)),
+            size
+        )
+
+    size = preview_cache.standard_size(max_size)
+    key = preview_cache.make_key(preview_cache.file_digest(img_path), kind, size, render_params)
+    headers = {
+        "ETag": f'"{key}"',
+        "Last-Modified": formatdate(modified, usegmt=True),
+        "Cache-Control": "no-cache"
+    }
+    if not_modified(request, headers["ETag"], modified):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        path, _ = preview_cache.cached_preview(
+            session.images_dir, img_path, kind, max_size, render_params, render, encode_jpeg
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image could not be read")
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+def not_modified(request, etag, modified):
+    """Whether a conditional request's cached copy is still current"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(modified) <= calendar.timegm(parsedate_to_datetime(if_modified_since).utctimetuple())
+        except (TypeError, ValueError):
+            return False
+    return False
+
 @router.get("/results/{session_id}")
 async def get_calibration_results(
     session_id: str,
@@ -170,11 +398,21 @@ async def get_calibration_results(
     result = db.query(CalibrationResult).filter(CalibrationResult.session_id == session_id).first()
     if not result:
         raise HTTPException(status_code=404, detail="Calibration results not found")
+
+    uncertainty = db.query(CalibrationUncertainty).filter(CalibrationUncertainty.session_id == session_id).first()
         
     return {
         "camera_matrix": json.loads(result.camera_matrix),
         "distortion_coefficients": json.loads(result.distortion_coefficients),
         "reprojection_error": result.reprojection_error,
+        "uncertainty": {
+            "parameter_names": json.loads(uncertainty.parameter_names),
+            "intrinsics_variance": json.loads(uncertainty.intrinsics_variance),
+            "bootstrap_variance": json.loads(uncertainty.bootstrap_variance),
+            "bootstrap_intervals": json.loads(uncertainty.bootstrap_intervals),
+            "bootstrap_samples": uncertainty.bootstrap_samples,
+            "bootstrap_seed": uncertainty.bootstrap_seed
+        } if uncertainty else None,
         "created_at": result.created_at,
         "updated_at": result.updated_at
     }
@@ -209,13 +447,28 @@ async def preview_pattern_detection(
             optimize=False  # No optimization needed for preview
         )
 
-        # Convert images to base64 for response
+        # Convert images to base64 for response; overlays are rendered once
+        # per image and pattern and afterwards read back from the preview cache
         preview_results = []
+        checkerboard_size = (params.checkerboard_columns, params.checkerboard_rows)
+        render_params = [
+            params.pattern_type, params.checkerboard_columns, params.checkerboard_rows,
+            params.square_size, params.marker_size, params.aruco_dict_name
+        ]
+
+        for img_path, detection in image_detection_map.items():
+            preview_path, _ = preview_cache.cached_preview(
+                session.images_dir, img_path, "detection", params.preview_max_size, render_params,
+                lambda size: render_detection(detection, params.pattern_type, checkerboard_size, size),
+                encode_jpeg
+            )
+            if preview_path is None:
+                continue
+            corners_found = detection["found"]
 
-        for img_path, (corners_found, preview_img) in image_detection_map.items():
             # Convert to base64
-            _, buffer = cv2.imencode('.jpg', preview_img)
-            img_base64 = base64.b64encode(buffer).decode('utf-8')
+            with open(preview_path, 'rb') as f:
+                img_base64 = base64.b64encode(f.read()).decode('utf-8')
 
             preview_results.append({
                 "image_path": img_path,
@@ -0,0 +1,132 @@
+from fastapi import APIRouter, HTTPException, Header, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+import json
+import time
+
+from ..utils.jobs import JobQueueFull, cancel_job, get_events, get_job, list_jobs, submit_job
+from .calibration import CalibrationRequest, calibrate_session
+from .quality_advisor import QualityAnalysisRequest, analyze_session_quality
+from .stereo_calibration import StereoCalibrationRequest, stereo_calibrate_sessions
+from .rig_calibration import RigCalibrationRequest, rig_calibrate_sessions
+
+router = APIRouter()
+
+EVENT_POLL_INTERVAL = 0.1  # Seconds between checks for new job events
+SUBSCRIBE_TIMEOUT = 30  # Seconds to wait for a client-chosen job ID to be submitted
+
+def _submit(kind, func, *args):
+    try:
+        return submit_job(kind, func, *args)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+@router.post("/calibration/{session_id}", status_code=202)
+async def submit_calibration(session_id: str, params: CalibrationRequest):
+    """
+    Queue a camera calibration; poll /jobs/{job_id} for progress and the result
+    """
+    return _submit("calibration", calibrate_session, session_id, params)
+
+@router.post("/stereo", status_code=202)
+async def submit_stereo_calibration(params: StereoCalibrationRequest):
+    """
+    Queue a stereo calibration; poll /jobs/{job_id} for progress and the result
+    """
+    return _submit("stereo", stereo_calibrate_sessions, params)
+
+@router.post("/rig", status_code=202)
+async def submit_rig_calibration(params: RigCalibrationRequest):
+    """
+    Queue a multi-camera rig calibration; poll /jobs/{job_id} for progress and the result
+    """
+    return _submit("rig", rig_calibrate_sessions, params)
+
+@router.post("/quality/{session_id}", status_code=202)
+async def submit_quality_analysis(session_id: str, params: QualityAnalysisRequest):
+    """
+    Queue a calibration quality analysis; poll /jobs/{job_id} for progress and the result
+    """
+    return _submit("quality", analyze_session_quality, session_id, params)
+
+@router.get("/")
+async def get_jobs():
+    """
+    List known jobs (without results), newest first
+    """
+    return {"jobs": list_jobs()}
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    Status, stage, percent complete and, once finished, the result or error of a job
+    """
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.delete("/{job_id}")
+async def cancel_job_request(job_id: str):
+    """
+    Cancel a queued or running job
+    """
+    job = cancel_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+async def follow_events(job_id, after=-1, is_disconnected=None):
+    """
+    Yield a job's events as they are published, until the job finishes.
+    Waits up to SUBSCRIBE_TIMEOUT for a job that has not been submitted yet
+    (a client-chosen job ID); yields an "error" event if it never appears.
+    """
+    deadline = time.monotonic() + SUBSCRIBE_TIMEOUT
+    while True:
+        if is_disconnected is not None and await is_disconnected():
+            return
+
+        found = get_events(job_id, after)
+        if found is None:
+            if time.monotonic() > deadline:
+                yield {"seq": after + 1, "event": "error", "error": "Job not found"}
+                return
+        else:
+            events, finished = found
+            for event in events:
+                yield event
+                after = event["seq"]
+            if finished and not events:
+                return
+
+        await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-sent events for a job: progress, per-image detection results,
+    solver and preview milestones, then succeeded/failed/cancelled.
+    Reconnecting clients resume after Last-Event-ID.
+    """
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else -1
+
+    async def stream():
+        async for event in follow_events(job_id, after, request.is_disconnected):
+            yield f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.websocket("/{job_id}/ws")
+async def websocket_job_events(websocket: WebSocket, job_id: str, after: int = -1):
+    """
+    The same events as /jobs/{job_id}/events, as JSON messages over a WebSocket
+    """
+    await websocket.accept()
+    try:
+        async for event in follow_events(job_id, after):
+            await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        print("Job event WebSocket client disconnected")
@@ -11,6 +11,9 @@ import uuid
 from datetime import datetime
 
 from ..database import get_db, LiveCaptureSession, Session as DBSession, CalibrationImage
+from ..utils.detection import find_chessboard_corners
+from ..utils.image_io import decode_color
+from ..utils.patterns import ARUCO_DICTS, get_aruco_detector, get_charuco_board
 
 router = APIRouter()
 
@@ -48,38 +51,12 @@ def detect_pattern_in_image(image, pattern_type, checkerboard_size, marker_size=
     num_corners = 0
     quality_score = 0.0
 
-    aruco_dicts = {
-        'DICT_4X4_50': cv2.aruco.DICT_4X4_50,
-        'DICT_4X4_100': cv2.aruco.DICT_4X4_100,
-        'DICT_4X4_250': cv2.aruco.DICT_4X4_250,
-        'DICT_4X4_1000': cv2.aruco.DICT_4X4_1000,
-        'DICT_5X5_50': cv2.aruco.DICT_5X5_50,
-        'DICT_5X5_100': cv2.aruco.DICT_5X5_100,
-        'DICT_5X5_250': cv2.aruco.DICT_5X5_250,
-        'DICT_5X5_1000': cv2.aruco.DICT_5X5_1000,
-        'DICT_6X6_50': cv2.aruco.DICT_6X6_50,
-        'DICT_6X6_100': cv2.aruco.DICT_6X6_100,
-        'DICT_6X6_250': cv2.aruco.DICT_6X6_250,
-        'DICT_6X6_1000': cv2.aruco.DICT_6X6_1000,
-        'DICT_7X7_50': cv2.aruco.DICT_7X7_50,
-        'DICT_7X7_100': cv2.aruco.DICT_7X7_100,
-        'DICT_7X7_250': cv2.aruco.DICT_7X7_250,
-        'DICT_7X7_1000': cv2.aruco.DICT_7X7_1000,
-        'DICT_ARUCO_ORIGINAL': cv2.aruco.DICT_ARUCO_ORIGINAL,
-        'DICT_APRILTAG_16h5': cv2.aruco.DICT_APRILTAG_16h5,
-        'DICT_APRILTAG_25h9': cv2.aruco.DICT_APRILTAG_25h9,
-        'DICT_APRILTAG_36h10': cv2.aruco.DICT_APRILTAG_36h10,
-        'DICT_APRILTAG_36h11': cv2.aruco.DICT_APRILTAG_36h11
-    }
-
     annotated_image = image.copy()
 
     if pattern_type == 'Checkerboard':
-        found, corners = cv2.findChessboardCorners(gray, checkerboard_size)
+        # Find and refine corners (coarse-to-fine on high-resolution frames)
+        found, corners = find_chessboard_corners(gray, checkerboard_size)
         if found:
-            # Refine corners
-            term = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 30, 0.1)
-            cv2.cornerSubPix(gray, corners, (5, 5), (-1, -1), term)
             num_corners = len(corners)
 
             # Draw corners
@@ -115,11 +92,12 @@ def detect_pattern_in_image(image, pattern_type, checkerboard_size, marker_size=
             quality_score = (coverage * 0.5 + normalized_sharpness * 0.5)
 
     elif pattern_type == 'ChArUcoboard':
-        if aruco_dict_name in aruco_dicts:
-            aruco_dict = cv2.aruco.getPredefinedDictionary(aruco_dicts[aruco_dict_name])
-            board = cv2.aruco.CharucoBoard(checkerboard_size, marker_size or 0.02, marker_size or 0.015, aruco_dict)
+        if aruco_dict_name in ARUCO_DICTS:
+            board = get_charuco_board(
+                checkerboard_size[0], checkerboard_size[1], marker_size or 0.02, marker_size or 0.015, aruco_dict_name
+            )
 
-            marker_corners, marker_ids, _ = cv2.aruco.detectMarkers(gray, aruco_dict)
+            marker_corners, marker_ids, _ = get_aruco_detector(aruco_dict_name).detectMarkers(gray)
 
             if marker_ids is not None and len(marker_corners) > 0:
                 cv2.aruco.drawDetectedMarkers(annotated_image, marker_corners, marker_ids)
@@ -154,9 +132,7 @@ async def detect_pattern_live(request: LiveDetectionRequest):
     """
     try:
         # Decode base64 image
-        image_data = base64.b64decode(request.image_data)
-        nparr = np.frombuffer(image_data, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image = decode_color(base64.b64decode(request.image_data))
 
         if image is None:
             raise HTTPException(status_code=400, detail="Invalid image data")
@@ -295,9 +271,7 @@ async def websocket_stream(websocket: WebSocket):
 
             if message.get("type") == "frame":
                 # Decode base64 image
-                image_data = base64.b64decode(message["image_data"])
-                nparr = np.frombuffer(image_data, np.uint8)
-                image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+                image = decode_color(base64.b64decode(message["image_data"]))
 
                 if image is not None:
                     # Detect pattern
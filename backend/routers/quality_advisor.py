@@ -1,8 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any
-import cv2
 import numpy as np
 import json
 import glob
@@ -11,6 +10,9 @@ from datetime import datetime
 
 from ..database import get_db, CalibrationQualityMetrics, Session as DBSession
 from ..utils.calibration import calibrate_camera
+from ..utils.coverage import MAX_HEATMAP_GRID_SIZE, analyze_coverage, create_coverage_heatmap
+from ..utils.image_io import read_image_size
+from ..utils.jobs import JobCancelled, run_job
 
 router = APIRouter()
 
@@ -22,67 +24,7 @@ class QualityAnalysisRequest(BaseModel):
     square_size: float
     marker_size: float | None = None
     aruco_dict_name: str | None = None
-
-def analyze_coverage(imgpoints, image_shape):
-    """
-    Analyze how well the calibration pattern covers different regions of the image
-    """
-    h, w = image_shape
-
-    # Define regions
-    center_region = (w*0.25, h*0.25, w*0.75, h*0.75)
-
-    # Corners
-    corner_regions = [
-        (0, 0, w*0.3, h*0.3),  # Top-left
-        (w*0.7, 0, w, h*0.3),  # Top-right
-        (0, h*0.7, w*0.3, h),  # Bottom-left
-        (w*0.7, h*0.7, w, h)   # Bottom-right
-    ]
-
-    # Edges
-    edge_regions = [
-        (w*0.3, 0, w*0.7, h*0.2),  # Top edge
-        (w*0.3, h*0.8, w*0.7, h),  # Bottom edge
-        (0, h*0.3, w*0.2, h*0.7),  # Left edge
-        (w*0.8, h*0.3, w, h*0.7)   # Right edge
-    ]
-
-    center_coverage = 0
-    corner_coverage = 0
-    edge_coverage = 0
-
-    # Flatten all image points
-    all_points = np.vstack([pts.reshape(-1, 2) for pts in imgpoints])
-
-    # Count points in each region
-    for point in all_points:
-        x, y = point
-
-        # Check center
-        if center_region[0] <= x <= center_region[2] and center_region[1] <= y <= center_region[3]:
-            center_coverage += 1
-
-        # Check corners
-        for corner in corner_regions:
-            if corner[0] <= x <= corner[2] and corner[1] <= y <= corner[3]:
-                corner_coverage += 1
-                break
-
-        # Check edges
-        for edge in edge_regions:
-            if edge[0] <= x <= edge[2] and edge[1] <= y <= edge[3]:
-                edge_coverage += 1
-                break
-
-    total_points = len(all_points)
-
-    return {
-        "center_coverage": center_coverage / total_points if total_points > 0 else 0,
-        "corner_coverage": corner_coverage / total_points if total_points > 0 else 0,
-        "edge_coverage": edge_coverage / total_points if total_points > 0 else 0,
-        "coverage_score": (center_coverage + corner_coverage + edge_coverage) / (3 * total_points) if total_points > 0 else 0
-    }
+    heatmap_grid_size: int | None = Field(None, ge=1, le=MAX_HEATMAP_GRID_SIZE)  # Cells per side of the coverage heatmap (default: COVERAGE_HEATMAP_GRID_SIZE)
 
 def analyze_pose_diversity(rvecs, tvecs):
     """
@@ -215,56 +157,20 @@ def generate_recommendations(coverage, pose_diversity, num_images):
 
     return recommendations
 
-def create_coverage_heatmap(imgpoints, image_shape):
-    """
-    Create a heatmap showing where calibration points are concentrated
-    """
-    h, w = image_shape
-    heatmap = np.zeros((h, w), dtype=np.float32)
-
-    # Flatten all image points
-    all_points = np.vstack([pts.reshape(-1, 2) for pts in imgpoints])
-
-    # Create heatmap using Gaussian blobs
-    sigma = min(h, w) * 0.05  # 5% of image dimension
-
-    for point in all_points:
-        x, y = int(point[0]), int(point[1])
-        if 0 <= x < w and 0 <= y < h:
-            # Create Gaussian blob
-            y_grid, x_grid = np.ogrid[-y:h-y, -x:w-x]
-            gaussian = np.exp(-(x_grid*x_grid + y_grid*y_grid) / (2 * sigma * sigma))
-            heatmap += gaussian
-
-    # Normalize heatmap
-    if heatmap.max() > 0:
-        heatmap = heatmap / heatmap.max()
-
-    # Convert to grid format for frontend (downsampled for performance)
-    grid_size = 20
-    h_step = h // grid_size
-    w_step = w // grid_size
-
-    heatmap_grid = []
-    for i in range(grid_size):
-        row = []
-        for j in range(grid_size):
-            y_start, y_end = i * h_step, (i + 1) * h_step
-            x_start, x_end = j * w_step, (j + 1) * w_step
-            cell_value = heatmap[y_start:y_end, x_start:x_end].mean()
-            row.append(float(cell_value))
-        heatmap_grid.append(row)
-
-    return heatmap_grid
-
 @router.post("/analyze/{session_id}")
 async def analyze_calibration_quality(
     session_id: str,
-    params: QualityAnalysisRequest,
-    db: Session = Depends(get_db)
+    params: QualityAnalysisRequest
 ):
     """
-    Analyze calibration quality for a session and provide recommendations
+    Analyze calibration quality for a session and provide recommendations.
+    The work runs on the job queue (see /api/v1/jobs to submit without waiting).
+    """
+    return await run_job("quality", analyze_session_quality, session_id, params)
+
+def analyze_session_quality(session_id: str, params: QualityAnalysisRequest, db: Session, progress):
+    """
+    Analyze a session's calibration quality and store the metrics; runs as a background job
     """
     # Get session from database
     session = db.query(DBSession).filter(DBSession.id == session_id).first()
@@ -276,6 +182,7 @@ async def analyze_calibration_quality(
 
     try:
         # Run calibration to get data for analysis
+        progress("calibrating", 0)
         mtx, dist, mean_error, rvecs, tvecs, imgpoints, objpoints, reprojection_errors, _, _ = calibrate_camera(
             images_path=session.images_dir,
             checkerboard_size=(params.checkerboard_columns, params.checkerboard_rows),
@@ -298,10 +205,11 @@ async def analyze_calibration_quality(
         if not images:
             raise HTTPException(status_code=400, detail="No images found")
 
-        sample_img = cv2.imread(images[0])
-        image_shape = sample_img.shape[:2]
+        width, height = read_image_size(images[0])
+        image_shape = (height, width)
 
         # Analyze coverage
+        progress("analyzing coverage", 80)
         coverage = analyze_coverage(imgpoints, image_shape)
 
         # Analyze pose diversity
@@ -311,7 +219,7 @@ async def analyze_calibration_quality(
         recommendations = generate_recommendations(coverage, pose_diversity, len(imgpoints))
 
         # Create coverage heatmap
-        heatmap_grid = create_coverage_heatmap(imgpoints, image_shape)
+        heatmap_grid = create_coverage_heatmap(imgpoints, image_shape, params.heatmap_grid_size)
 
         # Save metrics to database
         quality_metrics = CalibrationQualityMetrics(
@@ -353,6 +261,8 @@ async def analyze_calibration_quality(
             "recommendations": recommendations
         }
 
+    except JobCancelled:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
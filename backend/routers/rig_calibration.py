@@ -0,0 +1,253 @@
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from typing import Optional, List
+import json
+import numpy as np
+from datetime import datetime
+
+from ..database import get_db, RigCalibrationResult, RigCameraResult, RigPairResult, Session as DBSession
+from ..utils.jobs import JobCancelled, detection_progress, run_job
+from ..utils.rig import calibrate_rig, observations_from_json, observations_to_json, solve_rig
+
+router = APIRouter()
+
+class RigCalibrationRequest(BaseModel):
+    session_ids: List[str]  # One session per camera
+    pattern_type: str
+    checkerboard_columns: int
+    checkerboard_rows: int
+    square_size: float
+    run_optimization: bool = False
+    marker_size: Optional[float] = None
+    aruco_dict_name: Optional[str] = None
+    pair_by: str = "index"  # Group images into frames by sorted position ("index") or file name ("name")
+    pair_pattern: Optional[str] = None  # Regex extracting the frame key from names (default: last number)
+    reference_session_id: Optional[str] = None  # Camera the extrinsics are relative to (default: the first)
+    min_shared_frames: int = 3  # Frames two cameras must share to be linked in the view graph
+
+class RigResolveRequest(BaseModel):
+    reference_session_id: Optional[str] = None  # Default: the stored reference camera
+    min_shared_frames: int = 3
+
+def rig_id_for(session_ids):
+    return "rig_" + "_".join(session_ids)
+
+def reference_index(session_ids, reference_session_id):
+    if reference_session_id is None:
+        return 0
+    if reference_session_id not in session_ids:
+        raise HTTPException(status_code=400, detail="Reference session is not one of the rig's cameras")
+    return session_ids.index(reference_session_id)
+
+@router.post("/calibrate")
+async def run_rig_calibration(
+    params: RigCalibrationRequest,
+    job_id: Optional[str] = None
+):
+    """
+    Calibrate a rig of N cameras, one session per camera.
+    The work runs on the job queue (see /api/v1/jobs to submit without waiting);
+    pass a client-generated `job_id` to follow its progress events at
+    /api/v1/jobs/{job_id}/events while this request is pending.
+    """
+    return await run_job("rig", rig_calibrate_sessions, params, job_id=job_id)
+
+def rig_calibrate_sessions(params: RigCalibrationRequest, db: Session, progress):
+    """
+    Detect every camera's images once (all cameras in one pool), calibrate
+    each camera, link cameras that saw the board in the same frames, chain
+    the pairwise extrinsics along a spanning tree from the reference camera
+    and refine everything jointly. Per-camera observations and intrinsics
+    and the pairwise solves are stored so /resolve can re-solve the rig
+    without detecting again.
+    """
+    if len(params.session_ids) < 2:
+        raise HTTPException(status_code=400, detail="A rig needs at least two camera sessions")
+    if len(set(params.session_ids)) != len(params.session_ids):
+        raise HTTPException(status_code=400, detail="Each camera needs its own session")
+    if params.pair_by not in ("index", "name"):
+        raise HTTPException(status_code=400, detail="pair_by must be 'index' or 'name'")
+    reference = reference_index(params.session_ids, params.reference_session_id)
+
+    sessions = []
+    for session_id in params.session_ids:
+        session = db.query(DBSession).filter(DBSession.id == session_id).first()
+        if not session:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+        if not session.images_dir:
+            raise HTTPException(status_code=400, detail=f"Session {session_id} is missing its images directory")
+        sessions.append(session)
+
+    try:
+        progress("detecting patterns", 0)
+        stage_percent = {"calibrating cameras": 60, "solving rig": 75}
+        rig = calibrate_rig(
+            [session.images_dir for session in sessions],
+            (params.checkerboard_columns, params.checkerboard_rows),
+            params.square_size,
+            params.pattern_type,
+            params.marker_size,
+            params.aruco_dict_name,
+            optimize=params.run_optimization,
+            pair_by=params.pair_by,
+            pair_pattern=params.pair_pattern,
+            reference=reference,
+            min_shared_frames=params.min_shared_frames,
+            progress=detection_progress(progress, 0, 60),
+            on_stage=lambda stage: progress(stage, stage_percent[stage], event="stage_started")
+        )
+
+        progress("saving results", 95)
+        rig_id = rig_id_for(params.session_ids)
+        result = db.query(RigCalibrationResult).filter(RigCalibrationResult.rig_id == rig_id).first()
+        if result is None:
+            result = RigCalibrationResult(rig_id=rig_id)
+            db.add(result)
+        result.session_ids = json.dumps(params.session_ids)
+        result.frames = json.dumps(rig["frames"])
+        result.pattern_type = params.pattern_type
+        result.columns = params.checkerboard_columns
+        result.rows = params.checkerboard_rows
+        result.square_size = params.square_size
+        result.cameras = [
+            RigCameraResult(
+                session_id=session_id,
+                camera_index=camera,
+                camera_matrix=json.dumps(mtx.tolist()),
+                distortion_coefficients=json.dumps(dist.tolist()),
+                image_size=json.dumps(list(image_size)),
+                reprojection_error=rig["mono_errors"][camera],
+                observations=json.dumps(observations_to_json(rig["observations"][camera]))
+            )
+            for camera, (session_id, (mtx, dist, image_size)) in enumerate(zip(params.session_ids, rig["intrinsics"]))
+        ]
+        store_solution(result, rig)
+        db.commit()
+
+        return {"status": "success", "results": rig_response(result)}
+
+    except JobCancelled:
+        raise
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def store_solution(result, rig):
+    """Write a solve_rig solution (extrinsics, pairs, errors) into a stored rig"""
+    session_ids = json.loads(result.session_ids)
+    result.reference_session_id = session_ids[rig["reference"]]
+    result.spanning_tree = json.dumps([list(edge) for edge in rig["tree"]])
+    result.initial_reprojection_error = float(rig["initial_error"])
+    result.reprojection_error = float(rig["error"])
+    result.updated_at = datetime.utcnow()
+
+    for camera in result.cameras:
+        R, T = rig["poses"][camera.camera_index]
+        camera.rotation_matrix = json.dumps(R.tolist())
+        camera.translation_vector = json.dumps(T.tolist())
+        camera.rig_reprojection_error = float(rig["camera_errors"].get(camera.camera_index, 0.0))
+
+    result.pairs = [
+        RigPairResult(
+            first_camera_index=first,
+            second_camera_index=second,
+            rotation_matrix=json.dumps(pair["R"].tolist()),
+            translation_vector=json.dumps(pair["T"].tolist()),
+            reprojection_error=pair["error"],
+            shared_frames=pair["shared_frames"],
+            in_spanning_tree=pair["in_tree"]
+        )
+        for (first, second), pair in sorted(rig["pairs"].items())
+    ]
+
+def rig_response(result):
+    session_ids = json.loads(result.session_ids)
+    return {
+        "rig_id": result.rig_id,
+        "session_ids": session_ids,
+        "reference_session_id": result.reference_session_id,
+        "spanning_tree": json.loads(result.spanning_tree),
+        "num_frames": len(json.loads(result.frames)),
+        "initial_reprojection_error": result.initial_reprojection_error,
+        "reprojection_error": result.reprojection_error,
+        "cameras": [
+            {
+                "session_id": camera.session_id,
+                "camera_index": camera.camera_index,
+                "camera_matrix": json.loads(camera.camera_matrix),
+                "distortion_coefficients": json.loads(camera.distortion_coefficients),
+                "image_size": json.loads(camera.image_size),
+                "reprojection_error": camera.reprojection_error,
+                "rotation_matrix": json.loads(camera.rotation_matrix),
+                "translation_vector": json.loads(camera.translation_vector),
+                "position": (-np.array(json.loads(camera.rotation_matrix)).T @ np.array(json.loads(camera.translation_vector))).ravel().tolist(),
+                "rig_reprojection_error": camera.rig_reprojection_error,
+                "num_observations": len(json.loads(camera.observations))
+            }
+            for camera in result.cameras
+        ],
+        "pairs": [
+            {
+                "first_session_id": session_ids[pair.first_camera_index],
+                "second_session_id": session_ids[pair.second_camera_index],
+                "rotation_matrix": json.loads(pair.rotation_matrix),
+                "translation_vector": json.loads(pair.translation_vector),
+                "reprojection_error": pair.reprojection_error,
+                "shared_frames": pair.shared_frames,
+                "in_spanning_tree": pair.in_spanning_tree
+            }
+            for pair in sorted(result.pairs, key=lambda pair: (pair.first_camera_index, pair.second_camera_index))
+        ],
+        "created_at": result.created_at,
+        "updated_at": result.updated_at
+    }
+
+def get_rig_result(db, rig_id):
+    result = db.query(RigCalibrationResult).filter(RigCalibrationResult.rig_id == rig_id).first()
+    if not result:
+        raise HTTPException(status_code=404, detail="Rig calibration results not found")
+    return result
+
+@router.get("/results/{rig_id}")
+def get_rig_calibration_results(rig_id: str, db: Session = Depends(get_db)):
+    """
+    Get the stored calibration of a rig: per-camera intrinsics and
+    extrinsics relative to the reference camera, and the pairwise solves
+    """
+    return rig_response(get_rig_result(db, rig_id))
+
+@router.post("/resolve/{rig_id}")
+def resolve_rig(rig_id: str, params: RigResolveRequest, db: Session = Depends(get_db)):
+    """
+    Re-solve a stored rig's extrinsics from its stored observations and
+    intrinsics, e.g. relative to another reference camera or with a
+    different view graph threshold, without detecting anything again
+    """
+    result = get_rig_result(db, rig_id)
+    session_ids = json.loads(result.session_ids)
+    reference = reference_index(session_ids, params.reference_session_id or result.reference_session_id)
+
+    try:
+        cameras = sorted(result.cameras, key=lambda camera: camera.camera_index)
+        observations = [observations_from_json(json.loads(camera.observations)) for camera in cameras]
+        intrinsics = [
+            (
+                np.array(json.loads(camera.camera_matrix)),
+                np.array(json.loads(camera.distortion_coefficients)),
+                tuple(json.loads(camera.image_size))
+            )
+            for camera in cameras
+        ]
+        rig = solve_rig(observations, intrinsics, reference, params.min_shared_frames)
+        store_solution(result, rig)
+        db.commit()
+        return {"status": "success", "results": rig_response(result)}
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional, List
@@ -10,10 +11,18 @@ import glob
 import os
 import uuid
 import shutil
+import zipfile
+from io import BytesIO
 from datetime import datetime
 
 from ..database import get_db, StereoCalibrationResult, Session as DBSession
 from ..utils.calibration import calibrate_stereo_cameras
+from ..utils.detection import match_image_pairs
+from ..utils.image_io import decode_color, read_color, read_image_size
+from ..utils.depth import depth_from_pair
+from ..utils.previews import encode_jpeg
+from ..utils.rectification import draw_epipolar_lines, rectify_pair, stereo_parameters
+from ..utils.jobs import JobCancelled, pair_detection_progress, run_job
 
 router = APIRouter()
 
@@ -28,14 +37,25 @@ class StereoCalibrationRequest(BaseModel):
     camera_model: str = "Standard"
     marker_size: Optional[float] = None
     aruco_dict_name: Optional[str] = None
+    pair_by: str = "index"  # Pair left/right images by sorted position ("index") or file name ("name")
+    pair_pattern: Optional[str] = None  # Regex extracting the pairing key from names (default: last number)
 
 @router.post("/calibrate")
 async def run_stereo_calibration(
     params: StereoCalibrationRequest,
-    db: Session = Depends(get_db)
+    job_id: Optional[str] = None
 ):
     """
-    Run stereo camera calibration using images from two sessions
+    Run stereo camera calibration using images from two sessions.
+    The work runs on the job queue (see /api/v1/jobs to submit without waiting);
+    pass a client-generated `job_id` to follow its progress events at
+    /api/v1/jobs/{job_id}/events while this request is pending.
+    """
+    return await run_job("stereo", stereo_calibrate_sessions, params, job_id=job_id)
+
+def stereo_calibrate_sessions(params: StereoCalibrationRequest, db: Session, progress):
+    """
+    Stereo-calibrate a pair of sessions and store the result; runs as a background job
     """
     # Get both sessions from database
     left_session = db.query(DBSession).filter(DBSession.id == params.left_session_id).first()
@@ -47,8 +67,19 @@ async def run_stereo_calibration(
     if not left_session.images_dir or not right_session.images_dir:
         raise HTTPException(status_code=400, detail="Sessions missing images directory")
 
+    if params.pair_by not in ("index", "name"):
+        raise HTTPException(status_code=400, detail="pair_by must be 'index' or 'name'")
+
     try:
         # Run stereo calibration using the utility function
+        progress("calibrating cameras", 0)
+        # Image pairs are detected together; both cameras and then the
+        # stereo pair are solved once every pair has been detected
+        pair_progress = pair_detection_progress(
+            progress, 0, 70, on_complete=lambda: progress("solving", 70, event="solver_started")
+        )
+
+        stereo_details = {}
         result = calibrate_stereo_cameras(
             left_images_path=left_session.images_dir,
             right_images_path=right_session.images_dir,
@@ -58,7 +89,11 @@ async def run_stereo_calibration(
             marker_size=params.marker_size,
             aruco_dict_name=params.aruco_dict_name,
             camera_model=params.camera_model,
-            optimize=params.run_optimization
+            optimize=params.run_optimization,
+            progress=pair_progress,
+            pair_by=params.pair_by,
+            pair_pattern=params.pair_pattern,
+            details=stereo_details
         )
 
         # Unpack results
@@ -72,142 +107,124 @@ async def run_stereo_calibration(
                 detail="Stereo calibration failed - ensure both cameras see the calibration pattern"
             )
 
-        # Calculate rectification parameters (also calculated in calibrate_stereo_cameras but we recalculate for E and F)
-        left_images = glob.glob(os.path.join(left_session.images_dir, '*'))
-        if left_images:
-            sample_img = cv2.imread(left_images[0])
-            img_shape = sample_img.shape[:2][::-1]  # (width, height)
+        progress(
+            "rectifying", 75, event="reprojection_done",
+            reprojection_error=float(mean_error),
+            reprojection_errors=[float(e) for e in reprojection_errors]
+        )
 
-            R1, R2, P1, P2, Q, validPixROI1, validPixROI2 = cv2.stereoRectify(
-                left_mtx, left_dist, right_mtx, right_dist, img_shape, R, T
-            )
+        # E, F and the rectification come straight from the stereo solve
+        E = stereo_details["essential_matrix"]
+        F = stereo_details["fundamental_matrix"]
+        R1, R2 = stereo_details["rectification_matrix_left"], stereo_details["rectification_matrix_right"]
+        P1, P2 = stereo_details["projection_matrix_left"], stereo_details["projection_matrix_right"]
+        Q = stereo_details["disparity_to_depth_mapping"]
 
-            # Calculate essential and fundamental matrices
-            E, _ = cv2.findEssentialMat(
-                np.vstack([pts.reshape(-1, 2) for pts in left_imgpoints]),
-                np.vstack([pts.reshape(-1, 2) for pts in right_imgpoints]),
-                left_mtx,
-                method=cv2.RANSAC,
-                prob=0.999,
-                threshold=1.0
-            )
-            F, _ = cv2.findFundamentalMat(
-                np.vstack([pts.reshape(-1, 2) for pts in left_imgpoints]),
-                np.vstack([pts.reshape(-1, 2) for pts in right_imgpoints]),
-                method=cv2.FM_RANSAC
-            )
+        # Save results to database
+        stereo_result = StereoCalibrationResult(
+            session_id=f"stereo_{params.left_session_id}_{params.right_session_id}",
+            left_camera_matrix=json.dumps(left_mtx.tolist()),
+            left_distortion_coefficients=json.dumps(left_dist.tolist()),
+            right_camera_matrix=json.dumps(right_mtx.tolist()),
+            right_distortion_coefficients=json.dumps(right_dist.tolist()),
+            rotation_matrix=json.dumps(R.tolist()),
+            translation_vector=json.dumps(T.tolist()),
+            essential_matrix=json.dumps(E.tolist()),
+            fundamental_matrix=json.dumps(F.tolist()),
+            rectification_matrix_left=json.dumps(R1.tolist()),
+            rectification_matrix_right=json.dumps(R2.tolist()),
+            projection_matrix_left=json.dumps(P1.tolist()),
+            projection_matrix_right=json.dumps(P2.tolist()),
+            disparity_to_depth_mapping=json.dumps(Q.tolist()),
+            reprojection_error=float(mean_error),
+            pattern_type=params.pattern_type,
+            columns=params.checkerboard_columns,
+            rows=params.checkerboard_rows,
+            square_size=params.square_size,
+            pair_by=params.pair_by,
+            pair_pattern=params.pair_pattern
+        )
 
-            # Handle None returns
-            if E is None:
-                E = np.zeros((3, 3))
-            if F is None:
-                F = np.zeros((3, 3))
-
-            # Save results to database
-            stereo_result = StereoCalibrationResult(
-                session_id=f"stereo_{params.left_session_id}_{params.right_session_id}",
-                left_camera_matrix=json.dumps(left_mtx.tolist()),
-                left_distortion_coefficients=json.dumps(left_dist.tolist()),
-                right_camera_matrix=json.dumps(right_mtx.tolist()),
-                right_distortion_coefficients=json.dumps(right_dist.tolist()),
-                rotation_matrix=json.dumps(R.tolist()),
-                translation_vector=json.dumps(T.tolist()),
-                essential_matrix=json.dumps(E.tolist()),
-                fundamental_matrix=json.dumps(F.tolist()),
-                rectification_matrix_left=json.dumps(R1.tolist()),
-                rectification_matrix_right=json.dumps(R2.tolist()),
-                projection_matrix_left=json.dumps(P1.tolist()),
-                projection_matrix_right=json.dumps(P2.tolist()),
-                disparity_to_depth_mapping=json.dumps(Q.tolist()),
-                reprojection_error=float(mean_error),
-                pattern_type=params.pattern_type,
-                columns=params.checkerboard_columns,
-                rows=params.checkerboard_rows,
-                square_size=params.square_size
-            )
+        # Check if result already exists and update or create
+        existing = db.query(StereoCalibrationResult).filter(
+            StereoCalibrationResult.session_id == stereo_result.session_id
+        ).first()
 
-            # Check if result already exists and update or create
-            existing = db.query(StereoCalibrationResult).filter(
-                StereoCalibrationResult.session_id == stereo_result.session_id
-            ).first()
-
-            if existing:
-                # Update existing
-                for key, value in stereo_result.__dict__.items():
-                    if key != '_sa_instance_state' and key != 'id':
-                        setattr(existing, key, value)
-                existing.updated_at = datetime.utcnow()
-            else:
-                db.add(stereo_result)
-
-            db.commit()
-
-            # Generate rectified image previews
-            rectified_previews = []
-            left_images_list = sorted(glob.glob(os.path.join(left_session.images_dir, '*')))
-            right_images_list = sorted(glob.glob(os.path.join(right_session.images_dir, '*')))
-
-            # Generate preview for first image pair
-            if left_images_list and right_images_list:
-                left_img = cv2.imread(left_images_list[0])
-                right_img = cv2.imread(right_images_list[0])
-
-                if left_img is not None and right_img is not None:
-                    # Compute rectification maps
-                    h, w = left_img.shape[:2]
-                    map1_left, map2_left = cv2.initUndistortRectifyMap(
-                        left_mtx, left_dist, R1, P1, (w, h), cv2.CV_32FC1
-                    )
-                    map1_right, map2_right = cv2.initUndistortRectifyMap(
-                        right_mtx, right_dist, R2, P2, (w, h), cv2.CV_32FC1
-                    )
-
-                    # Rectify images
-                    rectified_left = cv2.remap(left_img, map1_left, map2_left, cv2.INTER_LINEAR)
-                    rectified_right = cv2.remap(right_img, map1_right, map2_right, cv2.INTER_LINEAR)
-
-                    # Draw horizontal lines for epipolar line visualization
-                    for i in range(0, h, 30):
-                        cv2.line(rectified_left, (0, i), (w, i), (0, 255, 0), 1)
-                        cv2.line(rectified_right, (0, i), (w, i), (0, 255, 0), 1)
-
-                    # Convert to base64
-                    _, buffer_left = cv2.imencode('.jpg', rectified_left)
-                    _, buffer_right = cv2.imencode('.jpg', rectified_right)
-                    left_base64 = base64.b64encode(buffer_left).decode('utf-8')
-                    right_base64 = base64.b64encode(buffer_right).decode('utf-8')
-
-                    rectified_previews.append({
-                        "left_rectified": left_base64,
-                        "right_rectified": right_base64,
-                        "image_index": 0
-                    })
-
-            return {
-                "status": "success",
-                "results": {
-                    "left_camera_matrix": left_mtx.tolist(),
-                    "left_dist_coeffs": left_dist.tolist(),
-                    "right_camera_matrix": right_mtx.tolist(),
-                    "right_dist_coeffs": right_dist.tolist(),
-                    "rotation_matrix": R.tolist(),
-                    "translation_vector": T.tolist(),
-                    "rectification_matrix_left": R1.tolist(),
-                    "rectification_matrix_right": R2.tolist(),
-                    "projection_matrix_left": P1.tolist(),
-                    "projection_matrix_right": P2.tolist(),
-                    "disparity_to_depth_mapping": Q.tolist(),
-                    "reprojection_error": float(mean_error),
-                    "rectified_previews": rectified_previews,
-                    "baseline": float(np.linalg.norm(T)),  # Distance between cameras
-                    "checkerboard_rows": params.checkerboard_rows,
-                    "checkerboard_cols": params.checkerboard_columns,
-                    "square_size": params.square_size
-                }
-            }
+        if existing:
+            # Update existing
+            for key, value in stereo_result.__dict__.items():
+                if key != '_sa_instance_state' and key != 'id':
+                    setattr(existing, key, value)
+            existing.updated_at = datetime.utcnow()
         else:
-            raise HTTPException(status_code=400, detail="No images found in left session")
+            db.add(stereo_result)
+
+        db.commit()
+
+        progress("encoding previews", 90)
+
+        # Generate rectified image previews from the first solved image
+        # pair, labelled with its index among all matched pairs as the
+        # rectified-pair and depth endpoints number them
+        rectified_previews = []
+        first_left, first_right = stereo_details["image_pairs"][0]
+        first_index = stereo_details["image_pair_indices"][0]
+        left_img = read_color(first_left)
+        right_img = read_color(first_right)
 
+        if left_img is not None and right_img is not None:
+            # Rectify with the cached fixed-point maps, which the
+            # rectified-pair endpoint then reuses for other pairs
+            rectification = {
+                "left_mtx": left_mtx, "left_dist": left_dist,
+                "right_mtx": right_mtx, "right_dist": right_dist,
+                "R1": R1, "R2": R2, "P1": P1, "P2": P2, "Q": Q
+            }
+            rectified_left, rectified_right = rectify_pair(left_img, right_img, rectification)
+
+            # Draw horizontal lines for epipolar line visualization
+            draw_epipolar_lines(rectified_left)
+            draw_epipolar_lines(rectified_right)
+
+            # Convert to base64
+            left_base64 = base64.b64encode(encode_jpeg(rectified_left)).decode('utf-8')
+            right_base64 = base64.b64encode(encode_jpeg(rectified_right)).decode('utf-8')
+
+            rectified_previews.append({
+                "left_rectified": left_base64,
+                "right_rectified": right_base64,
+                "image_index": first_index
+            })
+            progress("encoding previews", 95, event="preview", image_index=first_index)
+
+        return {
+            "status": "success",
+            "results": {
+                "left_camera_matrix": left_mtx.tolist(),
+                "left_dist_coeffs": left_dist.tolist(),
+                "right_camera_matrix": right_mtx.tolist(),
+                "right_dist_coeffs": right_dist.tolist(),
+                "rotation_matrix": R.tolist(),
+                "translation_vector": T.tolist(),
+                "essential_matrix": E.tolist(),
+                "fundamental_matrix": F.tolist(),
+                "rectification_matrix_left": R1.tolist(),
+                "rectification_matrix_right": R2.tolist(),
+                "projection_matrix_left": P1.tolist(),
+                "projection_matrix_right": P2.tolist(),
+                "disparity_to_depth_mapping": Q.tolist(),
+                "reprojection_error": float(mean_error),
+                "rectified_previews": rectified_previews,
+                "baseline": float(np.linalg.norm(T)),  # Distance between cameras
+                "num_pairs_calibrated": len(stereo_details["image_pairs"]),
+                "checkerboard_rows": params.checkerboard_rows,
+                "checkerboard_cols": params.checkerboard_columns,
+                "square_size": params.square_size
+            }
+        }
+
+    except JobCancelled:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -246,3 +263,252 @@ async def get_stereo_calibration_results(
         "created_at": result.created_at,
         "updated_at": result.updated_at
     }
+
+def rectified_pair_response(left_img, right_img, result, scale, epipolar_lines, line_spacing):
+    """Rectify a pair with a stored calibration and return it side by side as a JPEG"""
+    rectified_left, rectified_right = rectify_pair(left_img, right_img, stereo_parameters(result), scale)
+    pair = np.hstack([rectified_left, rectified_right])
+    if epipolar_lines:
+        draw_epipolar_lines(pair, line_spacing)
+    return Response(content=encode_jpeg(pair), media_type="image/jpeg", headers={"Cache-Control": "no-cache"})
+
+DEPTH_OUTPUTS = ("zip", "disparity", "points")
+
+def depth_response(left_img, right_img, result, scale, output, options):
+    """
+    Match a pair with a stored calibration and return the disparity preview
+    (PNG), the point cloud (binary PLY) or both with the stats in a zip.
+    Throughput is reported in the X-Megapixels-Per-Second header as well.
+    """
+    preview, ply, stats = depth_from_pair(left_img, right_img, stereo_parameters(result), scale, **options)
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Megapixels-Per-Second": f"{stats['megapixels_per_second']:.3f}",
+        "X-Match-Seconds": f"{stats['match_seconds']:.3f}",
+        "X-Point-Count": str(stats["num_points"])
+    }
+    _, png = cv2.imencode('.png', preview)
+    if output == "disparity":
+        return Response(content=png.tobytes(), media_type="image/png", headers=headers)
+    if output == "points":
+        headers["Content-Disposition"] = 'attachment; filename="points.ply"'
+        return Response(content=ply, media_type="application/octet-stream", headers=headers)
+
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        # The PNG is already compressed
+        archive.writestr("disparity.png", png.tobytes(), compress_type=zipfile.ZIP_STORED)
+        archive.writestr("points.ply", ply, compress_type=zipfile.ZIP_DEFLATED)
+        archive.writestr("stats.json", json.dumps(stats), compress_type=zipfile.ZIP_DEFLATED)
+    headers["Content-Disposition"] = 'attachment; filename="depth.zip"'
+    return Response(content=buffer.getvalue(), media_type="application/zip", headers=headers)
+
+def get_stereo_result(db, left_session_id, right_session_id):
+    result = db.query(StereoCalibrationResult).filter(
+        StereoCalibrationResult.session_id == f"stereo_{left_session_id}_{right_session_id}"
+    ).first()
+    if not result:
+        raise HTTPException(status_code=404, detail="Stereo calibration results not found")
+    return result
+
+def stereo_image_pair(db, left_session_id, right_session_id, result, image_index):
+    """
+    Left and right image files of pair `image_index`, paired the way the
+    stored calibration paired them (see match_image_pairs)
+    """
+    left_session = db.query(DBSession).filter(DBSession.id == left_session_id).first()
+    right_session = db.query(DBSession).filter(DBSession.id == right_session_id).first()
+    if not left_session or not right_session:
+        raise HTTPException(status_code=404, detail="One or both sessions not found")
+
+    pairs, _, _ = match_image_pairs(
+        glob.glob(os.path.join(left_session.images_dir, '*')),
+        glob.glob(os.path.join(right_session.images_dir, '*')),
+        result.pair_by or "index",
+        result.pair_pattern
+    )
+    if not 0 <= image_index < len(pairs):
+        raise HTTPException(status_code=404, detail="Image pair not found")
+    return pairs[image_index]
+
+@router.get("/rectified/{left_session_id}/{right_session_id}/{image_index}")
+def get_rectified_pair(
+    left_session_id: str,
+    right_session_id: str,
+    image_index: int,
+    max_size: Optional[int] = None,
+    epipolar_lines: bool = False,
+    line_spacing: int = 30,
+    db: Session = Depends(get_db)
+):
+    """
+    Rectify image pair `image_index` of a stereo-calibrated pair of sessions
+    (pairs are numbered as the calibration paired them) and return it side
+    by side as a JPEG, each image at most `max_size` pixels on the longer
+    side, optionally with epipolar lines drawn across
+    """
+    result = get_stereo_result(db, left_session_id, right_session_id)
+    left_path, right_path = stereo_image_pair(db, left_session_id, right_session_id, result, image_index)
+
+    try:
+        left_img = read_color(left_path, max_size)
+        right_img = read_color(right_path, max_size)
+        if left_img is None or right_img is None:
+            raise HTTPException(status_code=400, detail="Image pair could not be read")
+
+        # Session images are at the calibrated resolution
+        scale = left_img.shape[1] / read_image_size(left_path)[0]
+        return rectified_pair_response(left_img, right_img, result, scale, epipolar_lines, line_spacing)
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/rectify/{left_session_id}/{right_session_id}")
+async def rectify_uploaded_pair(
+    left_session_id: str,
+    right_session_id: str,
+    left_image: UploadFile = File(...),
+    right_image: UploadFile = File(...),
+    max_size: Optional[int] = None,
+    epipolar_lines: bool = False,
+    line_spacing: int = 30,
+    db: Session = Depends(get_db)
+):
+    """
+    Rectify an uploaded image pair (taken at the calibrated resolution) with
+    a stored stereo calibration and return it side by side as a JPEG
+    """
+    result = get_stereo_result(db, left_session_id, right_session_id)
+    left_data = await left_image.read()
+    right_data = await right_image.read()
+
+    def rectify():
+        left_img = decode_color(left_data)
+        right_img = decode_color(right_data)
+        if left_img is None or right_img is None:
+            raise HTTPException(status_code=400, detail="Image pair could not be decoded")
+
+        scale = 1.0
+        if max_size and max(left_img.shape[:2]) > max_size:
+            # Shrink first so the smaller maps do the work
+            scale = max_size / max(left_img.shape[:2])
+            left_img = cv2.resize(left_img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            right_img = cv2.resize(right_img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return rectified_pair_response(left_img, right_img, result, scale, epipolar_lines, line_spacing)
+
+    try:
+        return await run_in_threadpool(rectify)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/depth/{left_session_id}/{right_session_id}/{image_index}")
+def get_depth(
+    left_session_id: str,
+    right_session_id: str,
+    image_index: int,
+    output: str = "zip",
+    max_size: Optional[int] = 1280,
+    num_disparities: int = 64,
+    block_size: int = 5,
+    point_step: int = 2,
+    max_depth: Optional[float] = None,
+    preview_size: Optional[int] = 640,
+    workers: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Dense disparity and depth for image pair `image_index` of a
+    stereo-calibrated pair of sessions (numbered as the calibration paired
+    them). The pair is rectified with the
+    cached maps at most `max_size` pixels on the longer side and matched
+    with StereoSGBM in parallel strips (`num_disparities` is in pixels of
+    that size). Returns, by `output`: "disparity", a color-mapped PNG at
+    most `preview_size` pixels; "points", a binary PLY point cloud of every
+    `point_step`-th pixel reprojected with Q (in calibration units, points
+    beyond `max_depth` dropped); or "zip", both plus stats.json.
+    """
+    if output not in DEPTH_OUTPUTS:
+        raise HTTPException(status_code=400, detail=f"Output must be one of {', '.join(DEPTH_OUTPUTS)}")
+    result = get_stereo_result(db, left_session_id, right_session_id)
+    left_path, right_path = stereo_image_pair(db, left_session_id, right_session_id, result, image_index)
+
+    try:
+        left_img = read_color(left_path, max_size)
+        right_img = read_color(right_path, max_size)
+        if left_img is None or right_img is None:
+            raise HTTPException(status_code=400, detail="Image pair could not be read")
+
+        scale = left_img.shape[1] / read_image_size(left_path)[0]
+        options = dict(
+            num_disparities=num_disparities, block_size=block_size, workers=workers,
+            point_step=point_step, max_depth=max_depth, preview_size=preview_size
+        )
+        return depth_response(left_img, right_img, result, scale, output, options)
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/depth/{left_session_id}/{right_session_id}")
+async def depth_from_uploaded_pair(
+    left_session_id: str,
+    right_session_id: str,
+    left_image: UploadFile = File(...),
+    right_image: UploadFile = File(...),
+    output: str = "zip",
+    max_size: Optional[int] = 1280,
+    num_disparities: int = 64,
+    block_size: int = 5,
+    point_step: int = 2,
+    max_depth: Optional[float] = None,
+    preview_size: Optional[int] = 640,
+    workers: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Dense disparity and depth for an uploaded image pair (taken at the
+    calibrated resolution), with the same options and outputs as GET
+    /depth/{left_session_id}/{right_session_id}/{image_index}
+    """
+    if output not in DEPTH_OUTPUTS:
+        raise HTTPException(status_code=400, detail=f"Output must be one of {', '.join(DEPTH_OUTPUTS)}")
+    result = get_stereo_result(db, left_session_id, right_session_id)
+    left_data = await left_image.read()
+    right_data = await right_image.read()
+
+    def match():
+        left_img = decode_color(left_data)
+        right_img = decode_color(right_data)
+        if left_img is None or right_img is None:
+            raise HTTPException(status_code=400, detail="Image pair could not be decoded")
+
+        scale = 1.0
+        if max_size and max(left_img.shape[:2]) > max_size:
+            scale = max_size / max(left_img.shape[:2])
+            left_img = cv2.resize(left_img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            right_img = cv2.resize(right_img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        options = dict(
+            num_disparities=num_disparities, block_size=block_size, workers=workers,
+            point_step=point_step, max_depth=max_depth, preview_size=preview_size
+        )
+        return depth_response(left_img, right_img, result, scale, output, options)
+
+    try:
+        return await run_in_threadpool(match)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
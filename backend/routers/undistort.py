@@ -0,0 +1,116 @@
+from fastapi import APIRouter, File, Form, UploadFile, Depends, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+import numpy as np
+
+from ..database import get_db, CalibrationResult
+from ..utils.bulk_undistort import (
+    input_kind, iter_image_files, iter_video, iter_zip, stream_zip,
+    undistort_encoded, undistort_items, video_properties, write_video
+)
+
+router = APIRouter()
+
+@router.post("/{session_id}")
+def bulk_undistort(
+    session_id: str,
+    files: List[UploadFile] = File(...),
+    alpha: float = Form(1.0),
+    crop: bool = Form(True),
+    camera_model: Optional[str] = Form(None),  # Default: the model the session was calibrated with
+    output: Optional[str] = Form(None),
+    workers: Optional[int] = Form(None),  # Capped at DETECTION_WORKERS (default: one per CPU core)
+    db: Session = Depends(get_db)
+):
+    """
+    Undistort a batch of images, a zip archive of images or a video with the
+    session's stored calibration. Inputs must be at the calibrated resolution.
+
+    Output is a zip archive streamed back entry by entry in input order
+    (the default for images and zip archives) or, with output="video", an
+    MP4 video (the default for video input). Frames are processed in
+    parallel with cached remap tables and never all held in memory.
+
+    The stored calibration's camera model is used; `camera_model` only needs
+    to be given for results stored before the model was recorded, and must
+    match the stored model otherwise.
+    """
+    result = db.query(CalibrationResult).filter(CalibrationResult.session_id == session_id).first()
+    if not result:
+        raise HTTPException(status_code=404, detail="Calibration results not found")
+    if camera_model and result.camera_model and camera_model != result.camera_model:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Session was calibrated with the {result.camera_model} model, not {camera_model}"
+        )
+    camera_model = result.camera_model or camera_model or "Standard"
+    mtx = np.array(json.loads(result.camera_matrix))
+    dist = np.array(json.loads(result.distortion_coefficients))
+
+    kinds = [input_kind(f.filename or "") for f in files]
+    if None in kinds:
+        raise HTTPException(status_code=400, detail="Upload images, a single zip archive or a single video")
+    if len(files) > 1 and set(kinds) != {"image"}:
+        raise HTTPException(status_code=400, detail="Zip archives and videos must be uploaded on their own")
+    kind = kinds[0]
+    output = output or ("video" if kind == "video" else "zip")
+    if output not in ("zip", "video"):
+        raise HTTPException(status_code=400, detail="Output must be 'zip' or 'video'")
+
+    # Spool the uploads to our own directory: upload files are closed once
+    # this handler returns, before the response has finished streaming
+    work_dir = tempfile.mkdtemp(prefix="undistort-")
+    cleanup = BackgroundTask(shutil.rmtree, work_dir, ignore_errors=True)
+    try:
+        paths = []
+        names = []
+        for i, upload in enumerate(files):
+            path = os.path.join(work_dir, f"{i:06d}_{os.path.basename(upload.filename)}")
+            with open(path, 'wb') as f:
+                shutil.copyfileobj(upload.file, f)
+            paths.append(path)
+            names.append(os.path.basename(upload.filename))
+
+        if kind == "video":
+            fps, _ = video_properties(paths[0])
+            items = iter_video(paths[0])
+        elif kind == "zip":
+            if not zipfile.is_zipfile(paths[0]):
+                raise ValueError(f"{names[0]} is not a zip archive")
+            fps = 30.0
+            items = iter_zip(paths[0])
+        else:
+            fps = 30.0
+            items = ((name, data) for name, (_, data) in zip(names, iter_image_files(paths)))
+
+        options = dict(alpha=alpha, camera_model=camera_model, crop=crop, workers=workers)
+        if output == "zip":
+            return StreamingResponse(
+                stream_zip(undistort_encoded(items, mtx, dist, **options)),
+                media_type="application/zip",
+                headers={"Content-Disposition": 'attachment; filename="undistorted.zip"'},
+                background=cleanup
+            )
+
+        # Videos can only be finalized once every frame is written
+        video_path = os.path.join(work_dir, "undistorted.mp4")
+        if write_video(undistort_items(items, mtx, dist, **options), video_path, fps) == 0:
+            raise HTTPException(status_code=400, detail="No readable frames in the upload")
+        return FileResponse(video_path, media_type="video/mp4", filename="undistorted.mp4", background=cleanup)
+
+    except HTTPException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    except ValueError as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=str(e))
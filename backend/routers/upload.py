@@ -4,7 +4,9 @@ import os
 import uuid
 from typing import List
 
+from ..config import PREVIEW_SIZES
 from ..database import get_db, CalibrationImage, Session as DbSession
+from ..utils.previews import image_url
 
 router = APIRouter()
 
@@ -80,7 +82,10 @@ async def get_session_images(
     session_id: str,
     db: Session = Depends(get_db)
 ):
-    """Get all images associated with a session"""
+    """
+    Get all images associated with a session, with links to cached
+    thumbnails (the smallest standard preview size) for listing them
+    """
     images = db.query(CalibrationImage).filter(
         CalibrationImage.session_id == session_id
     ).all()
@@ -90,7 +95,13 @@ async def get_session_images(
 
     return {
         "session_id": session_id,
-        "images": [{"path": img.image_path} for img in images]
+        "images": [
+            {
+                "path": img.image_path,
+                "thumbnail_url": image_url(session_id, os.path.basename(img.image_path), "original", max_size=min(PREVIEW_SIZES))
+            }
+            for img in images
+        ]
     }
 
 @router.delete("/session/{session_id}")
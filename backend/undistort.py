@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Undistort image batches, zip archives and videos with a saved calibration.
+
+Usage:
+    python -m backend.undistort --calibration calibration_data.json INPUT... --output OUT
+
+INPUT is a directory of images, image files, a zip archive of images or a
+video. OUT is a directory (one image per input), a .zip archive or a video
+file (.mp4/.avi). The calibration file is the calibration_data.json written
+by a calibration, or a saved /calibration/results response.
+
+Frames are undistorted in parallel with cached remap tables and written in
+input order, streaming, so inputs of any length run in bounded memory.
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+import numpy as np
+
+from .utils.bulk_undistort import (
+    VIDEO_EXTENSIONS, input_kind, iter_image_files, iter_video, iter_zip, stream_zip,
+    undistort_encoded, undistort_items, video_properties, write_video
+)
+
+def load_calibration(path):
+    """Camera matrix and distortion coefficients from a calibration JSON file"""
+    with open(path) as f:
+        calibration = json.load(f)
+    mtx = calibration["camera_matrix"]
+    dist = calibration.get("distortion", calibration.get("dist_coeffs", calibration.get("distortion_coefficients")))
+    if dist is None:
+        raise SystemExit(f"No distortion coefficients in {path}")
+    return np.array(mtx), np.array(dist)
+
+def open_inputs(inputs):
+    """The input items and frame rate (for video output) for the given paths"""
+    if len(inputs) == 1 and os.path.isdir(inputs[0]):
+        paths = sorted(
+            path for path in glob.glob(os.path.join(inputs[0], '*')) if input_kind(path) == "image"
+        )
+        return iter_image_files(paths), 30.0
+
+    kinds = {input_kind(path) for path in inputs}
+    if len(inputs) == 1 and kinds == {"zip"}:
+        return iter_zip(inputs[0]), 30.0
+    if len(inputs) == 1 and kinds == {"video"}:
+        fps, _ = video_properties(inputs[0])
+        return iter_video(inputs[0]), fps
+    if kinds == {"image"}:
+        return iter_image_files(inputs), 30.0
+    raise SystemExit("Inputs must be a directory, image files, a single zip archive or a single video")
+
+def main():
+    parser = argparse.ArgumentParser(description="Undistort images, zip archives and videos")
+    parser.add_argument("inputs", nargs="+", help="Image directory, image files, zip archive or video")
+    parser.add_argument("--calibration", required=True, help="Calibration JSON (camera_matrix and distortion)")
+    parser.add_argument("--output", required=True, help="Output directory, .zip archive or video file")
+    parser.add_argument("--camera-model", default="Standard", choices=["Standard", "Fisheye"])
+    parser.add_argument("--alpha", type=float, default=1.0, help="Free scaling parameter (default: 1)")
+    parser.add_argument("--no-crop", action="store_true", help="Keep the full undistorted frame")
+    parser.add_argument("--workers", type=int, default=None, help="Worker threads (default: one per CPU core)")
+    args = parser.parse_args()
+
+    mtx, dist = load_calibration(args.calibration)
+    items, fps = open_inputs(args.inputs)
+    options = dict(alpha=args.alpha, camera_model=args.camera_model, crop=not args.no_crop, workers=args.workers)
+
+    start = time.perf_counter()
+    count = 0
+
+    def counted(results):
+        nonlocal count
+        for result in results:
+            count += 1
+            yield result
+
+    ext = os.path.splitext(args.output.lower())[1]
+    if ext in VIDEO_EXTENSIONS:
+        write_video(counted(undistort_items(items, mtx, dist, **options)), args.output, fps)
+    elif ext == ".zip":
+        with open(args.output, 'wb') as f:
+            for chunk in stream_zip(counted(undistort_encoded(items, mtx, dist, **options))):
+                f.write(chunk)
+    else:
+        os.makedirs(args.output, exist_ok=True)
+        for name, data in counted(undistort_encoded(items, mtx, dist, **options)):
+            with open(os.path.join(args.output, os.path.basename(name)), 'wb') as f:
+                f.write(data)
+
+    elapsed = time.perf_counter() - start
+    print(f"Undistorted {count} frames in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.1f} frames/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Bulk undistortion of image batches, zip archives and videos.
+
+Inputs are read one item at a time and undistorted on a thread pool (decode,
+remap and encode all release the GIL) using the cached remap tables from
+undistort.py. At most a few items per worker are in flight, and results
+come out in input order, so memory stays bounded no matter how large the
+input is. Outputs are written incrementally: a zip archive is produced as a
+stream of chunks, a video frame by frame.
+"""
+
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .detection import resolve_workers
+from .image_io import decode_color
+from .undistort import undistort_image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm")
+
+def input_kind(filename):
+    """'zip', 'video' or 'image' from a file name's extension (None if unsupported)"""
+    ext = os.path.splitext(filename.lower())[1]
+    if ext == ".zip":
+        return "zip"
+    if ext in VIDEO_EXTENSIONS:
+        return "video"
+    if ext in IMAGE_EXTENSIONS:
+        return "image"
+    return None
+
+def iter_image_files(paths):
+    """Yield (name, encoded bytes) for image files, reading each only when it is needed"""
+    for path in paths:
+        with open(path, 'rb') as f:
+            yield os.path.basename(path), f.read()
+
+def iter_zip(file):
+    """Yield (name, encoded bytes) for the images in a zip archive (path or file object), in archive order"""
+    with zipfile.ZipFile(file) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or input_kind(info.filename) != "image":
+                continue
+            # Skip macOS resource forks and other hidden files
+            if os.path.basename(info.filename).startswith("."):
+                continue
+            yield info.filename, archive.read(info)
+
+def iter_video(path):
+    """Yield (frame name, BGR frame) for every frame of a video file"""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video {os.path.basename(path)}")
+    try:
+        index = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield f"frame_{index:06d}.jpg", frame
+            index += 1
+    finally:
+        capture.release()
+
+def video_properties(path):
+    """(fps, frame count) of a video file; ValueError if it cannot be opened"""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video {os.path.basename(path)}")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        return fps, int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        capture.release()
+
+def ordered_map(func, items, workers=None, max_pending=None):
+    """
+    Yield func(item) for every item, in input order, computing up to
+    `workers` results in parallel and holding at most `max_pending` (default
+    two per worker) items in flight, so the input is consumed lazily.
+    `workers` may come from a client, so it is capped at the configured
+    worker count (DETECTION_WORKERS, default one per CPU core).
+    """
+    workers = min(resolve_workers(workers), resolve_workers())
+    max_pending = max(max_pending or 2 * workers, 1)
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="undistort")
+    try:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+def encode_like(name, img):
+    """Encode an image in the format its name implies (JPEG if unsupported by imencode)"""
+    ext = os.path.splitext(name.lower())[1]
+    if ext not in IMAGE_EXTENSIONS:
+        ext = ".jpg"
+    ok, buffer = cv2.imencode(ext, img)
+    if not ok:
+        raise ValueError(f"Could not encode {name}")
+    return buffer.tobytes()
+
+def undistort_items(items, mtx, dist, alpha=1.0, camera_model="Standard", crop=True, workers=None):
+    """
+    Undistort (name, encoded bytes or BGR frame) items and yield
+    (name, undistorted BGR image) in input order. Undecodable images are
+    skipped with a message.
+    """
+    def process(item):
+        name, data = item
+        img = data if isinstance(data, np.ndarray) else decode_color(data)
+        if img is None:
+            return name, None
+        return name, undistort_image(img, mtx, dist, alpha=alpha, camera_model=camera_model, crop=crop)
+
+    for name, img in ordered_map(process, items, workers):
+        if img is None:
+            print(f"Skipping unreadable image {name}")
+            continue
+        yield name, img
+
+def undistort_encoded(items, mtx, dist, alpha=1.0, camera_model="Standard", crop=True, workers=None):
+    """
+    Like undistort_items, but encoding on the worker threads too: yields
+    (name, encoded bytes) in input order, each in its input image's format
+    (frames as JPEG)
+    """
+    def process(item):
+        name, data = item
+        img = data if isinstance(data, np.ndarray) else decode_color(data)
+        if img is None:
+            return name, None
+        undistorted = undistort_image(img, mtx, dist, alpha=alpha, camera_model=camera_model, crop=crop)
+        return name, encode_like(name, undistorted)
+
+    for name, data in ordered_map(process, items, workers):
+        if data is None:
+            print(f"Skipping unreadable image {name}")
+            continue
+        yield name, data
+
+class _ChunkWriter:
+    """Write-only file object that hands written bytes back out in chunks"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_zip(encoded_items):
+    """
+    Yield a zip archive of (name, bytes) entries chunk by chunk, one entry
+    at a time (images are already compressed, so entries are stored)
+    """
+    writer = _ChunkWriter()
+    with zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, data in encoded_items:
+            archive.writestr(name, data)
+            chunk = writer.take()
+            if chunk:
+                yield chunk
+    chunk = writer.take()
+    if chunk:
+        yield chunk
+
+def write_video(frames, path, fps):
+    """
+    Write (name, BGR frame) items to a video file in order. The output size
+    is fixed by the first frame. Returns the number of frames written.
+    """
+    writer = None
+    count = 0
+    try:
+        for _, frame in frames:
+            if writer is None:
+                h, w = frame.shape[:2]
+                writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+                if not writer.isOpened():
+                    raise ValueError(f"Could not open video writer for {os.path.basename(path)}")
+            writer.write(frame)
+            count += 1
+    finally:
+        if writer is not None:
+            writer.release()
+    return count
@@ -3,145 +3,425 @@ import json
 import numpy as np
 import os
 import glob
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def calibrate_camera(images_path, checkerboard_size, square_size, pattern_type, marker_size=None, aruco_dict_name=None, camera_model="Standard", optimize=False):
+from ..config import OUTLIER_MIN_CUTOFF
+from .detection import detect_image_pairs, detect_images, match_image_pairs, process_pool, resolve_workers
+from .image_io import read_gray
+from .reprojection import reprojection_residuals
+from .view_selection import select_views
+
+# Concurrent calibrations (the two sides of a stereo pair) share one output file
+_calibration_file_lock = threading.Lock()
+
+def intrinsic_guess(camera_model, initial_mtx=None, initial_dist=None):
+    """
+    Validate a previous calibration for use as a solver starting point.
+    Returns (None, None) if there is none or it doesn't fit the camera model.
+    """
+    if initial_mtx is None or initial_dist is None:
+        return None, None
+
+    mtx = np.array(initial_mtx, dtype=np.float64).reshape(3, 3)
+    dist = np.array(initial_dist, dtype=np.float64)
+    if camera_model == "Fisheye":
+        if dist.size != 4:
+            return None, None
+        return mtx, dist.reshape(4, 1)
+    if dist.size not in (4, 5, 8, 12, 14):
+        return None, None
+    return mtx, dist.reshape(1, -1)
+
+def solve_intrinsics(objpoints, imgpoints, image_size, camera_model, guess_mtx=None, guess_dist=None):
+    """
+    Run the Standard or Fisheye solver, warm-started from a guess if given.
+    Returns (rms, mtx, dist, rvecs, tvecs).
+    """
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+    warm = guess_mtx is not None
+
+    if camera_model == "Standard":
+        if not warm:
+            return cv2.calibrateCamera(objpoints, imgpoints, image_size, None, None)
+        return cv2.calibrateCamera(
+            objpoints, imgpoints, image_size, guess_mtx.copy(), guess_dist.copy(),
+            flags=cv2.CALIB_USE_INTRINSIC_GUESS
+        )
+
+    if camera_model == "Fisheye":
+        flags = (cv2.fisheye.CALIB_RECOMPUTE_EXTRINSIC |
+                 cv2.fisheye.CALIB_CHECK_COND |
+                 cv2.fisheye.CALIB_FIX_SKEW)
+        if warm:
+            flags |= cv2.fisheye.CALIB_USE_INTRINSIC_GUESS
+        return cv2.fisheye.calibrate(
+            objpoints, imgpoints, image_size,
+            guess_mtx.copy() if warm else None,
+            guess_dist.copy() if warm else None,
+            criteria=criteria,
+            flags=flags
+        )
+
+    raise ValueError(f"Unknown camera model: {camera_model}")
+
+def view_errors(objpoints, imgpoints, rvecs, tvecs, mtx, dist, camera_model):
+    """
+    Per-view reprojection error: L2 norm of the residuals over the number of points
+    """
+    view_rms, _, offsets = reprojection_residuals(objpoints, imgpoints, rvecs, tvecs, mtx, dist, camera_model)
+    return view_rms / np.sqrt(np.maximum(np.diff(offsets), 1))
+
+def holdout_errors(objpoints, imgpoints, mtx, dist, camera_model):
+    """
+    Reprojection error of views left out of the solve. Each view's board pose
+    is estimated with solvePnP against the fixed intrinsics.
+    """
+    rvecs = []
+    tvecs = []
+    for obj, img in zip(objpoints, imgpoints):
+        obj = np.asarray(obj, dtype=np.float64).reshape(-1, 3)
+        img = np.asarray(img, dtype=np.float64).reshape(-1, 1, 2)
+        if camera_model == "Fisheye":
+            # No fisheye solvePnP: solve on undistorted, normalized points
+            normalized = cv2.fisheye.undistortPoints(img, mtx, dist)
+            _, rvec, tvec = cv2.solvePnP(obj, normalized, np.eye(3), None)
+        else:
+            _, rvec, tvec = cv2.solvePnP(obj, img, mtx, dist)
+        rvecs.append(rvec)
+        tvecs.append(tvec)
+    return view_errors(objpoints, imgpoints, rvecs, tvecs, mtx, dist, camera_model)
+
+def outlier_cutoff(errors, threshold=None, mad_scale=3.0, min_cutoff=None):
+    """
+    Error above which a view counts as an outlier: the fixed `threshold` if
+    given, otherwise median + mad_scale * 1.4826 * MAD, but never below
+    `min_cutoff` (default OUTLIER_MIN_CUTOFF). Without the floor, a clean
+    set of views with a tiny MAD would still have its tail cut away.
+    """
+    if threshold is not None:
+        return threshold
+    if min_cutoff is None:
+        min_cutoff = OUTLIER_MIN_CUTOFF
+    errors = np.asarray(errors, dtype=np.float64)
+    median = np.median(errors)
+    mad = np.median(np.abs(errors - median))
+    return max(median + mad_scale * 1.4826 * mad, min_cutoff)
+
+def reject_outlier_views(objpoints, imgpoints, image_size, camera_model, solution, threshold=None, max_iterations=5, min_views=3):
+    """
+    Repeatedly drop views above the outlier cutoff and re-solve, warm-started
+    from the previous intrinsics. Stops when no view is above the cutoff,
+    after `max_iterations` re-solves, or when fewer than `min_views` would remain.
+
+    Returns (kept view indices, rejected views, error history, final solution)
+    where solution is (rms, mtx, dist, rvecs, tvecs) for the kept views.
+    """
+    kept = list(range(len(objpoints)))
+    rejected = []
+    history = []
+
+    for iteration in range(max_iterations + 1):
+        ret, mtx, dist, rvecs, tvecs = solution
+        errors = view_errors(
+            [objpoints[i] for i in kept], [imgpoints[i] for i in kept],
+            rvecs, tvecs, mtx, dist, camera_model
+        )
+        cutoff = outlier_cutoff(errors, threshold)
+        outliers = [position for position, error in enumerate(errors) if error > cutoff]
+        stop = not outliers or iteration == max_iterations or len(kept) - len(outliers) < min_views
+
+        history.append({
+            "iteration": iteration,
+            "num_views": len(kept),
+            "rms": float(ret),
+            "mean_error": float(np.mean(errors)),
+            "max_error": float(np.max(errors)),
+            "cutoff": float(cutoff),
+            "rejected": 0 if stop else len(outliers)
+        })
+
+        if stop:
+            break
+
+        for position in outliers:
+            rejected.append({"view_index": kept[position], "iteration": iteration, "error": float(errors[position])})
+        outlier_views = {kept[position] for position in outliers}
+        kept = [i for i in kept if i not in outlier_views]
+
+        guess_mtx, guess_dist = intrinsic_guess(camera_model, mtx, dist)
+        solution = solve_intrinsics(
+            [objpoints[i] for i in kept], [imgpoints[i] for i in kept],
+            image_size, camera_model, guess_mtx, guess_dist
+        )
+
+    return kept, rejected, history, solution
+
+STANDARD_DISTORTION_NAMES = ("k1", "k2", "p1", "p2", "k3", "k4", "k5", "k6", "s1", "s2", "s3", "s4", "tau_x", "tau_y")
+FISHEYE_DISTORTION_NAMES = ("k1", "k2", "k3", "k4")
+
+def intrinsic_parameter_names(camera_model, num_dist):
+    """Names of the values in intrinsic_vector, in order"""
+    names = FISHEYE_DISTORTION_NAMES if camera_model == "Fisheye" else STANDARD_DISTORTION_NAMES
+    return ["fx", "fy", "cx", "cy"] + list(names[:num_dist])
+
+def intrinsic_vector(mtx, dist):
+    """fx, fy, cx, cy followed by the distortion coefficients"""
+    return np.concatenate([[mtx[0, 0], mtx[1, 1], mtx[0, 2], mtx[1, 2]], np.ravel(dist)])
+
+def intrinsic_std_deviations(objpoints, imgpoints, image_size, mtx, dist):
+    """
+    Standard deviations of fx, fy, cx, cy and the distortion coefficients
+    estimated by calibrateCameraExtended at the given (converged) solution
+    """
+    _, _, _, _, _, std_intrinsics, _, _ = cv2.calibrateCameraExtended(
+        objpoints, imgpoints, image_size, mtx.copy(), dist.copy(),
+        flags=cv2.CALIB_USE_INTRINSIC_GUESS
+    )
+    return std_intrinsics.ravel()[:4 + dist.size]
+
+# Largest bootstrap a client may ask for; every sample is a full solve
+MAX_BOOTSTRAP_SAMPLES = 1000
+
+_bootstrap_problem = None
+
+def _init_bootstrap_worker(problem):
+    cv2.setNumThreads(1)
+    global _bootstrap_problem
+    _bootstrap_problem = problem
+
+def _bootstrap_solve(problem, indices):
+    objpoints, imgpoints, image_size, camera_model, guess_mtx, guess_dist = problem
+    try:
+        _, mtx, dist, _, _ = solve_intrinsics(
+            [objpoints[i] for i in indices], [imgpoints[i] for i in indices],
+            image_size, camera_model, guess_mtx, guess_dist
+        )
+    except cv2.error:
+        # Degenerate resample (e.g. too few distinct views for the fisheye solver)
+        return None
+    return intrinsic_vector(mtx, dist)
+
+def _bootstrap_task(indices):
+    return _bootstrap_solve(_bootstrap_problem, indices)
+
+def bootstrap_intrinsics(objpoints, imgpoints, image_size, camera_model, mtx, dist, samples=100, seed=0, workers=None, progress=None):
+    """
+    Resample views with replacement and re-solve, warm-started from the full
+    solution, across a process pool. All resamples are drawn up front from
+    `seed`, so the result does not depend on the number of workers.
+    `progress(done, total)` is called as each resample is solved; an
+    exception it raises (e.g. JobCancelled) cancels the resamples not yet
+    started.
+
+    Returns (solved samples, variance per parameter, [2.5%, 97.5%] percentiles
+    per parameter) with parameters in intrinsic_vector order.
+    """
+    rng = np.random.default_rng(seed)
+    num_views = len(objpoints)
+    resamples = [rng.integers(0, num_views, num_views) for _ in range(samples)]
+
+    guess_mtx, guess_dist = intrinsic_guess(camera_model, mtx, dist)
+    problem = (objpoints, imgpoints, image_size, camera_model, guess_mtx, guess_dist)
+    workers = resolve_workers(workers, samples)
+
+    vectors = [None] * samples
+    executor = None
+    try:
+        if workers == 1:
+            for done, indices in enumerate(resamples, 1):
+                vectors[done - 1] = _bootstrap_solve(problem, indices)
+                if progress is not None:
+                    progress(done, samples)
+        else:
+            executor = process_pool(workers, _init_bootstrap_worker, (problem,))
+            futures = {executor.submit(_bootstrap_task, indices): sample for sample, indices in enumerate(resamples)}
+            for done, future in enumerate(as_completed(futures), 1):
+                # Kept in resample order, so results match a serial run
+                vectors[futures[future]] = future.result()
+                if progress is not None:
+                    progress(done, samples)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    vectors = np.array([v for v in vectors if v is not None])
+    if len(vectors) < 2:
+        return len(vectors), None, None
+    return len(vectors), vectors.var(axis=0, ddof=1), np.percentile(vectors, [2.5, 97.5], axis=0).T
+
+def estimate_uncertainty(objpoints, imgpoints, image_size, camera_model, mtx, dist, bootstrap_samples=0, seed=0, workers=None, progress=None):
+    """
+    Per-parameter variance of a calibration: analytic from
+    calibrateCameraExtended (Standard model only) and, if `bootstrap_samples`
+    is set, empirical from bootstrap_intrinsics (which reports to `progress`).
+    """
+    names = intrinsic_parameter_names(camera_model, np.size(dist))
+    uncertainty = {
+        "parameter_names": names,
+        "intrinsics_variance": None,
+        "bootstrap_variance": None,
+        "bootstrap_intervals": None,
+        "bootstrap_samples": None,
+        "bootstrap_seed": None
+    }
+
+    if camera_model == "Standard":
+        std = intrinsic_std_deviations(objpoints, imgpoints, image_size, mtx, dist)
+        uncertainty["intrinsics_variance"] = {name: float(value ** 2) for name, value in zip(names, std)}
+
+    if bootstrap_samples:
+        solved, variance, intervals = bootstrap_intrinsics(
+            objpoints, imgpoints, image_size, camera_model, mtx, dist, bootstrap_samples, seed, workers, progress
+        )
+        uncertainty["bootstrap_samples"] = solved
+        uncertainty["bootstrap_seed"] = seed
+        if variance is not None:
+            uncertainty["bootstrap_variance"] = {name: float(value) for name, value in zip(names, variance)}
+            uncertainty["bootstrap_intervals"] = {name: [float(low), float(high)] for name, (low, high) in zip(names, intervals)}
+
+    return uncertainty
+
+def parameter_changes(previous_mtx, previous_dist, mtx, dist):
+    """
+    How far the intrinsics moved from a previous calibration
+    """
+    previous_mtx = np.asarray(previous_mtx, dtype=np.float64)
+    previous_dist = np.asarray(previous_dist, dtype=np.float64).ravel()
+    dist = np.asarray(dist, dtype=np.float64).ravel()
+
+    changes = {
+        "fx": float(mtx[0, 0] - previous_mtx[0, 0]),
+        "fy": float(mtx[1, 1] - previous_mtx[1, 1]),
+        "cx": float(mtx[0, 2] - previous_mtx[0, 2]),
+        "cy": float(mtx[1, 2] - previous_mtx[1, 2]),
+        "distortion": None
+    }
+    if previous_dist.size == dist.size:
+        changes["distortion"] = (dist - previous_dist).tolist()
+    return changes
+
+def calibrate_camera(images_path, checkerboard_size, square_size, pattern_type, marker_size=None, aruco_dict_name=None, camera_model="Standard", optimize=False, workers=None, detections=None, pyramid_min_size=None, initial_mtx=None, initial_dist=None,
+                     reject_outliers=False, outlier_threshold=None, max_rejection_iterations=5, details=None,
+                     uncertainty=False, bootstrap_samples=0, bootstrap_seed=0, max_views=None, progress=None,
+                     bootstrap_progress=None):
     """
     Calibrate camera using images from a directory.
     Matches the Streamlit implementation exactly.
+
+    Pattern detection runs across `workers` processes (see detect_images);
+    pass precomputed `detections` to skip it. `pyramid_min_size` overrides
+    the size above which checkerboards are found coarse-to-fine, and
+    `progress` is passed on to detect_images.
+
+    images_with_detections and image_detection_map hold compact detection
+    records rather than images; render them with render_detection.
+
+    Given `initial_mtx`/`initial_dist` from an earlier calibration of the same
+    camera, the solver is warm-started with CALIB_USE_INTRINSIC_GUESS.
+
+    With `reject_outliers`, views whose error is above `outlier_threshold`
+    (or a MAD-based cutoff when it is None) are dropped and the solve is
+    repeated, see reject_outlier_views. images_with_detections then lists
+    only the views that were kept. Pass a dict as `details` to receive the
+    rejected views and the per-iteration error history.
+
+    With `uncertainty`, details["uncertainty"] receives per-parameter
+    variances of the final intrinsics (see estimate_uncertainty), including a
+    `bootstrap_samples`-sample bootstrap over views seeded with `bootstrap_seed`,
+    reported per solved resample to `bootstrap_progress(done, total)`.
+
+    With `max_views`, only that many views, picked for coverage and pose
+    spread by select_views, are solved on. The others are held out and their
+    reprojection errors reported in details["view_selection"];
+    images_with_detections lists only the selected views.
     """
     criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
 
-    print(checkerboard_size)
-    # Create object points array
-    objp = np.zeros(((checkerboard_size[0]) * (checkerboard_size[1]), 3), np.float32)
-    print(objp.shape)
-    # Fill the array with coordinates
-    objp[:, :2] = np.mgrid[0:checkerboard_size[0], 0:checkerboard_size[1]].T.reshape(-1, 2)
-    print(objp.shape)
-    objp *= square_size
-
-    if pattern_type == 'ChArUcoboard':
-        objp = np.zeros((checkerboard_size[0] * checkerboard_size[1], 3), np.float32)
-        objp[:, :2] = np.mgrid[0:checkerboard_size[0], 0:checkerboard_size[1]].T.reshape(-1, 2)
-        objp *= square_size
-    
     objpoints = []
     imgpoints = []
-    images_with_detections = []
-    image_detection_map = {}  # Maps image path to (detection_success, annotated_image)
+    images_with_detections = []  # Detection records of images the pattern was found in
+    image_detection_map = {}  # Maps image path to its detection record (see detect_pattern)
 
-    # Get sorted list of images for consistent order
-    images = sorted(glob.glob(os.path.join(images_path, '*')))
-    
-    if not images:
+    if detections is None:
+        detections = detect_images(images_path, checkerboard_size, square_size, pattern_type,
+                                   marker_size, aruco_dict_name, workers=workers,
+                                   pyramid_min_size=pyramid_min_size, progress=progress)
+
+    if not detections:
         return None, None, None, None, None, None, None, None, images_with_detections, image_detection_map
-    
-    aruco_dicts = {
-        'DICT_4X4_50': cv2.aruco.DICT_4X4_50,
-        'DICT_4X4_100': cv2.aruco.DICT_4X4_100,
-        'DICT_4X4_250': cv2.aruco.DICT_4X4_250,
-        'DICT_4X4_1000': cv2.aruco.DICT_4X4_1000,
-        'DICT_5X5_50': cv2.aruco.DICT_5X5_50,
-        'DICT_5X5_100': cv2.aruco.DICT_5X5_100,
-        'DICT_5X5_250': cv2.aruco.DICT_5X5_250,
-        'DICT_5X5_1000': cv2.aruco.DICT_5X5_1000,
-        'DICT_6X6_50': cv2.aruco.DICT_6X6_50,
-        'DICT_6X6_100': cv2.aruco.DICT_6X6_100,
-        'DICT_6X6_250': cv2.aruco.DICT_6X6_250,
-        'DICT_6X6_1000': cv2.aruco.DICT_6X6_1000,
-        'DICT_7X7_50': cv2.aruco.DICT_7X7_50,
-        'DICT_7X7_100': cv2.aruco.DICT_7X7_100,
-        'DICT_7X7_250': cv2.aruco.DICT_7X7_250,
-        'DICT_7X7_1000': cv2.aruco.DICT_7X7_1000,
-        'DICT_ARUCO_ORIGINAL': cv2.aruco.DICT_ARUCO_ORIGINAL,
-        'DICT_APRILTAG_16h5': cv2.aruco.DICT_APRILTAG_16h5,
-        'DICT_APRILTAG_25h9': cv2.aruco.DICT_APRILTAG_25h9,
-        'DICT_APRILTAG_36h10': cv2.aruco.DICT_APRILTAG_36h10,
-        'DICT_APRILTAG_36h11': cv2.aruco.DICT_APRILTAG_36h11
-    }
 
-    if pattern_type == 'ChArUcoboard':
-        aruco_dict = cv2.aruco.getPredefinedDictionary(aruco_dicts[aruco_dict_name])
-        board = cv2.aruco.CharucoBoard((checkerboard_size[0], checkerboard_size[1]), square_size, marker_size, aruco_dict)
-    
-    for fname in images:
-        img = cv2.imread(fname)
-        if img is None:
-            continue
-        
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        found = False
-        corners = []
-        
-        if pattern_type == 'Checkerboard':
-            checkerboard_size = (checkerboard_size[0], checkerboard_size[1])
-            print(checkerboard_size)
-            found, corners = cv2.findChessboardCorners(gray, checkerboard_size)
-
-            if found:
-                term = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 30, 0.1)
-                cv2.cornerSubPix(gray, corners, (5, 5), (-1, -1), term)
-                frame_img_points = corners.reshape(-1, 2)
-                frame_obj_points = objp
-                img_with_detections = cv2.drawChessboardCorners(img.copy(), checkerboard_size, corners, found)
-
-                imgpoints.append(frame_img_points)
-                objpoints.append(frame_obj_points)
-                images_with_detections.append(img_with_detections)
-                image_detection_map[fname] = (True, img_with_detections)
-            else:
-                image_detection_map[fname] = (False, img)
-                
-        elif pattern_type == 'ChArUcoboard':
-            corners, ids, _ = cv2.aruco.detectMarkers(gray, aruco_dict)
-            if ids is not None and len(corners) > 0:
-                _, charuco_corners, charuco_ids = cv2.aruco.interpolateCornersCharuco(corners, ids, gray, board)
-                if charuco_corners is not None and charuco_ids is not None and len(charuco_corners) > 3:
-                    frame_img_points = charuco_corners
-                    frame_obj_points = board.getChessboardCorners()[charuco_ids.flatten()]
-                    found = True
-                    img_with_detections = cv2.aruco.drawDetectedMarkers(img.copy(), corners, ids)
-                    img_with_detections = cv2.aruco.drawDetectedCornersCharuco(img_with_detections, charuco_corners, charuco_ids)
-
-                    imgpoints.append(frame_img_points)
-                    objpoints.append(frame_obj_points)
-                    images_with_detections.append(img_with_detections)
-                    image_detection_map[fname] = (True, img_with_detections)
-                else:
-                    image_detection_map[fname] = (False, img)
-            else:
-                image_detection_map[fname] = (False, img)
-    
+    for detection in detections:
+        if detection["found"]:
+            # Copy so refinement below never alters the (reusable) detection record
+            imgpoints.append(np.array(detection["img_points"]))
+            objpoints.append(detection["obj_points"])
+            images_with_detections.append(detection)
+        image_detection_map[detection["path"]] = detection
+
+    # Size of the last readable image, which the solver has always used
+    image_size = detections[-1]["image_size"]
+
     if not objpoints or not imgpoints:
         return None, None, None, None, None, None, None, None, images_with_detections, image_detection_map
-    
-    if camera_model == "Standard":
-        ret, mtx, dist, rvecs, tvecs = cv2.calibrateCamera(objpoints, imgpoints, gray.shape[::-1], None, None)
-        if optimize:
-            for i in range(len(objpoints)):
-                imgpoints[i] = cv2.cornerSubPix(gray, imgpoints[i], (11, 11), (-1, -1), criteria)
-            ret, mtx, dist, rvecs, tvecs = cv2.calibrateCamera(objpoints, imgpoints, gray.shape[::-1], None, None)
-            
-    elif camera_model == "Fisheye":
+
+    if optimize:
+        gray = read_gray(detections[-1]["path"])
+
+    if camera_model == "Fisheye":
         objpoints = [np.array(obj).reshape(-1, 1, 3) for obj in objpoints]
         imgpoints = [np.array(img).reshape(-1, 1, 2) for img in imgpoints]
-        ret, mtx, dist, rvecs, tvecs = cv2.fisheye.calibrate(
-            objpoints, imgpoints, gray.shape[::-1], None, None,
-            criteria=criteria,
-            flags=(cv2.fisheye.CALIB_RECOMPUTE_EXTRINSIC |
-                   cv2.fisheye.CALIB_CHECK_COND |
-                   cv2.fisheye.CALIB_FIX_SKEW)
+
+    # Solve on the most informative views only, holding out the rest
+    selected = select_views(objpoints, imgpoints, image_size, max_views)
+    held_out = sorted(set(range(len(objpoints))) - set(selected))
+    held_out_views = [(objpoints[i], imgpoints[i], images_with_detections[i]) for i in held_out]
+    objpoints = [objpoints[i] for i in selected]
+    imgpoints = [imgpoints[i] for i in selected]
+    images_with_detections = [images_with_detections[i] for i in selected]
+
+    guess_mtx, guess_dist = intrinsic_guess(camera_model, initial_mtx, initial_dist)
+
+    ret, mtx, dist, rvecs, tvecs = solve_intrinsics(objpoints, imgpoints, image_size, camera_model, guess_mtx, guess_dist)
+    if optimize:
+        for i in range(len(objpoints)):
+            imgpoints[i] = cv2.cornerSubPix(gray, imgpoints[i], (11, 11), (-1, -1), criteria)
+        ret, mtx, dist, rvecs, tvecs = solve_intrinsics(objpoints, imgpoints, image_size, camera_model, guess_mtx, guess_dist)
+
+    if reject_outliers:
+        kept, rejected, history, (ret, mtx, dist, rvecs, tvecs) = reject_outlier_views(
+            objpoints, imgpoints, image_size, camera_model, (ret, mtx, dist, rvecs, tvecs),
+            outlier_threshold, max_rejection_iterations
+        )
+        if details is not None:
+            details["rejected_views"] = [
+                dict(view, image_path=images_with_detections[view["view_index"]]["path"]) for view in rejected
+            ]
+            details["error_history"] = history
+        objpoints = [objpoints[i] for i in kept]
+        imgpoints = [imgpoints[i] for i in kept]
+        images_with_detections = [images_with_detections[i] for i in kept]
+
+    if held_out_views and details is not None:
+        errors = holdout_errors(
+            [view[0] for view in held_out_views], [view[1] for view in held_out_views],
+            mtx, dist, camera_model
+        )
+        details["view_selection"] = {
+            "selected_views": len(selected),
+            "held_out_views": [
+                {"image_path": view[2]["path"], "error": float(error)}
+                for view, error in zip(held_out_views, errors)
+            ],
+            "validation_mean_error": float(np.mean(errors)),
+            "validation_max_error": float(np.max(errors))
+        }
+
+    if uncertainty and details is not None:
+        details["uncertainty"] = estimate_uncertainty(
+            objpoints, imgpoints, image_size, camera_model, mtx, dist,
+            bootstrap_samples, bootstrap_seed, workers, bootstrap_progress
         )
-        if optimize:
-            for i in range(len(objpoints)):
-                imgpoints[i] = cv2.cornerSubPix(gray, imgpoints[i], (11, 11), (-1, -1), criteria)
-            ret, mtx, dist, rvecs, tvecs = cv2.fisheye.calibrate(
-                objpoints, imgpoints, gray.shape[::-1], None, None,
-                criteria=criteria,
-                flags=(cv2.fisheye.CALIB_RECOMPUTE_EXTRINSIC |
-                       cv2.fisheye.CALIB_CHECK_COND |
-                       cv2.fisheye.CALIB_FIX_SKEW)
-            )
     
     calibration_data = {
         'camera_matrix': mtx.tolist(),
@@ -154,53 +434,159 @@ def calibrate_camera(images_path, checkerboard_size, square_size, pattern_type,
         'translation_vecs': [tvec.tolist() for tvec in tvecs]
     }
     
-    with open('calibration_data.json', 'w') as f:
+    with _calibration_file_lock, open('calibration_data.json', 'w') as f:
         json.dump(calibration_data, f)
     
-    mean_error = 0
-    reprojection_errors = []
-    for i in range(len(objpoints)):
-        if camera_model == "Standard":
-            imgpoints2, _ = cv2.projectPoints(objpoints[i], rvecs[i], tvecs[i], mtx, dist)
-        elif camera_model == "Fisheye":
-            imgpoints2, _ = cv2.fisheye.projectPoints(objpoints[i], rvecs[i], tvecs[i], mtx, dist)
-        imgpoints[i] = np.asarray(imgpoints[i], dtype=np.float32).reshape(-1, 1, 2)
-        imgpoints2 = np.asarray(imgpoints2, dtype=np.float32)
-        error = cv2.norm(imgpoints[i], imgpoints2, cv2.NORM_L2) / len(imgpoints2)
-        mean_error += error
-        reprojection_errors.append(error)
-    
-    mean_error = mean_error / len(objpoints)
+    imgpoints = [np.asarray(points, dtype=np.float32).reshape(-1, 1, 2) for points in imgpoints]
+    reprojection_errors = view_errors(objpoints, imgpoints, rvecs, tvecs, mtx, dist, camera_model)
+    mean_error = float(reprojection_errors.mean())
 
     return mtx, dist, mean_error, rvecs, tvecs, imgpoints, objpoints, reprojection_errors, images_with_detections, image_detection_map
 
-def calibrate_stereo_cameras(left_images_path, right_images_path, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name, camera_model="Standard", optimize=False):
+def scale_camera_matrix(mtx, scale):
+    """
+    Camera matrix for images resized by `scale` (distortion is unaffected)
+    """
+    scaled = np.array(mtx, dtype=np.float64)
+    scaled[:2, :2] *= scale
+    # Keep pixel centres aligned: x' = (x + 0.5) * scale - 0.5
+    scaled[:2, 2] = (scaled[:2, 2] + 0.5) * scale - 0.5
+    return scaled
+
+def split_workers(workers=None, parts=2):
+    """
+    Split a CPU budget (resolve_workers semantics) across concurrent tasks.
+    Returns one worker count per task, or None if the budget is too small
+    to run them side by side.
+    """
+    total = resolve_workers(workers)
+    if total < parts:
+        return None
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+def calibrate_camera_pair(left_images_path, right_images_path, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name, camera_model="Standard", optimize=False, workers=None, left_progress=None, right_progress=None, left_detections=None, right_detections=None):
+    """
+    Run the left and right calibrate_camera passes concurrently, each with
+    half of the `workers` CPU budget for its detection pool, so together
+    they never use more than the budget. With a budget of one core they run
+    one after the other. Pass `left_detections`/`right_detections` to solve
+    on existing detections. Returns both results.
+    """
+    budgets = split_workers(workers)
+    sides = (
+        (left_images_path, left_progress, left_detections),
+        (right_images_path, right_progress, right_detections)
+    )
+
+    def calibrate(side, side_workers):
+        images_path, progress, detections = sides[side]
+        return calibrate_camera(
+            images_path, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name,
+            camera_model, optimize, workers=side_workers, detections=detections, progress=progress
+        )
+
+    if budgets is None:
+        return calibrate(0, 1), calibrate(1, 1)
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="stereo-side") as executor:
+        futures = [executor.submit(calibrate, side, budgets[side]) for side in (0, 1)]
+        # Wait for both sides before raising, so neither outlives the call
+        for future in futures:
+            future.exception()
+        return futures[0].result(), futures[1].result()
+
+def essential_fundamental(R, T, left_mtx, right_mtx):
+    """
+    Essential and fundamental matrices of a calibrated stereo pair:
+    E = [T]x R and F = K2^-T E K1^-1, normalized so F[2, 2] == 1 as
+    stereoCalibrate does
+    """
+    tx, ty, tz = np.asarray(T, dtype=np.float64).reshape(3)
+    T_cross = np.array([[0, -tz, ty], [tz, 0, -tx], [-ty, tx, 0]])
+    E = T_cross @ np.asarray(R, dtype=np.float64)
+    F = np.linalg.inv(np.asarray(right_mtx, dtype=np.float64)).T @ E @ np.linalg.inv(np.asarray(left_mtx, dtype=np.float64))
+    if abs(F[2, 2]) > np.finfo(np.float64).eps:
+        F = F / F[2, 2]
+    return E, F
+
+def calibrate_stereo_cameras(left_images_path, right_images_path, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name, camera_model="Standard", optimize=False, progress=None, workers=None, pair_by="index", pair_pattern=None, details=None):
     """
     Calibrate stereo cameras using images from two directories.
+
+    Left and right images are paired by index or name (see
+    match_image_pairs) and each pair is detected as one unit (see
+    detect_image_pairs), within the `workers` CPU budget. Each camera is
+    then calibrated on its own detections, both concurrently, and the
+    stereo solve uses only the pairs detected in both views, restricted to
+    their shared corners. `progress` is passed on to detect_image_pairs.
+
+    E and F follow from the solved R, T and camera matrices and the pair is
+    rectified once. Pass a dict as `details` to receive them (essential and
+    fundamental matrices, rectification and projection matrices, Q, valid
+    ROIs, image size and the (left, right) paths of the solved pairs with
+    their indices among all matched pairs) so callers need not recompute
+    anything.
     """
-    left_mtx, left_dist, left_error, left_rvecs, left_tvecs, left_imgpoints, left_objpoints, left_reprojection_errors, left_images_with_detections, left_image_detection_map = calibrate_camera(
-        left_images_path, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name, camera_model, optimize)
-    right_mtx, right_dist, right_error, right_rvecs, right_tvecs, right_imgpoints, right_objpoints, right_reprojection_errors, right_images_with_detections, right_image_detection_map = calibrate_camera(
-        right_images_path, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name, camera_model, optimize)
-    
+    pairs, unmatched_left, unmatched_right = match_image_pairs(
+        glob.glob(os.path.join(left_images_path, '*')),
+        glob.glob(os.path.join(right_images_path, '*')),
+        pair_by, pair_pattern
+    )
+    if unmatched_left or unmatched_right:
+        print(f"Stereo pairing left {len(unmatched_left)} left and {len(unmatched_right)} right images unpaired")
+
+    records = detect_image_pairs(
+        pairs, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name,
+        workers=workers, progress=progress
+    )
+    stereo_pairs = [record for record in records if record["found"]]
+    if not stereo_pairs:
+        return None, None, None, None, None, None, None, None, None, None, None, None, None, None, None
+
+    left_result, right_result = calibrate_camera_pair(
+        left_images_path, right_images_path, checkerboard_size, square_size, pattern_type, marker_size,
+        aruco_dict_name, camera_model, optimize, workers,
+        left_detections=[record["left"] for record in records if record["left"] is not None],
+        right_detections=[record["right"] for record in records if record["right"] is not None]
+    )
+    left_mtx, left_dist, left_error, left_rvecs, left_tvecs, _, _, left_reprojection_errors, left_images_with_detections, left_image_detection_map = left_result
+    right_mtx, right_dist, right_error, right_rvecs, right_tvecs, _, _, right_reprojection_errors, right_images_with_detections, right_image_detection_map = right_result
+
+    # Views of the stereo solve: pairs seen by both cameras, shared corners only
+    objpoints = [np.asarray(record["obj_points"], dtype=np.float32).reshape(-1, 3) for record in stereo_pairs]
+    left_imgpoints = [np.asarray(record["left_points"], dtype=np.float32).reshape(-1, 1, 2) for record in stereo_pairs]
+    right_imgpoints = [np.asarray(record["right_points"], dtype=np.float32).reshape(-1, 1, 2) for record in stereo_pairs]
+
     if left_mtx is None or right_mtx is None:
-        return None, None, None, None, None, None, None, None, None, None
-    
-    objpoints = left_objpoints
-    
-    if not objpoints or not left_imgpoints or not right_imgpoints:
-        return None, None, None, None, None, None, None, None, None, None
-    
-    images = glob.glob(os.path.join(left_images_path, '*'))
-    gray = cv2.cvtColor(cv2.imread(images[0]), cv2.COLOR_BGR2GRAY)
+        return None, None, None, None, None, None, None, None, None, None, None, None, None, None, None
+
+    image_size = tuple(int(v) for v in stereo_pairs[0]["left"]["image_size"])
     
-    ret, left_mtx, left_dist, right_mtx, right_dist, R, T, E, F = cv2.stereoCalibrate(
-        objpoints, left_imgpoints, right_imgpoints, left_mtx, left_dist, right_mtx, right_dist, gray.shape[::-1]
+    ret, left_mtx, left_dist, right_mtx, right_dist, R, T, _, _ = cv2.stereoCalibrate(
+        objpoints, left_imgpoints, right_imgpoints, left_mtx, left_dist, right_mtx, right_dist, image_size
     )
+    E, F = essential_fundamental(R, T, left_mtx, right_mtx)
     
     R1, R2, P1, P2, Q, validPixROI1, validPixROI2 = cv2.stereoRectify(
-        left_mtx, left_dist, right_mtx, right_dist, gray.shape[::-1], R, T
+        left_mtx, left_dist, right_mtx, right_dist, image_size, R, T
     )
+
+    if details is not None:
+        details.update({
+            "essential_matrix": E,
+            "fundamental_matrix": F,
+            "rectification_matrix_left": R1,
+            "rectification_matrix_right": R2,
+            "projection_matrix_left": P1,
+            "projection_matrix_right": P2,
+            "disparity_to_depth_mapping": Q,
+            "valid_pixel_roi_left": tuple(int(v) for v in validPixROI1),
+            "valid_pixel_roi_right": tuple(int(v) for v in validPixROI2),
+            "image_size": image_size,
+            "image_pairs": [(record["left_path"], record["right_path"]) for record in stereo_pairs],
+            # Positions of the solved pairs among all matched pairs (records keep pair order)
+            "image_pair_indices": [i for i, record in enumerate(records) if record["found"]]
+        })
     
     stereo_calibration_data = {
         'left_camera_matrix': left_mtx.tolist(),
@@ -223,19 +609,10 @@ def calibrate_stereo_cameras(left_images_path, right_images_path, checkerboard_s
     with open('stereo_calibration_data.json', 'w') as f:
         json.dump(stereo_calibration_data, f)
     
-    mean_error = 0
-    reprojection_errors = []
-    for i in range(len(objpoints)):
-        imgpoints2, _ = cv2.projectPoints(objpoints[i], left_rvecs[i], left_tvecs[i], left_mtx, left_dist)
-        error = cv2.norm(left_imgpoints[i], imgpoints2, cv2.NORM_L2) / len(imgpoints2)
-        mean_error += error
-        reprojection_errors.append(error)
-        
-        imgpoints2, _ = cv2.projectPoints(objpoints[i], right_rvecs[i], right_tvecs[i], right_mtx, right_dist)
-        error = cv2.norm(right_imgpoints[i], imgpoints2, cv2.NORM_L2) / len(imgpoints2)
-        mean_error += error
-        reprojection_errors.append(error)
-    
-    mean_error = mean_error / (2 * len(objpoints))
+    # Errors alternate left/right per stereo pair
+    left_errors = holdout_errors(objpoints, left_imgpoints, left_mtx, left_dist, "Standard")
+    right_errors = holdout_errors(objpoints, right_imgpoints, right_mtx, right_dist, "Standard")
+    reprojection_errors = np.column_stack([left_errors, right_errors]).ravel()
+    mean_error = reprojection_errors.mean()
     
     return left_mtx, right_mtx, left_dist, right_dist, R, T, mean_error, reprojection_errors, left_images_with_detections, right_images_with_detections, left_rvecs, left_tvecs, right_rvecs, right_tvecs, objpoints
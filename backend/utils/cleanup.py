@@ -3,6 +3,7 @@ import shutil
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from ..database import SessionLocal, Session as DbSession
+from . import preview_cache
 
 def cleanup_old_sessions(hours_old: int = 24):
     """
@@ -79,7 +80,29 @@ def cleanup_orphaned_files():
     finally:
         db.close()
 
+def cleanup_preview_caches():
+    """
+    Trim the rendered-preview cache of every live session to its size limit.
+    (Deleting a session removes its previews along with its images.)
+    """
+    db = SessionLocal()
+    try:
+        removed_count = 0
+        for session in db.query(DbSession).all():
+            if session.images_dir and os.path.isdir(session.images_dir):
+                removed_count += preview_cache.trim(session.images_dir)
+
+        print(f"Preview cache cleanup completed: Removed {removed_count} cached previews")
+        return removed_count
+
+    except Exception as e:
+        print(f"Error during preview cache cleanup: {e}")
+        return 0
+    finally:
+        db.close()
+
 if __name__ == "__main__":
     print("Running cleanup tasks...")
     cleanup_old_sessions(24)
     cleanup_orphaned_files()
+    cleanup_preview_caches()
@@ -0,0 +1,131 @@
+"""
+Coverage of the image by detected calibration points.
+
+Points of all views are classified against the center, corner and edge
+regions with NumPy masks over the whole point set at once. The coverage
+heatmap is built at grid resolution: points are binned into a 2D histogram
+a few bins per grid cell and blurred with a separable Gaussian, instead of
+summing a full-resolution Gaussian per point.
+"""
+
+import cv2
+import numpy as np
+
+from ..config import COVERAGE_HEATMAP_GRID_SIZE
+
+# Histogram bins per grid cell side
+HEATMAP_OVERSAMPLING = 8
+# Largest heatmap grid a client may ask for
+MAX_HEATMAP_GRID_SIZE = 200
+
+def analyze_coverage(imgpoints, image_shape):
+    """
+    Analyze how well the calibration pattern covers different regions of the image
+    """
+    h, w = image_shape
+
+    # Define regions
+    center_region = (w*0.25, h*0.25, w*0.75, h*0.75)
+
+    # Corners
+    corner_regions = [
+        (0, 0, w*0.3, h*0.3),  # Top-left
+        (w*0.7, 0, w, h*0.3),  # Top-right
+        (0, h*0.7, w*0.3, h),  # Bottom-left
+        (w*0.7, h*0.7, w, h)   # Bottom-right
+    ]
+
+    # Edges
+    edge_regions = [
+        (w*0.3, 0, w*0.7, h*0.2),  # Top edge
+        (w*0.3, h*0.8, w*0.7, h),  # Bottom edge
+        (0, h*0.3, w*0.2, h*0.7),  # Left edge
+        (w*0.8, h*0.3, w, h*0.7)   # Right edge
+    ]
+
+    # Flatten all image points. Compare in float64, as per-point comparisons
+    # of float32 scalars with the Python float bounds did
+    all_points = np.vstack([pts.reshape(-1, 2) for pts in imgpoints]).astype(np.float64)
+    x, y = all_points[:, 0], all_points[:, 1]
+
+    def in_regions(regions):
+        # Points inside any of the regions (bounds inclusive), counted once
+        inside = np.zeros(len(all_points), dtype=bool)
+        for x_min, y_min, x_max, y_max in regions:
+            inside |= (x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)
+        return int(np.count_nonzero(inside))
+
+    # Count points in each region
+    center_coverage = in_regions([center_region])
+    corner_coverage = in_regions(corner_regions)
+    edge_coverage = in_regions(edge_regions)
+
+    total_points = len(all_points)
+
+    return {
+        "center_coverage": center_coverage / total_points if total_points > 0 else 0,
+        "corner_coverage": corner_coverage / total_points if total_points > 0 else 0,
+        "edge_coverage": edge_coverage / total_points if total_points > 0 else 0,
+        "coverage_score": (center_coverage + corner_coverage + edge_coverage) / (3 * total_points) if total_points > 0 else 0
+    }
+
+def create_coverage_heatmap(imgpoints, image_shape, grid_size=None, oversampling=HEATMAP_OVERSAMPLING):
+    """
+    Create a heatmap showing where calibration points are concentrated, as
+    a `grid_size` x `grid_size` grid (default COVERAGE_HEATMAP_GRID_SIZE,
+    capped at MAX_HEATMAP_GRID_SIZE and the image size) of values
+    normalized to a maximum of 1.
+
+    Each point contributes a Gaussian with sigma 5% of the smaller image
+    side. The sum is evaluated on a histogram `oversampling` bins per cell
+    side rather than per pixel, so the cost no longer grows with the image
+    and point count multiplied together.
+    """
+    h, w = image_shape
+    # Cells at least a pixel wide, and no more than MAX_HEATMAP_GRID_SIZE per side
+    grid_size = max(1, min(grid_size or COVERAGE_HEATMAP_GRID_SIZE, MAX_HEATMAP_GRID_SIZE, h, w))
+
+    # Cells are whole pixel blocks; leftover rows and columns fall outside the grid
+    h_step = max(h // grid_size, 1)
+    w_step = max(w // grid_size, 1)
+    bin_h = h_step / oversampling
+    bin_w = w_step / oversampling
+    rows = int(np.ceil(h / bin_h))
+    cols = int(np.ceil(w / bin_w))
+
+    # Histogram of the points' pixel positions, each point split bilinearly
+    # between the four nearest bin centres so positions are not snapped
+    all_points = np.vstack([pts.reshape(-1, 2) for pts in imgpoints])
+    x = all_points[:, 0].astype(np.int64)
+    y = all_points[:, 1].astype(np.int64)
+    inside = (x >= 0) & (x < w) & (y >= 0) & (y < h)
+    u = (x[inside] + 0.5) / bin_w - 0.5
+    v = (y[inside] + 0.5) / bin_h - 0.5
+    col, row = np.floor(u).astype(np.int64), np.floor(v).astype(np.int64)
+    fu, fv = u - col, v - row
+    # One bin of padding on each side for the neighbours of edge points
+    padded_rows, padded_cols = rows + 2, cols + 2
+    histogram = np.zeros(padded_rows * padded_cols, dtype=np.float64)
+    for dr, dc, weight in ((0, 0, (1 - fv) * (1 - fu)), (0, 1, (1 - fv) * fu), (1, 0, fv * (1 - fu)), (1, 1, fv * fu)):
+        index = (row + dr + 1) * padded_cols + (col + dc + 1)
+        histogram += np.bincount(index, weights=weight, minlength=padded_rows * padded_cols)
+    histogram = histogram.reshape(padded_rows, padded_cols).astype(np.float32)
+
+    # Separable Gaussian, sigma in bins; nothing outside the image contributes
+    sigma = min(h, w) * 0.05  # 5% of image dimension
+    kernels = []
+    for bin_size in (bin_w, bin_h):
+        sigma_bins = max(sigma / bin_size, 1e-3)
+        kernels.append(cv2.getGaussianKernel(2 * int(np.ceil(4 * sigma_bins)) + 1, sigma_bins, cv2.CV_32F))
+    heatmap = cv2.sepFilter2D(histogram, cv2.CV_32F, kernels[0], kernels[1], borderType=cv2.BORDER_CONSTANT)[1:-1, 1:-1]
+
+    # Normalize heatmap
+    if heatmap.max() > 0:
+        heatmap = heatmap / heatmap.max()
+
+    # Average the bins of each grid cell
+    size = grid_size * oversampling
+    cells = heatmap[:size, :size]
+    cells = np.pad(cells, ((0, size - cells.shape[0]), (0, size - cells.shape[1])))
+    cells = cells.reshape(grid_size, oversampling, grid_size, oversampling).mean(axis=(1, 3))
+    return [[float(value) for value in row] for row in cells]
@@ -0,0 +1,492 @@
+import cv2
+import numpy as np
+import os
+import glob
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ..config import DETECTION_WORKERS, PYRAMID_MIN_SIZE, PYRAMID_TARGET_SIZE
+from . import detection_cache
+from .image_io import decode_gray, read_color
+from .patterns import get_aruco_detector, get_charuco_board, get_charuco_corners, get_object_points
+
+def resolve_workers(workers=None, num_images=None):
+    """
+    Resolve the number of detection worker processes to use.
+    0 or None means one worker per CPU core.
+    """
+    if workers is None:
+        workers = DETECTION_WORKERS
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    if num_images is not None:
+        workers = min(workers, num_images)
+    return max(workers, 1)
+
+def process_pool(workers, initializer=None, initargs=()):
+    """
+    Process pool for CPU-bound work. Pools are created from job-queue and
+    request threads, and forking a multi-threaded process can copy locks held
+    by other threads (SQLite, logging, OpenCV) into the children, so workers
+    are started from a forkserver (spawn where that is unavailable) instead.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(method),
+        initializer=initializer,
+        initargs=initargs
+    )
+
+def find_chessboard_corners(gray, checkerboard_size, pyramid_min_size=None):
+    """
+    Find checkerboard corners and refine them to sub-pixel accuracy.
+
+    Images whose longer side is at least `pyramid_min_size` pixels are searched
+    on a downscaled pyramid level first. The corner estimates are then scaled
+    back up and cornerSubPix runs only around them on the full-resolution image.
+    A `pyramid_min_size` of 0 always searches at full resolution.
+    """
+    if pyramid_min_size is None:
+        pyramid_min_size = PYRAMID_MIN_SIZE
+
+    checkerboard_size = (checkerboard_size[0], checkerboard_size[1])
+    term = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 30, 0.1)
+
+    levels = 0
+    search = gray
+    if pyramid_min_size > 0 and max(gray.shape) >= pyramid_min_size:
+        while max(search.shape) > PYRAMID_TARGET_SIZE:
+            search = cv2.pyrDown(search)
+            levels += 1
+
+    found, corners = cv2.findChessboardCorners(search, checkerboard_size)
+    if not found:
+        return found, corners
+
+    if levels > 0:
+        # pyrDown pixel i is centred on pixel 2i of the level above
+        cv2.cornerSubPix(search, corners, (3, 3), (-1, -1), term)
+        scale = 2 ** levels
+        corners *= scale
+        # Wide enough to absorb the coarse level's quantisation before the final pass
+        coarse_window = scale + 1
+        if coarse_window > 5:
+            cv2.cornerSubPix(gray, corners, (coarse_window, coarse_window), (-1, -1), term)
+
+    cv2.cornerSubPix(gray, corners, (5, 5), (-1, -1), term)
+    return found, corners
+
+def draw_detection(img, detection, pattern_type, checkerboard_size, scale=1.0):
+    """
+    Draw a detection result onto a copy of the image, which may have been
+    resized by `scale` relative to the image the detection came from
+    """
+    if not detection["found"]:
+        return img
+
+    img_points = np.asarray(detection["img_points"], dtype=np.float32) * scale
+
+    if pattern_type == 'Checkerboard':
+        corners = img_points.reshape(-1, 1, 2)
+        return cv2.drawChessboardCorners(img.copy(), (checkerboard_size[0], checkerboard_size[1]), corners, True)
+
+    marker_corners = tuple(corners * scale for corners in np.asarray(detection["marker_corners"], dtype=np.float32))
+    img_with_detections = cv2.aruco.drawDetectedMarkers(img.copy(), marker_corners, detection["marker_ids"])
+    return cv2.aruco.drawDetectedCornersCharuco(img_with_detections, img_points, detection["charuco_ids"])
+
+def render_detection(detection, pattern_type, checkerboard_size, max_size=None):
+    """
+    Load a detection's image and draw the detected pattern on it, at most
+    `max_size` pixels on the longer side. Returns None if the image is gone.
+    """
+    img = read_color(detection["path"], max_size)
+    if img is None:
+        return None
+    scale = img.shape[1] / detection["image_size"][0]
+    return draw_detection(img, detection, pattern_type, checkerboard_size, scale)
+
+def detection_summary(detection):
+    """
+    JSON-serializable summary of a detection record (corner positions
+    rounded to 1/100 px), for streaming per-image results to clients
+    """
+    summary = {
+        "image_name": os.path.basename(detection["path"]),
+        "found": bool(detection["found"]),
+        "image_size": [int(v) for v in detection["image_size"]],
+        "corners": [],
+        "charuco_ids": None,
+        "cached": detection["cached"],
+        "elapsed": detection["elapsed"]
+    }
+    if detection["found"]:
+        summary["corners"] = np.round(np.reshape(detection["img_points"], (-1, 2)).astype(np.float64), 2).tolist()
+        if detection["charuco_ids"] is not None:
+            summary["charuco_ids"] = np.ravel(detection["charuco_ids"]).tolist()
+    return summary
+
+def _find_pattern(gray, checkerboard_size, square_size, pattern_type, marker_size=None, aruco_dict_name=None, pyramid_min_size=None):
+    detection = {
+        "found": False,
+        "img_points": None,
+        "obj_points": None,
+        "marker_corners": None,
+        "marker_ids": None,
+        "charuco_ids": None,
+        "image_size": gray.shape[::-1]
+    }
+
+    if pattern_type == 'Checkerboard':
+        checkerboard_size = (checkerboard_size[0], checkerboard_size[1])
+        found, corners = find_chessboard_corners(gray, checkerboard_size, pyramid_min_size)
+
+        if found:
+            detection["found"] = True
+            detection["img_points"] = corners.reshape(-1, 2)
+            detection["obj_points"] = get_object_points(checkerboard_size[0], checkerboard_size[1], square_size)
+
+    elif pattern_type == 'ChArUcoboard':
+        pattern = (checkerboard_size[0], checkerboard_size[1], square_size, marker_size, aruco_dict_name)
+        board = get_charuco_board(*pattern)
+
+        corners, ids, _ = get_aruco_detector(aruco_dict_name).detectMarkers(gray)
+        if ids is not None and len(corners) > 0:
+            _, charuco_corners, charuco_ids = cv2.aruco.interpolateCornersCharuco(corners, ids, gray, board)
+            if charuco_corners is not None and charuco_ids is not None and len(charuco_corners) > 3:
+                detection["found"] = True
+                detection["img_points"] = charuco_corners
+                detection["obj_points"] = get_charuco_corners(*pattern)[charuco_ids.flatten()]
+                detection["marker_corners"] = np.array(corners)
+                detection["marker_ids"] = ids
+                detection["charuco_ids"] = charuco_ids
+
+    return detection
+
+def detect_pattern(fname, checkerboard_size, square_size, pattern_type, marker_size=None, aruco_dict_name=None, use_cache=True, pyramid_min_size=None):
+    """
+    Detect the calibration pattern in a single image file.
+
+    Returns a compact per-image record (path, found flag, corners, ids and
+    image size), or None if the image could not be read. The image points
+    and object points use the same layout calibrate_camera has always fed
+    to cv2.calibrateCamera. Results are looked up in and stored to the
+    shared detection cache by image content hash. Use render_detection to
+    draw a record when an annotated image is actually needed.
+    """
+    start = time.perf_counter()
+
+    try:
+        with open(fname, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    if pyramid_min_size is None:
+        pyramid_min_size = PYRAMID_MIN_SIZE
+
+    detection = None
+    cache_key = None
+    if use_cache:
+        cache_key = detection_cache.make_key(
+            detection_cache.content_hash(data), checkerboard_size, square_size,
+            pattern_type, marker_size, aruco_dict_name,
+            detector={"pyramid_min_size": pyramid_min_size, "pyramid_target_size": PYRAMID_TARGET_SIZE}
+        )
+        detection = detection_cache.get(cache_key)
+
+    cached = detection is not None
+    if not cached:
+        gray = decode_gray(data)
+        if gray is None:
+            return None
+        detection = _find_pattern(gray, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name, pyramid_min_size)
+        if cache_key is not None:
+            detection_cache.put(cache_key, detection)
+
+    detection["path"] = fname
+    detection["cached"] = cached
+    detection["elapsed"] = time.perf_counter() - start
+    return detection
+
+def _init_detection_worker():
+    # Each worker handles one image at a time; keep OpenCV from spawning
+    # its own thread pool inside every process.
+    cv2.setNumThreads(1)
+
+def _detect_pattern_task(args):
+    return detect_pattern(*args)
+
+def detect_files(images, checkerboard_size, square_size, pattern_type, marker_size=None, aruco_dict_name=None, workers=None, use_cache=True, pyramid_min_size=None, progress=None):
+    """
+    Run pattern detection on a list of image files.
+
+    Images are fanned out across a process pool and the results are merged
+    back in input order, so the output is identical to detecting the images
+    one after another. Returns one entry per image, None for unreadable
+    images. `progress` is called as for detect_images.
+    """
+    if not images:
+        return []
+
+    tasks = [
+        (fname, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name, use_cache, pyramid_min_size)
+        for fname in images
+    ]
+    workers = resolve_workers(workers, len(images))
+
+    start = time.perf_counter()
+    results = []
+    executor = None
+    try:
+        if workers == 1:
+            outputs = map(_detect_pattern_task, tasks)
+        else:
+            executor = process_pool(workers, _init_detection_worker)
+            outputs = executor.map(_detect_pattern_task, tasks)
+        for result in outputs:
+            results.append(result)
+            if progress is not None:
+                progress(len(results), len(tasks), result)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    elapsed = time.perf_counter() - start
+
+    detections = [result for result in results if result is not None]
+    found = sum(1 for detection in detections if detection["found"])
+    cached = sum(1 for detection in detections if detection["cached"])
+    print(f"Detected patterns in {found}/{len(images)} images in {elapsed:.2f}s using {workers} worker(s), {cached} from cache")
+
+    return results
+
+def detect_images(images_path, checkerboard_size, square_size, pattern_type, marker_size=None, aruco_dict_name=None, workers=None, use_cache=True, pyramid_min_size=None, progress=None):
+    """
+    Run pattern detection on every image in a directory.
+
+    Images are fanned out across a process pool and the results are merged
+    back in sorted filename order, so the output is identical to detecting
+    the images one after another. Unreadable images are dropped.
+
+    `progress(done, total, detection)` is called as each image's result
+    arrives, in order (detection is None for unreadable images). If it
+    raises, detection stops and queued images are not processed.
+    """
+    images = sorted(glob.glob(os.path.join(images_path, '*')))
+    results = detect_files(
+        images, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name,
+        workers, use_cache, pyramid_min_size, progress
+    )
+    return [result for result in results if result is not None]
+
+def detect_camera_images(images_paths, checkerboard_size, square_size, pattern_type, marker_size=None, aruco_dict_name=None, workers=None, use_cache=True, pyramid_min_size=None, progress=None):
+    """
+    Detect the pattern in the images of several cameras (one directory
+    each) in a single process pool, so every image is detected exactly once
+    and all cameras share the `workers` budget. Returns one detect_images
+    style list per camera.
+    """
+    per_camera = [sorted(glob.glob(os.path.join(path, '*'))) for path in images_paths]
+    results = detect_files(
+        [image for images in per_camera for image in images], checkerboard_size, square_size,
+        pattern_type, marker_size, aruco_dict_name, workers, use_cache, pyramid_min_size, progress
+    )
+    detections = []
+    offset = 0
+    for images in per_camera:
+        detections.append([result for result in results[offset:offset + len(images)] if result is not None])
+        offset += len(images)
+    return detections
+
+# Default name pairing key: the last run of digits in the file name
+PAIR_KEY_PATTERN = r"(\d+)(?!.*\d)"
+
+def _pair_key(path, pattern):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    match = re.search(pattern, stem)
+    if match is None:
+        return None
+    key = match.group(1) if match.groups() else match.group(0)
+    return (0, int(key), key) if key.isdigit() else (1, 0, key)
+
+def match_image_pairs(left_images, right_images, pair_by="index", pair_pattern=None):
+    """
+    Pair left and right image files.
+
+    "index" pairs the n-th files of both (sorted) lists. "name" pairs files
+    whose names share a key, extracted with the regex `pair_pattern` (its
+    first group, default: the last number in the name, so left_012.png and
+    right_012.png pair up); pairs are ordered by key. Returns the pairs and
+    the left and right files that found no partner.
+    """
+    left_images = sorted(left_images)
+    right_images = sorted(right_images)
+
+    if pair_by == "index":
+        count = min(len(left_images), len(right_images))
+        return list(zip(left_images[:count], right_images[:count])), left_images[count:], right_images[count:]
+
+    if pair_by != "name":
+        raise ValueError(f"Unknown pairing mode: {pair_by}")
+
+    pattern = pair_pattern or PAIR_KEY_PATTERN
+    right_by_key = {}
+    for path in right_images:
+        key = _pair_key(path, pattern)
+        if key is not None:
+            right_by_key.setdefault(key, path)
+
+    pairs = []
+    unmatched_left = []
+    for path in left_images:
+        key = _pair_key(path, pattern)
+        if key is not None and key in right_by_key:
+            pairs.append((key, path, right_by_key.pop(key)))
+        else:
+            unmatched_left.append(path)
+    pairs.sort(key=lambda pair: pair[0])
+    matched_right = {right for _, _, right in pairs}
+    unmatched_right = [path for path in right_images if path not in matched_right]
+    return [(left, right) for _, left, right in pairs], unmatched_left, unmatched_right
+
+def match_image_frames(image_lists, pair_by="index", pair_pattern=None):
+    """
+    Group the image files of several cameras into frames taken at the same
+    moment, matched like match_image_pairs. Returns a list of frames, each a
+    list with one path (or None where that camera has no image) per camera,
+    keeping only frames seen by at least two cameras.
+    """
+    image_lists = [sorted(images) for images in image_lists]
+
+    if pair_by == "index":
+        count = max((len(images) for images in image_lists), default=0)
+        frames = [[images[i] if i < len(images) else None for images in image_lists] for i in range(count)]
+    elif pair_by == "name":
+        pattern = pair_pattern or PAIR_KEY_PATTERN
+        by_key = {}
+        for camera, images in enumerate(image_lists):
+            for path in images:
+                key = _pair_key(path, pattern)
+                if key is not None:
+                    frame = by_key.setdefault(key, [None] * len(image_lists))
+                    if frame[camera] is None:
+                        frame[camera] = path
+        frames = [by_key[key] for key in sorted(by_key)]
+    else:
+        raise ValueError(f"Unknown pairing mode: {pair_by}")
+
+    return [frame for frame in frames if sum(path is not None for path in frame) >= 2]
+
+def common_pair_points(left, right):
+    """
+    Object points and left/right image points of a pair's shared corners:
+    every corner for checkerboards, the ChArUco ids seen in both views for
+    ChArUco boards. None if fewer than 4 corners are shared.
+    """
+    if left["charuco_ids"] is None or right["charuco_ids"] is None:
+        if len(left["img_points"]) != len(right["img_points"]):
+            return None
+        return left["obj_points"], left["img_points"], right["img_points"]
+
+    left_ids = np.ravel(left["charuco_ids"])
+    right_ids = np.ravel(right["charuco_ids"])
+    common = np.intersect1d(left_ids, right_ids)
+    if len(common) < 4:
+        return None
+    left_mask = np.isin(left_ids, common)
+    right_mask = np.isin(right_ids, common)
+    # Sort both sides by id so their corners line up
+    left_order = np.argsort(left_ids[left_mask], kind="stable")
+    right_order = np.argsort(right_ids[right_mask], kind="stable")
+    return (
+        np.asarray(left["obj_points"])[left_mask][left_order],
+        np.asarray(left["img_points"])[left_mask][left_order],
+        np.asarray(right["img_points"])[right_mask][right_order]
+    )
+
+def detect_pair(left_path, right_path, checkerboard_size, square_size, pattern_type, marker_size=None, aruco_dict_name=None, use_cache=True, pyramid_min_size=None):
+    """
+    Detect the pattern in a left/right image pair as one unit. The right
+    image is skipped when the left one is unreadable or has no pattern.
+    Returns a pair record: both detections (None if not attempted or
+    unreadable), whether the pair is usable and its shared points.
+    """
+    args = (checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name, use_cache, pyramid_min_size)
+    left = detect_pattern(left_path, *args)
+    right = None
+    if left is not None and left["found"]:
+        right = detect_pattern(right_path, *args)
+
+    record = {
+        "left_path": left_path,
+        "right_path": right_path,
+        "left": left,
+        "right": right,
+        "found": False,
+        "obj_points": None,
+        "left_points": None,
+        "right_points": None
+    }
+    if right is not None and right["found"]:
+        shared = common_pair_points(left, right)
+        if shared is not None:
+            record["found"] = True
+            record["obj_points"], record["left_points"], record["right_points"] = shared
+    return record
+
+def _detect_pair_task(args):
+    return detect_pair(*args)
+
+def detect_image_pairs(pairs, checkerboard_size, square_size, pattern_type, marker_size=None, aruco_dict_name=None, workers=None, use_cache=True, pyramid_min_size=None, progress=None):
+    """
+    Run pair detection (see detect_pair) on (left path, right path) pairs.
+
+    Pairs are fanned out across a process pool and returned in input order.
+    `progress(done, total, record)` is called as each pair's result arrives,
+    in order. If it raises, detection stops and queued pairs are not
+    processed.
+    """
+    if not pairs:
+        return []
+
+    tasks = [
+        (left, right, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name, use_cache, pyramid_min_size)
+        for left, right in pairs
+    ]
+    workers = resolve_workers(workers, len(pairs))
+
+    start = time.perf_counter()
+    records = []
+    executor = None
+    try:
+        if workers == 1:
+            outputs = map(_detect_pair_task, tasks)
+        else:
+            executor = process_pool(workers, _init_detection_worker)
+            outputs = executor.map(_detect_pair_task, tasks)
+        for record in outputs:
+            records.append(record)
+            if progress is not None:
+                progress(len(records), len(tasks), record)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    elapsed = time.perf_counter() - start
+
+    found = sum(1 for record in records if record["found"])
+    skipped = sum(1 for record in records if record["right"] is None)
+    print(f"Detected patterns in {found}/{len(pairs)} image pairs in {elapsed:.2f}s using {workers} worker(s), "
+          f"{skipped} right images skipped")
+
+    return records
+
+def pair_summary(record):
+    """JSON-serializable summary of a pair record, for streaming per-pair results to clients"""
+    return {
+        "left": detection_summary(record["left"]) if record["left"] is not None else None,
+        "right": detection_summary(record["right"]) if record["right"] is not None else None,
+        "found": record["found"],
+        "shared_corners": len(record["obj_points"]) if record["found"] else 0
+    }
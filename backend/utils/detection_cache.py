@@ -0,0 +1,147 @@
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+from ..config import DETECTION_CACHE_PATH, DETECTION_CACHE_MAX_BYTES
+
+# Bump whenever detection output changes so stale entries are never reused
+DETECTOR_VERSION = 2
+
+_ARRAY_FIELDS = ("img_points", "obj_points", "marker_corners", "marker_ids", "charuco_ids")
+
+_lock = threading.Lock()
+_connection = None
+
+def _reset_after_fork():
+    # Never carry a connection (or a held lock) into a forked worker
+    global _lock, _connection
+    _lock = threading.Lock()
+    _connection = None
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _connect():
+    """
+    Open (or reuse) this process's connection to the cache database.
+
+    SQLite in WAL mode lets every uvicorn worker and detection process share
+    the same file.
+    """
+    global _connection
+
+    if _connection is None:
+        os.makedirs(os.path.dirname(os.path.abspath(DETECTION_CACHE_PATH)), exist_ok=True)
+        connection = sqlite3.connect(DETECTION_CACHE_PATH, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS detections ("
+            "key TEXT PRIMARY KEY, payload BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_detections_last_access ON detections (last_access)")
+        connection.commit()
+        _connection = connection
+
+    return _connection
+
+def content_hash(data):
+    """Hash raw image file bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+def make_key(digest, checkerboard_size, square_size, pattern_type, marker_size=None, aruco_dict_name=None, detector=None):
+    """
+    Build the cache key for an image hash, a set of pattern parameters and
+    any detector settings that change the result
+    """
+    params = {
+        "version": DETECTOR_VERSION,
+        "pattern_type": pattern_type,
+        "columns": int(checkerboard_size[0]),
+        "rows": int(checkerboard_size[1]),
+        "square_size": float(square_size),
+        "marker_size": float(marker_size) if marker_size is not None else None,
+        "aruco_dict_name": aruco_dict_name,
+        "detector": detector or {}
+    }
+    return digest + ":" + hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+def _serialize(record):
+    arrays = {field: record[field] for field in _ARRAY_FIELDS if record.get(field) is not None}
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        found=np.array(record["found"]),
+        image_size=np.array(record["image_size"]),
+        **arrays
+    )
+    return buffer.getvalue()
+
+def _deserialize(payload):
+    with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+        record = {field: data[field] if field in data else None for field in _ARRAY_FIELDS}
+        record["found"] = bool(data["found"])
+        record["image_size"] = tuple(int(v) for v in data["image_size"])
+    return record
+
+def get(key):
+    """
+    Look up a cached detection. Returns None on a miss or if the cache is unavailable.
+    """
+    try:
+        with _lock:
+            connection = _connect()
+            row = connection.execute("SELECT payload FROM detections WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE detections SET last_access = ? WHERE key = ?", (time.time(), key))
+            connection.commit()
+        return _deserialize(row[0])
+    except (sqlite3.Error, OSError, ValueError, KeyError) as e:
+        print(f"Detection cache read failed: {e}")
+        return None
+
+def put(key, record):
+    """
+    Store a detection and evict least recently used entries past the size limit
+    """
+    try:
+        payload = _serialize(record)
+        with _lock:
+            connection = _connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO detections (key, payload, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, len(payload), time.time())
+            )
+            _evict(connection)
+            connection.commit()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Detection cache write failed: {e}")
+
+def _evict(connection):
+    total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM detections").fetchone()[0]
+    if total <= DETECTION_CACHE_MAX_BYTES:
+        return
+
+    # Trim to 90% of the limit so we don't evict on every insert
+    target = total - int(DETECTION_CACHE_MAX_BYTES * 0.9)
+    freed = 0
+    stale = []
+    for key, size in connection.execute("SELECT key, size FROM detections ORDER BY last_access ASC"):
+        stale.append((key,))
+        freed += size
+        if freed >= target:
+            break
+    connection.executemany("DELETE FROM detections WHERE key = ?", stale)
+
+def clear():
+    """Remove every cached detection"""
+    with _lock:
+        connection = _connect()
+        connection.execute("DELETE FROM detections")
+        connection.commit()
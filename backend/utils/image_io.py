@@ -0,0 +1,138 @@
+"""
+Central image loading.
+
+Decode straight to grayscale when colour isn't needed, use libjpeg's
+reduced-size decoding for previews, and read image dimensions from the file
+header without decoding any pixels.
+"""
+
+import struct
+import cv2
+import numpy as np
+
+_REDUCED_COLOR_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2)
+)
+
+def decode_gray(data):
+    """Decode encoded image bytes straight to a single-channel image"""
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+
+def decode_color(data):
+    """Decode encoded image bytes to a BGR image"""
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+def read_gray(path):
+    """Read an image file straight to a single-channel image (None if unreadable)"""
+    return cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+
+def scale_to_max_size(img, max_size=None):
+    """
+    Downscale an image so its longer side is at most `max_size` pixels.
+    Returns the (possibly unchanged) image and the scale factor applied.
+    """
+    if not max_size or max(img.shape[:2]) <= max_size:
+        return img, 1.0
+    scale = max_size / max(img.shape[:2])
+    return cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA), scale
+
+def read_color(path, max_size=None):
+    """
+    Read an image file as BGR, at most `max_size` pixels on the longer side.
+
+    When a size limit is given, the file is decoded at 1/2, 1/4 or 1/8 scale
+    where the result is still large enough, which for JPEG skips most of the
+    decode work, and is then resized to the exact limit.
+    """
+    flag = cv2.IMREAD_COLOR
+    if max_size:
+        size = read_image_size(path)
+        if size is not None:
+            for factor, reduced_flag in _REDUCED_COLOR_FLAGS:
+                if max(size) / factor >= max_size:
+                    flag = reduced_flag
+                    break
+
+    img = cv2.imread(path, flag)
+    if img is None:
+        return None
+    img, _ = scale_to_max_size(img, max_size)
+    return img
+
+def read_image_size(path):
+    """
+    Read (width, height) of an image file.
+
+    PNG, JPEG and BMP dimensions come from the file header (JPEG EXIF
+    orientation included, matching what cv2.imread returns); anything else
+    falls back to a grayscale decode. Returns None if the file is unreadable.
+    """
+    try:
+        with open(path, 'rb') as f:
+            size = _parse_header_size(f)
+    except (OSError, struct.error, ValueError):
+        size = None
+
+    if size is None:
+        img = read_gray(path)
+        if img is None:
+            return None
+        size = img.shape[::-1]
+    return size
+
+def _parse_header_size(f):
+    head = f.read(26)
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+        width, height = struct.unpack('>II', head[16:24])
+        return width, height
+    if head.startswith(b'BM'):
+        width, height = struct.unpack('<ii', head[18:26])
+        return width, abs(height)
+    if head.startswith(b'\xff\xd8'):
+        f.seek(2)
+        return _parse_jpeg_size(f)
+    return None
+
+def _parse_jpeg_size(f):
+    orientation = 1
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:
+            # Fill byte; the marker code follows
+            f.seek(-1, 1)
+            continue
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        length = struct.unpack('>H', f.read(2))[0]
+        if code == 0xE1:
+            orientation = _parse_exif_orientation(f.read(length - 2)) or orientation
+            continue
+        # SOF0-SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>xHH', f.read(5))
+            # Orientations 5-8 rotate the image by 90 degrees on decode
+            if orientation >= 5:
+                return height, width
+            return width, height
+        f.seek(length - 2, 1)
+
+def _parse_exif_orientation(segment):
+    if not segment.startswith(b'Exif\x00\x00'):
+        return None
+    tiff = segment[6:]
+    endian = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+    if endian is None:
+        return None
+    ifd_offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+    count = struct.unpack(endian + 'H', tiff[ifd_offset:ifd_offset + 2])[0]
+    for i in range(count):
+        entry = tiff[ifd_offset + 2 + 12 * i:ifd_offset + 14 + 12 * i]
+        tag, _, _, value = struct.unpack(endian + 'HHIH', entry[:10])
+        if tag == 0x0112:
+            return value
+    return None
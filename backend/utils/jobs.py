@@ -0,0 +1,252 @@
+"""
+Background job queue for long-running calibration work.
+
+Jobs run on a bounded thread pool (OpenCV releases the GIL, and detection
+fans out to its own process pool), so the event loop stays free for uploads,
+health checks and live frames. Each job gets its own database session and a
+`progress(stage, percent, event=None, **data)` callback; calling it is also
+the job's cancellation point. Every call is appended to the job's event log,
+which clients can follow (see get_events). Job state is kept in memory and
+is per process.
+"""
+
+import asyncio
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from ..config import JOB_WORKERS, JOB_MAX_PENDING, JOB_TTL_SECONDS
+from ..database import SessionLocal
+from .detection import detection_summary, pair_summary
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+class JobCancelled(Exception):
+    """Raised inside a job by its progress callback once it has been cancelled"""
+
+class JobQueueFull(Exception):
+    """Raised on submit when JOB_MAX_PENDING jobs are already queued or running"""
+
+_executor = ThreadPoolExecutor(max_workers=max(JOB_WORKERS, 1), thread_name_prefix="calibration-job")
+_lock = threading.Lock()
+_jobs = {}  # job id -> public job state
+_futures = {}  # job id -> concurrent.futures.Future
+_cancel_events = {}  # job id -> threading.Event
+_events = {}  # job id -> list of progress events, in order
+
+def _prune(now):
+    """Forget finished jobs older than JOB_TTL_SECONDS (caller holds _lock)"""
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job["status"] in FINISHED_STATUSES and now - job["finished_at"] > JOB_TTL_SECONDS
+    ]
+    for job_id in expired:
+        del _jobs[job_id]
+        _futures.pop(job_id, None)
+        _cancel_events.pop(job_id, None)
+        _events.pop(job_id, None)
+
+def _publish(job_id, event, **data):
+    """Append an event to a job's log (caller holds _lock)"""
+    job = _jobs[job_id]
+    events = _events[job_id]
+    events.append(dict(
+        data, seq=len(events), event=event, status=job["status"],
+        stage=job["stage"], percent=job["percent"], time=time.time()
+    ))
+
+def _update(job_id, event=None, **changes):
+    with _lock:
+        job = _jobs[job_id]
+        job.update(changes)
+        if event is not None:
+            _publish(job_id, event, error=job["error"])
+
+def _run(job_id, func, args):
+    cancel_event = _cancel_events[job_id]
+
+    def progress(stage, percent=None, event=None, **data):
+        if cancel_event.is_set():
+            raise JobCancelled()
+        with _lock:
+            job = _jobs[job_id]
+            job["stage"] = stage
+            if percent is not None:
+                job["percent"] = round(float(percent), 1)
+            _publish(job_id, event or "progress", **data)
+
+    if cancel_event.is_set():
+        _update(job_id, event="cancelled", status="cancelled", finished_at=time.time())
+        raise JobCancelled()
+
+    _update(job_id, event="started", status="running", started_at=time.time())
+    db = SessionLocal()
+    try:
+        result = func(*args, db=db, progress=progress)
+    except JobCancelled:
+        db.rollback()
+        _update(job_id, event="cancelled", status="cancelled", finished_at=time.time())
+        raise
+    except HTTPException as e:
+        db.rollback()
+        _update(job_id, event="failed", status="failed", error=e.detail, status_code=e.status_code, finished_at=time.time())
+        raise
+    except Exception as e:
+        db.rollback()
+        traceback.print_exc()
+        _update(job_id, event="failed", status="failed", error=str(e), status_code=500, finished_at=time.time())
+        raise
+    finally:
+        db.close()
+
+    _update(job_id, event="succeeded", status="succeeded", stage="done", percent=100.0, result=result, finished_at=time.time())
+    return result
+
+def detection_progress(progress, start, end, **data):
+    """
+    Callback for detect_images that reports detection as `start`..`end`
+    percent of a job and publishes each image's result as a "detection" event
+    """
+    found = 0
+
+    def report(done, total, detection):
+        nonlocal found
+        if detection is not None and detection["found"]:
+            found += 1
+        progress(
+            "detecting patterns", start + (end - start) * done / total, event="detection",
+            images_done=done, images_total=total, patterns_found=found,
+            detection=detection_summary(detection) if detection is not None else None,
+            **data
+        )
+
+    return report
+
+def pair_detection_progress(progress, start, end, on_complete=None):
+    """
+    Callback for detect_image_pairs that reports pair detection as
+    `start`..`end` percent of a job and publishes each pair's result as a
+    "detection" event; `on_complete()` is called after the last pair
+    """
+    found = 0
+
+    def report(done, total, record):
+        nonlocal found
+        if record["found"]:
+            found += 1
+        progress(
+            "detecting patterns", start + (end - start) * done / total, event="detection",
+            pairs_done=done, pairs_total=total, pairs_found=found, pair=pair_summary(record)
+        )
+        if done == total and on_complete is not None:
+            on_complete()
+
+    return report
+
+def submit_job(kind, func, *args, job_id=None):
+    """
+    Queue `func(*args, db=..., progress=...)` and return the new job's state.
+    A client-chosen `job_id` lets the client subscribe to the job's events
+    before the submitting request returns. Raises JobQueueFull if the
+    deployment's pending-job limit is reached, ValueError if `job_id` is taken.
+    """
+    now = time.time()
+    job_id = job_id or str(uuid.uuid4())
+    with _lock:
+        _prune(now)
+        if job_id in _jobs:
+            raise ValueError(f"Job {job_id} already exists")
+        pending = sum(1 for job in _jobs.values() if job["status"] not in FINISHED_STATUSES)
+        if pending >= JOB_MAX_PENDING:
+            raise JobQueueFull(f"{pending} calibration jobs already queued or running")
+
+        _jobs[job_id] = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "stage": "queued",
+            "percent": 0.0,
+            "result": None,
+            "error": None,
+            "status_code": None,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None
+        }
+        _cancel_events[job_id] = threading.Event()
+        _events[job_id] = []
+        _publish(job_id, "queued", kind=kind)
+        _futures[job_id] = _executor.submit(_run, job_id, func, args)
+        return dict(_jobs[job_id])
+
+def get_job(job_id):
+    """Current state of a job, or None if unknown or expired"""
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+def list_jobs():
+    """State of all known jobs, newest first, without their results"""
+    with _lock:
+        jobs = [dict(job, result=None) for job in _jobs.values()]
+    return sorted(jobs, key=lambda job: job["created_at"], reverse=True)
+
+def cancel_job(job_id):
+    """
+    Cancel a queued or running job. Queued jobs never start; running jobs
+    stop at their next progress report. Returns the job state, or None if
+    the job is unknown.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        if job["status"] not in FINISHED_STATUSES:
+            _cancel_events[job_id].set()
+            if _futures[job_id].cancel():
+                job.update(status="cancelled", finished_at=time.time())
+                _publish(job_id, "cancelled", error=None)
+            else:
+                job["stage"] = "cancelling"
+        return dict(job)
+
+def get_events(job_id, after=-1):
+    """
+    Events of a job with a sequence number above `after`, and whether the job
+    has finished (no further events will follow). None if the job is unknown.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        return _events[job_id][after + 1:], job["status"] in FINISHED_STATUSES
+
+async def run_job(kind, func, *args, job_id=None):
+    """
+    Run a job through the queue and wait for its result without blocking the
+    event loop. Errors raised by the job propagate; a full queue is a 429, a
+    taken `job_id` a 409 and a cancelled job a 409.
+    """
+    try:
+        job = submit_job(kind, func, *args, job_id=job_id)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    future = _futures[job["job_id"]]
+    try:
+        return await asyncio.wrap_future(future)
+    except JobCancelled:
+        raise HTTPException(status_code=409, detail="Calibration job was cancelled")
+    except asyncio.CancelledError:
+        if future.cancelled():
+            # Cancelled through cancel_job before it started
+            raise HTTPException(status_code=409, detail="Calibration job was cancelled")
+        # The request itself went away; stop the work as well
+        cancel_job(job["job_id"])
+        raise
@@ -0,0 +1,66 @@
+"""
+Calibration pattern registry.
+
+Dictionaries, boards, object-point grids and marker detectors are built once
+per parameter set and memoized, so detection never rebuilds them per image
+or per live frame. Returned arrays are read-only because they are shared.
+"""
+
+from functools import lru_cache
+import cv2
+import numpy as np
+
+ARUCO_DICTS = {
+    'DICT_4X4_50': cv2.aruco.DICT_4X4_50,
+    'DICT_4X4_100': cv2.aruco.DICT_4X4_100,
+    'DICT_4X4_250': cv2.aruco.DICT_4X4_250,
+    'DICT_4X4_1000': cv2.aruco.DICT_4X4_1000,
+    'DICT_5X5_50': cv2.aruco.DICT_5X5_50,
+    'DICT_5X5_100': cv2.aruco.DICT_5X5_100,
+    'DICT_5X5_250': cv2.aruco.DICT_5X5_250,
+    'DICT_5X5_1000': cv2.aruco.DICT_5X5_1000,
+    'DICT_6X6_50': cv2.aruco.DICT_6X6_50,
+    'DICT_6X6_100': cv2.aruco.DICT_6X6_100,
+    'DICT_6X6_250': cv2.aruco.DICT_6X6_250,
+    'DICT_6X6_1000': cv2.aruco.DICT_6X6_1000,
+    'DICT_7X7_50': cv2.aruco.DICT_7X7_50,
+    'DICT_7X7_100': cv2.aruco.DICT_7X7_100,
+    'DICT_7X7_250': cv2.aruco.DICT_7X7_250,
+    'DICT_7X7_1000': cv2.aruco.DICT_7X7_1000,
+    'DICT_ARUCO_ORIGINAL': cv2.aruco.DICT_ARUCO_ORIGINAL,
+    'DICT_APRILTAG_16h5': cv2.aruco.DICT_APRILTAG_16h5,
+    'DICT_APRILTAG_25h9': cv2.aruco.DICT_APRILTAG_25h9,
+    'DICT_APRILTAG_36h10': cv2.aruco.DICT_APRILTAG_36h10,
+    'DICT_APRILTAG_36h11': cv2.aruco.DICT_APRILTAG_36h11
+}
+
+@lru_cache(maxsize=None)
+def get_aruco_dictionary(aruco_dict_name):
+    """Predefined ArUco dictionary by name (raises KeyError for unknown names)"""
+    return cv2.aruco.getPredefinedDictionary(ARUCO_DICTS[aruco_dict_name])
+
+@lru_cache(maxsize=32)
+def get_aruco_detector(aruco_dict_name):
+    """Marker detector for a dictionary, with default detector parameters"""
+    return cv2.aruco.ArucoDetector(get_aruco_dictionary(aruco_dict_name), cv2.aruco.DetectorParameters())
+
+@lru_cache(maxsize=32)
+def get_charuco_board(columns, rows, square_size, marker_size, aruco_dict_name):
+    """ChArUco board for a set of pattern parameters"""
+    return cv2.aruco.CharucoBoard((columns, rows), square_size, marker_size, get_aruco_dictionary(aruco_dict_name))
+
+@lru_cache(maxsize=32)
+def get_charuco_corners(columns, rows, square_size, marker_size, aruco_dict_name):
+    """3D chessboard corners of a ChArUco board, indexed by ChArUco corner id"""
+    corners = np.asarray(get_charuco_board(columns, rows, square_size, marker_size, aruco_dict_name).getChessboardCorners())
+    corners.setflags(write=False)
+    return corners
+
+@lru_cache(maxsize=32)
+def get_object_points(columns, rows, square_size):
+    """3D corner grid of a checkerboard in the board plane, row by row"""
+    objp = np.zeros((columns * rows, 3), np.float32)
+    objp[:, :2] = np.mgrid[0:columns, 0:rows].T.reshape(-1, 2)
+    objp *= square_size
+    objp.setflags(write=False)
+    return objp
@@ -0,0 +1,140 @@
+"""
+Rendered-preview cache.
+
+Encoded preview JPEGs (thumbnails, detection overlays, undistorted views) are
+stored under a hidden directory inside the session's images directory, so the
+session's `glob('*')` image listings never see them and they are deleted
+together with the session. Entries are keyed by the image's content hash, the
+preview kind, a standard size and the pattern/calibration parameters the
+rendering depends on; they are rendered on first request and afterwards
+served straight from disk.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from functools import lru_cache
+
+from ..config import PREVIEW_SIZES, PREVIEW_CACHE_MAX_BYTES
+
+CACHE_DIRNAME = ".previews"
+
+def standard_size(max_size=None):
+    """
+    The standard preview size a requested `max_size` is rendered at: the
+    smallest of PREVIEW_SIZES that is at least as large, or None (full size)
+    for no limit or a limit above every standard size
+    """
+    if not max_size:
+        return None
+    for size in sorted(PREVIEW_SIZES):
+        if size >= max_size:
+            return size
+    return None
+
+@lru_cache(maxsize=4096)
+def _digest(path, size, mtime_ns):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def file_digest(path):
+    """Content hash of an image file, remembered while the file is unchanged"""
+    stat = os.stat(path)
+    return _digest(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+def make_key(digest, kind, size, params=None):
+    """Cache key for an image hash, preview kind, standard size and rendering parameters"""
+    params_hash = hashlib.sha256(json.dumps(params or {}, sort_keys=True).encode()).hexdigest()[:16]
+    return f"{kind}-{size or 'full'}-{digest[:32]}-{params_hash}"
+
+def cache_dir(images_dir):
+    return os.path.join(images_dir, CACHE_DIRNAME)
+
+def entry_path(images_dir, key):
+    return os.path.join(cache_dir(images_dir), key + ".jpg")
+
+def get(images_dir, key):
+    """Path of a cached preview, or None if it has not been rendered yet"""
+    path = entry_path(images_dir, key)
+    try:
+        os.utime(path)  # Mark as recently used for trim()
+    except OSError:
+        return None
+    return path
+
+def put(images_dir, key, data):
+    """Store encoded preview bytes and return the entry's path"""
+    path = entry_path(images_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write under a temporary name so concurrent readers never see a partial file
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+def cached_preview(images_dir, image_path, kind, max_size, params, render, encode):
+    """
+    Path and key of the cached preview of `image_path`, rendering it first if
+    needed: `render(size)` returns the image at the standard size (None if it
+    cannot be rendered) and `encode(img)` its encoded bytes. Returns
+    (None, key) if the preview cannot be rendered.
+    """
+    size = standard_size(max_size)
+    key = make_key(file_digest(image_path), kind, size, params)
+    path = get(images_dir, key)
+    if path is None:
+        img = render(size)
+        if img is None:
+            return None, key
+        path = put(images_dir, key, encode(img))
+    return path, key
+
+def clear(images_dir):
+    """Remove every cached preview of a session"""
+    shutil.rmtree(cache_dir(images_dir), ignore_errors=True)
+
+def trim(images_dir, max_bytes=PREVIEW_CACHE_MAX_BYTES):
+    """
+    Delete a session's least recently used previews until the cache is below
+    90% of `max_bytes`. Returns the number of entries removed.
+    """
+    directory = cache_dir(images_dir)
+    if not os.path.isdir(directory):
+        return 0
+
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if name.endswith(".tmp"):
+            if time.time() - stat.st_mtime > 3600:
+                # Left behind by an interrupted write
+                os.remove(path)
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return 0
+
+    # Trim to 90% of the limit so we don't evict on every run
+    target = total - int(max_bytes * 0.9)
+    freed = 0
+    removed = 0
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        freed += size
+        removed += 1
+        if freed >= target:
+            break
+    return removed
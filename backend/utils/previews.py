@@ -0,0 +1,61 @@
+"""
+On-demand preview rendering.
+
+Calibration responses link to per-image previews instead of embedding them;
+these helpers render the original, detection-overlay and undistorted views
+of one image at a requested size when such a link is fetched.
+"""
+
+import cv2
+from urllib.parse import quote, urlencode
+
+from .calibration import scale_camera_matrix
+from .detection import detect_pattern, render_detection
+from .image_io import read_color, read_image_size
+from .undistort import undistort_image
+
+PREVIEW_KINDS = ("original", "detection", "undistorted")
+
+def image_url(session_id, image_name, kind, **query):
+    """
+    Link to a rendered preview of a session image (served by the calibration
+    router's /images endpoint), relative to the API root (/api/v1)
+    """
+    query = {key: value for key, value in query.items() if value is not None}
+    url = f"/calibration/images/{quote(session_id)}/{quote(image_name)}/{kind}"
+    return f"{url}?{urlencode(query)}" if query else url
+
+def encode_jpeg(img):
+    """JPEG bytes of an image, as the calibration previews have always been encoded"""
+    _, buffer = cv2.imencode('.jpg', img)
+    return buffer.tobytes()
+
+def render_original(path, max_size=None):
+    """The image itself, at most `max_size` pixels on the longer side"""
+    return read_color(path, max_size)
+
+def render_detection_preview(path, checkerboard_size, square_size, pattern_type, marker_size=None, aruco_dict_name=None, max_size=None):
+    """
+    The image with its detected pattern drawn on it (the detection itself
+    normally comes from the detection cache). None if the image is unreadable.
+    """
+    detection = detect_pattern(path, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name)
+    if detection is None:
+        return None
+    return render_detection(detection, pattern_type, checkerboard_size, max_size)
+
+def render_undistorted(path, mtx, dist, max_size=None):
+    """
+    The image undistorted with a calibration (alpha = 1) and cropped to the
+    valid region, at most `max_size` pixels on the longer side
+    """
+    original_img = read_color(path, max_size)
+    if original_img is None:
+        return None
+
+    h, w = original_img.shape[:2]
+    preview_mtx = scale_camera_matrix(mtx, w / read_image_size(path)[0])
+
+    # Undistort with the cached remap tables for this calibration and size,
+    # cropped to the region of interest
+    return undistort_image(original_img, preview_mtx, dist, alpha=1)
@@ -0,0 +1,85 @@
+"""
+Stereo rectification with cached remap tables.
+
+The undistort-and-rectify maps of both cameras of a stored stereo
+calibration are built once per image size in fixed-point CV_16SC2 form and
+kept in the remap table cache (see undistort.py), so rectifying any further
+pair is just two cv2.remap calls. Downscaled pairs get their own (smaller)
+maps built from the scaled camera and projection matrices instead of being
+rectified at full resolution first.
+"""
+
+import json
+
+import cv2
+import numpy as np
+
+from .calibration import scale_camera_matrix
+from .undistort import rectification_maps
+
+def stereo_parameters(result):
+    """Camera, distortion, rectification and projection matrices of a StereoCalibrationResult"""
+    return {
+        "left_mtx": np.array(json.loads(result.left_camera_matrix)),
+        "left_dist": np.array(json.loads(result.left_distortion_coefficients)),
+        "right_mtx": np.array(json.loads(result.right_camera_matrix)),
+        "right_dist": np.array(json.loads(result.right_distortion_coefficients)),
+        "R1": np.array(json.loads(result.rectification_matrix_left)),
+        "R2": np.array(json.loads(result.rectification_matrix_right)),
+        "P1": np.array(json.loads(result.projection_matrix_left)),
+        "P2": np.array(json.loads(result.projection_matrix_right)),
+        "Q": np.array(json.loads(result.disparity_to_depth_mapping))
+    }
+
+def scale_projection_matrix(P, scale):
+    """Projection matrix for images resized by `scale`, with pixel centres kept aligned like scale_camera_matrix"""
+    P = np.array(P, dtype=np.float64)
+    P[:2] = P[:2] * scale + (0.5 * scale - 0.5) * P[2]
+    return P
+
+def scale_disparity_to_depth(Q, scale):
+    """Disparity-to-depth matrix for pairs rectified at `scale` times the calibrated resolution"""
+    # Map scaled (x, y, disparity) back to calibrated pixels before applying Q
+    offset = 0.5 * scale - 0.5
+    to_calibrated = np.array([
+        [1 / scale, 0, 0, -offset / scale],
+        [0, 1 / scale, 0, -offset / scale],
+        [0, 0, 1 / scale, 0],
+        [0, 0, 0, 1]
+    ])
+    return np.asarray(Q, dtype=np.float64) @ to_calibrated
+
+def pair_maps(params, image_size, scale=1.0):
+    """
+    Cached ((left map1, map2), (right map1, map2)) rectification tables for
+    `image_size` (width, height) images that are `scale` times the
+    calibrated resolution
+    """
+    maps = []
+    for side, R, P in (("left", params["R1"], params["P1"]), ("right", params["R2"], params["P2"])):
+        maps.append(rectification_maps(
+            scale_camera_matrix(params[f"{side}_mtx"], scale), params[f"{side}_dist"],
+            R, scale_projection_matrix(P, scale), image_size
+        ))
+    return maps
+
+def rectify_pair(left_img, right_img, params, scale=1.0):
+    """
+    Rectify a stereo pair with the cached maps for its size. `scale` is the
+    pair's size relative to the resolution the stereo pair was calibrated at.
+    """
+    h, w = left_img.shape[:2]
+    if right_img.shape[:2] != (h, w):
+        raise ValueError("Left and right images must have the same size")
+    (left_map1, left_map2), (right_map1, right_map2) = pair_maps(params, (w, h), scale)
+    return (
+        cv2.remap(left_img, left_map1, left_map2, cv2.INTER_LINEAR),
+        cv2.remap(right_img, right_map1, right_map2, cv2.INTER_LINEAR)
+    )
+
+def draw_epipolar_lines(img, spacing=30, color=(0, 255, 0)):
+    """Draw horizontal lines (the epipolar lines of a rectified pair) every `spacing` pixels"""
+    h, w = img.shape[:2]
+    for y in range(0, h, max(int(spacing), 1)):
+        cv2.line(img, (0, y), (w, y), color, 1)
+    return img
@@ -0,0 +1,139 @@
+"""
+Batched reprojection.
+
+Projects the board points of every view in one vectorized NumPy pass instead
+of one cv2.projectPoints call per view. Points of all views are stacked into
+contiguous (N, 3) / (N, 2) arrays; `offsets[i]:offsets[i + 1]` is the slice
+belonging to view i.
+"""
+
+import numpy as np
+
+def stack_views(points, dims):
+    """
+    Concatenate per-view point arrays into one contiguous float64 (N, dims)
+    array. Returns (stacked points, view offsets of length num_views + 1).
+    """
+    arrays = [np.reshape(p, (-1, dims)) for p in points]
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum([len(a) for a in arrays], out=offsets[1:])
+    if not arrays:
+        return np.empty((0, dims)), offsets
+    return np.concatenate(arrays, dtype=np.float64), offsets
+
+def rodrigues(rvecs):
+    """Rotation matrices (V, 3, 3) for a batch of rotation vectors"""
+    rvecs = np.asarray(rvecs, dtype=np.float64).reshape(-1, 3)
+    theta = np.linalg.norm(rvecs, axis=1)
+    small = theta < 1e-12
+    k = rvecs / np.where(small, 1.0, theta)[:, None]
+    kx, ky, kz = k.T
+    zero = np.zeros_like(kx)
+    K = np.stack([
+        np.stack([zero, -kz, ky], axis=1),
+        np.stack([kz, zero, -kx], axis=1),
+        np.stack([-ky, kx, zero], axis=1)
+    ], axis=1)
+    sin = np.sin(theta)[:, None, None]
+    cos = np.cos(theta)[:, None, None]
+    R = np.eye(3) + sin * K + (1 - cos) * (K @ K)
+    R[small] = np.eye(3)
+    return R
+
+def _to_camera(objpoints, offsets, rvecs, tvecs):
+    """Board points in each view's camera frame, as x/z, y/z"""
+    R = rodrigues(rvecs)
+    t = np.asarray(tvecs, dtype=np.float64).reshape(-1, 3)
+    counts = np.diff(offsets)
+    if len(counts) and (counts == counts[0]).all():
+        # Same board in every view: one batched matrix product
+        cam = (objpoints.reshape(len(counts), counts[0], 3) @ R.transpose(0, 2, 1) + t[:, None, :]).reshape(-1, 3)
+    else:
+        view_of_point = np.repeat(np.arange(len(counts)), counts)
+        cam = np.einsum('nij,nj->ni', R[view_of_point], objpoints) + t[view_of_point]
+    z = cam[:, 2]
+    return cam[:, 0] / z, cam[:, 1] / z
+
+def _distort_standard(x, y, dist):
+    d = np.zeros(14)
+    coeffs = np.asarray(dist, dtype=np.float64).ravel()
+    d[:len(coeffs)] = coeffs
+    k1, k2, p1, p2, k3, k4, k5, k6, s1, s2, s3, s4, tau_x, tau_y = d
+
+    r2 = x * x + y * y
+    radial = 1 + r2 * (k1 + r2 * (k2 + r2 * k3))
+    if k4 or k5 or k6:
+        radial /= 1 + r2 * (k4 + r2 * (k5 + r2 * k6))
+    xy2 = 2 * x * y
+    xd = x * radial + p1 * xy2 + p2 * (r2 + 2 * x * x)
+    yd = y * radial + p1 * (r2 + 2 * y * y) + p2 * xy2
+    if s1 or s2 or s3 or s4:
+        r4 = r2 * r2
+        xd += s1 * r2 + s2 * r4
+        yd += s3 * r2 + s4 * r4
+
+    if tau_x or tau_y:
+        # Tilted sensor model, as in OpenCV's computeTiltProjectionMatrix
+        cx_, sx_ = np.cos(tau_x), np.sin(tau_x)
+        cy_, sy_ = np.cos(tau_y), np.sin(tau_y)
+        rot_x = np.array([[1, 0, 0], [0, cx_, sx_], [0, -sx_, cx_]])
+        rot_y = np.array([[cy_, 0, -sy_], [0, 1, 0], [sy_, 0, cy_]])
+        rot = rot_y @ rot_x
+        proj_z = np.array([[rot[2, 2], 0, -rot[0, 2]], [0, rot[2, 2], -rot[1, 2]], [0, 0, 1]])
+        H = proj_z @ rot
+        w = H[2, 0] * xd + H[2, 1] * yd + H[2, 2]
+        xd, yd = (H[0, 0] * xd + H[0, 1] * yd + H[0, 2]) / w, (H[1, 0] * xd + H[1, 1] * yd + H[1, 2]) / w
+    return xd, yd
+
+def _distort_fisheye(x, y, dist):
+    k1, k2, k3, k4 = np.asarray(dist, dtype=np.float64).ravel()[:4]
+    r = np.sqrt(x * x + y * y)
+    theta = np.arctan(r)
+    theta2 = theta * theta
+    theta_d = theta * (1 + theta2 * (k1 + theta2 * (k2 + theta2 * (k3 + theta2 * k4))))
+    scale = np.where(r > 1e-8, theta_d / np.where(r > 1e-8, r, 1.0), 1.0)
+    return x * scale, y * scale
+
+def project_points(objpoints, offsets, rvecs, tvecs, mtx, dist, camera_model="Standard"):
+    """
+    Project stacked board points (N, 3) of all views into the image.
+    Equivalent to cv2.projectPoints / cv2.fisheye.projectPoints per view.
+    Returns a contiguous float64 (N, 2) array.
+    """
+    x, y = _to_camera(objpoints, offsets, rvecs, tvecs)
+    mtx = np.asarray(mtx, dtype=np.float64)
+    fx, fy, cx, cy = mtx[0, 0], mtx[1, 1], mtx[0, 2], mtx[1, 2]
+
+    # Like cv2.projectPoints and the camera-matrix form of
+    # cv2.fisheye.projectPoints, skew (mtx[0, 1]) is not applied
+    if camera_model == "Fisheye":
+        xd, yd = _distort_fisheye(x, y, dist)
+    else:
+        xd, yd = _distort_standard(x, y, dist)
+
+    projected = np.empty((len(xd), 2))
+    projected[:, 0] = fx * xd + cx
+    projected[:, 1] = fy * yd + cy
+    return projected
+
+def reprojection_residuals(objpoints, imgpoints, rvecs, tvecs, mtx, dist, camera_model="Standard"):
+    """
+    Residuals of all views in one pass.
+
+    Returns (view_rms, residuals, offsets): per-view RMS residual length in
+    pixels (V,), observed minus projected corner positions (N, 2), and the
+    view offsets (V + 1,) into the residual array.
+    """
+    object_stack, offsets = stack_views(objpoints, 3)
+    image_stack, image_offsets = stack_views(imgpoints, 2)
+    if not np.array_equal(offsets, image_offsets):
+        raise ValueError("Object and image points differ in per-view point counts")
+
+    residuals = image_stack - project_points(object_stack, offsets, rvecs, tvecs, mtx, dist, camera_model)
+    counts = np.diff(offsets)
+    squared = np.einsum('ij,ij->i', residuals, residuals)
+    view_rms = np.zeros(len(counts))
+    nonempty = counts > 0
+    if nonempty.any():
+        view_rms[nonempty] = np.sqrt(np.add.reduceat(squared, offsets[:-1][nonempty]) / counts[nonempty])
+    return view_rms, residuals, offsets
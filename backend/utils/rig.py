@@ -0,0 +1,383 @@
+"""
+Multi-camera rig calibration.
+
+Every camera's images are detected once, all cameras in one process pool,
+and images taken at the same moment are grouped into frames (see
+match_image_frames). Each camera is calibrated on its own detections, then:
+
+- the view graph links every two cameras that saw the board in the same
+  frames, weighted by how many frames they share;
+- each graph edge gets a pairwise stereoCalibrate solve with the intrinsics
+  fixed;
+- the extrinsics of every camera relative to the reference camera are
+  chained along the maximum spanning tree of the graph;
+- camera extrinsics and board poses are then refined jointly over every
+  observation with Levenberg-Marquardt, intrinsics held fixed.
+
+Observations, intrinsics and pairwise results are plain data, so a stored
+rig can be re-solved (e.g. with another reference camera) by solve_rig
+without detecting anything again.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .calibration import calibrate_camera
+from .detection import common_pair_points, detect_camera_images, match_image_frames, resolve_workers
+
+def rig_observations(frames, detections):
+    """
+    Per-camera {frame index: observation} dicts of the frames in which each
+    camera found the board. Observations are dicts of obj_points,
+    img_points and charuco_ids (None for checkerboards).
+    """
+    by_path = {
+        detection["path"]: detection
+        for camera_detections in detections for detection in camera_detections if detection["found"]
+    }
+    observations = [{} for _ in detections]
+    for frame_index, frame in enumerate(frames):
+        for camera, path in enumerate(frame):
+            detection = by_path.get(path) if path is not None else None
+            if detection is not None:
+                observations[camera][frame_index] = {
+                    "obj_points": np.asarray(detection["obj_points"], dtype=np.float32).reshape(-1, 3),
+                    "img_points": np.asarray(detection["img_points"], dtype=np.float32).reshape(-1, 2),
+                    "charuco_ids": None if detection["charuco_ids"] is None else np.ravel(detection["charuco_ids"])
+                }
+    return observations
+
+def observations_to_json(observations):
+    """JSON-serializable form of one camera's observations"""
+    return {
+        str(frame): {
+            "obj_points": observation["obj_points"].tolist(),
+            "img_points": observation["img_points"].tolist(),
+            "charuco_ids": None if observation["charuco_ids"] is None else observation["charuco_ids"].tolist()
+        }
+        for frame, observation in observations.items()
+    }
+
+def observations_from_json(data):
+    """One camera's observations back from observations_to_json"""
+    return {
+        int(frame): {
+            "obj_points": np.array(observation["obj_points"], dtype=np.float32).reshape(-1, 3),
+            "img_points": np.array(observation["img_points"], dtype=np.float32).reshape(-1, 2),
+            "charuco_ids": None if observation["charuco_ids"] is None else np.array(observation["charuco_ids"])
+        }
+        for frame, observation in data.items()
+    }
+
+def view_graph(observations, min_shared_frames=3):
+    """
+    Edges {(i, j): [frame indices]} between cameras i < j that share at
+    least `min_shared_frames` frames with at least 4 common board corners
+    """
+    edges = {}
+    for i in range(len(observations)):
+        for j in range(i + 1, len(observations)):
+            shared = [
+                frame for frame in sorted(observations[i].keys() & observations[j].keys())
+                if common_pair_points(observations[i][frame], observations[j][frame]) is not None
+            ]
+            if len(shared) >= min_shared_frames:
+                edges[(i, j)] = shared
+    return edges
+
+def spanning_tree(num_cameras, edges, reference=0):
+    """
+    (parent, child) edges of the maximum spanning tree of the view graph
+    (by shared frames) grown from `reference`, in the order they are added,
+    and the cameras it cannot reach
+    """
+    reached = {reference}
+    tree = []
+    while True:
+        candidates = [
+            (len(frames), -min(i, j), i, j) for (i, j), frames in edges.items()
+            if (i in reached) != (j in reached)
+        ]
+        if not candidates:
+            break
+        _, _, i, j = max(candidates)
+        parent, child = (i, j) if i in reached else (j, i)
+        tree.append((parent, child))
+        reached.add(child)
+    return tree, sorted(set(range(num_cameras)) - reached)
+
+def pair_extrinsics(first, second, frames, first_intrinsics, second_intrinsics):
+    """
+    Pose of camera `second` relative to camera `first` (x_second = R x_first
+    + T) from their shared frames, with both cameras' intrinsics fixed
+    """
+    objpoints, first_points, second_points = [], [], []
+    for frame in frames:
+        obj, a, b = common_pair_points(first[frame], second[frame])
+        objpoints.append(np.asarray(obj, dtype=np.float32).reshape(-1, 3))
+        first_points.append(np.asarray(a, dtype=np.float32).reshape(-1, 1, 2))
+        second_points.append(np.asarray(b, dtype=np.float32).reshape(-1, 1, 2))
+
+    first_mtx, first_dist, image_size = first_intrinsics
+    second_mtx, second_dist, _ = second_intrinsics
+    error, _, _, _, _, R, T, _, _ = cv2.stereoCalibrate(
+        objpoints, first_points, second_points, first_mtx, first_dist, second_mtx, second_dist,
+        tuple(image_size), flags=cv2.CALIB_FIX_INTRINSIC
+    )
+    return {"R": R, "T": T.reshape(3, 1), "error": float(error), "shared_frames": len(frames)}
+
+def chain_extrinsics(tree, pairs, reference=0):
+    """
+    Rotation and translation of every camera reached by the tree relative
+    to `reference` (x_camera = R x_reference + t), composing the pairwise
+    solves from the reference outwards
+    """
+    poses = {reference: (np.eye(3), np.zeros((3, 1)))}
+    for parent, child in tree:
+        if (parent, child) in pairs:
+            R, T = pairs[(parent, child)]["R"], pairs[(parent, child)]["T"]
+        else:
+            # The pair was solved the other way round
+            R_inv, T_inv = pairs[(child, parent)]["R"], pairs[(child, parent)]["T"]
+            R, T = R_inv.T, -R_inv.T @ T_inv
+        R_parent, t_parent = poses[parent]
+        poses[child] = (R @ R_parent, R @ t_parent + T)
+    return poses
+
+def initial_board_poses(observations, intrinsics, poses):
+    """
+    Pose of the board in the reference camera frame for every frame seen by
+    a posed camera, from solvePnP in the camera that saw most of it
+    """
+    board_poses = {}
+    frames = sorted({frame for camera in poses for frame in observations[camera]})
+    for frame in frames:
+        camera = max(
+            (camera for camera in poses if frame in observations[camera]),
+            key=lambda camera: len(observations[camera][frame]["img_points"])
+        )
+        observation = observations[camera][frame]
+        mtx, dist, _ = intrinsics[camera]
+        ok, rvec, tvec = cv2.solvePnP(observation["obj_points"], observation["img_points"], mtx, dist)
+        if not ok:
+            continue
+        R_camera, t_camera = poses[camera]
+        R_board = R_camera.T @ cv2.Rodrigues(rvec)[0]
+        t_board = R_camera.T @ (tvec.reshape(3, 1) - t_camera)
+        board_poses[frame] = (cv2.Rodrigues(R_board)[0].reshape(3), t_board.reshape(3))
+    return board_poses
+
+def _rig_residuals(observations, intrinsics, reference, camera_params, board_params, camera_index, board_index, jacobian):
+    """
+    Stacked residuals of every observation and, with `jacobian`, the normal
+    equations (J^T J, J^T r) over the camera and board pose parameters
+    """
+    num_params = 6 * (len(camera_index) + len(board_index))
+    JtJ = np.zeros((num_params, num_params)) if jacobian else None
+    Jtr = np.zeros(num_params) if jacobian else None
+    residuals = []
+    per_camera = {}
+
+    for camera in [reference] + list(camera_index):
+        mtx, dist, _ = intrinsics[camera]
+        for frame, observation in observations[camera].items():
+            if frame not in board_index:
+                continue
+            rb, tb = board_params[board_index[frame]]
+            if camera == reference:
+                rvec, tvec = rb, tb
+                D_board = np.eye(6)
+                D_camera = None
+            else:
+                rc, tc = camera_params[camera_index[camera]]
+                rvec, tvec, dr3dr1, dr3dt1, dr3dr2, dr3dt2, dt3dr1, dt3dt1, dt3dr2, dt3dt2 = cv2.composeRT(rb, tb, rc, tc)
+                D_board = np.block([[dr3dr1, dr3dt1], [dt3dr1, dt3dt1]])
+                D_camera = np.block([[dr3dr2, dr3dt2], [dt3dr2, dt3dt2]])
+
+            projected, J = cv2.projectPoints(observation["obj_points"], rvec, tvec, mtx, dist)
+            r = (projected.reshape(-1, 2) - observation["img_points"]).ravel()
+            residuals.append(r)
+            per_camera.setdefault(camera, []).append(r)
+            if not jacobian:
+                continue
+
+            J_pose = J[:, :6]
+            blocks = [(6 * (len(camera_index) + board_index[frame]), J_pose @ D_board)]
+            if D_camera is not None:
+                blocks.append((6 * camera_index[camera], J_pose @ D_camera))
+            for a, J_a in blocks:
+                Jtr[a:a + 6] += J_a.T @ r
+                for b, J_b in blocks:
+                    JtJ[a:a + 6, b:b + 6] += J_a.T @ J_b
+
+    residuals = np.concatenate(residuals) if residuals else np.zeros(0)
+    return residuals, per_camera, JtJ, Jtr
+
+def _rms(residuals):
+    # Per-corner RMS, as cv2.calibrateCamera reports it
+    return float(np.sqrt(np.sum(residuals ** 2) / max(len(residuals) // 2, 1)))
+
+def refine_rig(observations, intrinsics, poses, board_poses, reference=0, max_iterations=50, tolerance=1e-9):
+    """
+    Jointly refine the camera extrinsics (all but the reference) and the
+    per-frame board poses by minimizing the reprojection error of every
+    observation with Levenberg-Marquardt. Returns the refined poses, the
+    initial and final RMS errors, the per-camera RMS errors and the number
+    of iterations run.
+    """
+    cameras = [camera for camera in sorted(poses) if camera != reference]
+    camera_index = {camera: i for i, camera in enumerate(cameras)}
+    board_index = {frame: i for i, frame in enumerate(sorted(board_poses))}
+    camera_params = [
+        (cv2.Rodrigues(poses[camera][0])[0].reshape(3), np.asarray(poses[camera][1], dtype=np.float64).reshape(3))
+        for camera in cameras
+    ]
+    board_params = [board_poses[frame] for frame in sorted(board_poses)]
+
+    def evaluate(jacobian):
+        return _rig_residuals(observations, intrinsics, reference, camera_params, board_params, camera_index, board_index, jacobian)
+
+    def apply(delta):
+        new_cameras = [
+            (r + delta[6 * i:6 * i + 3], t + delta[6 * i + 3:6 * i + 6]) for i, (r, t) in enumerate(camera_params)
+        ]
+        offset = 6 * len(camera_params)
+        new_boards = [
+            (r + delta[offset + 6 * i:offset + 6 * i + 3], t + delta[offset + 6 * i + 3:offset + 6 * i + 6])
+            for i, (r, t) in enumerate(board_params)
+        ]
+        return new_cameras, new_boards
+
+    residuals, _, JtJ, Jtr = evaluate(True)
+    initial_error = _rms(residuals)
+    cost = float(residuals @ residuals)
+    damping = 1e-3
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        A = JtJ + damping * np.diag(np.maximum(np.diag(JtJ), 1e-12))
+        try:
+            delta = np.linalg.solve(A, -Jtr)
+        except np.linalg.LinAlgError:
+            break
+
+        previous = camera_params, board_params
+        camera_params, board_params = apply(delta)
+        new_residuals, _, new_JtJ, new_Jtr = evaluate(True)
+        new_cost = float(new_residuals @ new_residuals)
+        if new_cost < cost:
+            converged = cost - new_cost <= tolerance * cost
+            residuals, cost, JtJ, Jtr = new_residuals, new_cost, new_JtJ, new_Jtr
+            damping = max(damping / 10, 1e-12)
+            if converged:
+                break
+        else:
+            camera_params, board_params = previous
+            damping *= 10
+            if damping > 1e12:
+                break
+
+    _, per_camera, _, _ = evaluate(False)
+    refined = {reference: (np.eye(3), np.zeros((3, 1)))}
+    for camera, (r, t) in zip(cameras, camera_params):
+        refined[camera] = (cv2.Rodrigues(r)[0], t.reshape(3, 1))
+    camera_errors = {camera: _rms(np.concatenate(r)) for camera, r in per_camera.items()}
+    return refined, initial_error, _rms(residuals), camera_errors, iterations
+
+def solve_rig(observations, intrinsics, reference=0, min_shared_frames=3, workers=None):
+    """
+    Solve the extrinsics of a rig from per-camera observations and
+    (camera matrix, distortion, image size) intrinsics: view graph,
+    pairwise solves (`workers` threads), spanning-tree chaining and joint
+    refinement. Raises ValueError if some camera is not connected to the
+    reference camera through shared frames.
+    """
+    edges = view_graph(observations, min_shared_frames)
+    tree, unreachable = spanning_tree(len(observations), edges, reference)
+    if unreachable:
+        raise ValueError(
+            f"Cameras {unreachable} share fewer than {min_shared_frames} board views with the rest of the rig"
+        )
+
+    def solve_pair(edge):
+        i, j = edge
+        return edge, pair_extrinsics(observations[i], observations[j], edges[edge], intrinsics[i], intrinsics[j])
+
+    with ThreadPoolExecutor(max_workers=resolve_workers(workers, len(edges)), thread_name_prefix="rig-pair") as executor:
+        pairs = dict(executor.map(solve_pair, sorted(edges)))
+
+    poses = chain_extrinsics(tree, pairs, reference)
+    board_poses = initial_board_poses(observations, intrinsics, poses)
+    refined, initial_error, error, camera_errors, iterations = refine_rig(
+        observations, intrinsics, poses, board_poses, reference
+    )
+    print(f"Refined rig of {len(observations)} cameras over {len(board_poses)} frames in {iterations} iterations: "
+          f"{initial_error:.4f} -> {error:.4f} px RMS")
+
+    tree_edges = {tuple(sorted(edge)) for edge in tree}
+    return {
+        "reference": reference,
+        "tree": tree,
+        "poses": refined,
+        "pairs": {edge: dict(pair, in_tree=edge in tree_edges) for edge, pair in pairs.items()},
+        "camera_errors": camera_errors,
+        "initial_error": initial_error,
+        "error": error,
+        "iterations": iterations,
+        "num_frames": len(board_poses)
+    }
+
+def calibrate_rig(images_paths, checkerboard_size, square_size, pattern_type, marker_size=None, aruco_dict_name=None,
+                  optimize=False, workers=None, pair_by="index", pair_pattern=None, reference=0, min_shared_frames=3,
+                  progress=None, on_stage=None):
+    """
+    Calibrate a rig of cameras, one image directory per camera.
+
+    Images of all cameras are detected once in a single pool within the
+    `workers` budget (`progress` is passed on to detect_camera_images),
+    grouped into frames by `pair_by`/`pair_pattern` (see
+    match_image_frames), every camera is calibrated on its own detections,
+    concurrently, and the extrinsics are solved with solve_rig.
+    `on_stage(name)` is called as each later stage starts. Returns the
+    solve_rig result plus per-camera intrinsics, observations and frames.
+    """
+    detections = detect_camera_images(
+        images_paths, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name,
+        workers=workers, progress=progress
+    )
+    frames = match_image_frames([[d["path"] for d in camera] for camera in detections], pair_by, pair_pattern)
+
+    if on_stage is not None:
+        on_stage("calibrating cameras")
+
+    def calibrate(camera):
+        return calibrate_camera(
+            images_paths[camera], checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name,
+            "Standard", optimize, workers=1, detections=detections[camera]
+        )
+
+    with ThreadPoolExecutor(max_workers=resolve_workers(workers, len(images_paths)), thread_name_prefix="rig-camera") as executor:
+        mono = list(executor.map(calibrate, range(len(images_paths))))
+
+    failed = [camera for camera, result in enumerate(mono) if result[0] is None]
+    if failed:
+        raise ValueError(f"Cameras {failed} could not be calibrated - ensure each sees the calibration pattern")
+
+    intrinsics = []
+    for camera_detections, result in zip(detections, mono):
+        image_size = next(tuple(int(v) for v in d["image_size"]) for d in camera_detections if d["found"])
+        intrinsics.append((result[0], result[1], image_size))
+
+    if on_stage is not None:
+        on_stage("solving rig")
+    observations = rig_observations(frames, detections)
+    rig = solve_rig(observations, intrinsics, reference, min_shared_frames, workers)
+    rig.update({
+        "intrinsics": intrinsics,
+        "mono_errors": [float(result[2]) for result in mono],
+        "observations": observations,
+        "frames": [[None if path is None else os.path.basename(path) for path in frame] for frame in frames]
+    })
+    return rig
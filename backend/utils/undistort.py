@@ -0,0 +1,119 @@
+"""
+Undistortion with cached remap tables.
+
+cv2.undistort rebuilds the full per-pixel undistortion map on every call.
+Here the map for a calibration, image size and alpha is built once with
+initUndistortRectifyMap in fixed-point CV_16SC2 form (the same form
+cv2.undistort uses internally, so output is identical) and every image of
+that size is then undistorted with a single cv2.remap. Maps are kept in a
+per-process LRU bounded by UNDISTORT_MAP_CACHE_MAX_BYTES; stereo
+rectification maps share the same cache.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from ..config import UNDISTORT_MAP_CACHE_MAX_BYTES
+
+_lock = threading.Lock()
+_maps = OrderedDict()  # key -> (map1, map2[, new camera matrix, roi])
+_maps_bytes = 0
+
+def calibration_id(mtx, dist, camera_model="Standard", *extra):
+    """Identify a calibration by its model and parameter values (plus any extra arrays)"""
+    digest = hashlib.sha256(camera_model.encode())
+    for values in (mtx, dist) + extra:
+        digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return digest.hexdigest()[:32]
+
+def _build_maps(mtx, dist, image_size, alpha, camera_model):
+    mtx = np.asarray(mtx, dtype=np.float64)
+    dist = np.asarray(dist, dtype=np.float64)
+    if camera_model == "Fisheye":
+        dist = dist.reshape(-1)[:4]
+        new_mtx = cv2.fisheye.estimateNewCameraMatrixForUndistortRectify(
+            mtx, dist, image_size, np.eye(3), balance=alpha
+        )
+        map1, map2 = cv2.fisheye.initUndistortRectifyMap(
+            mtx, dist, np.eye(3), new_mtx, image_size, cv2.CV_16SC2
+        )
+        roi = (0, 0, image_size[0], image_size[1])
+    else:
+        new_mtx, roi = cv2.getOptimalNewCameraMatrix(mtx, dist, image_size, alpha, image_size)
+        map1, map2 = cv2.initUndistortRectifyMap(mtx, dist, None, new_mtx, image_size, cv2.CV_16SC2)
+    return map1, map2, new_mtx, tuple(int(v) for v in roi)
+
+def _cached_maps(key, build):
+    """Look up remap tables by key, building and caching them on a miss"""
+    global _maps_bytes
+    with _lock:
+        entry = _maps.get(key)
+        if entry is not None:
+            _maps.move_to_end(key)
+            return entry
+
+    # Build outside the lock; a concurrent build of the same key is harmless
+    entry = build()
+    size = entry[0].nbytes + entry[1].nbytes
+
+    with _lock:
+        if key not in _maps:
+            _maps[key] = entry
+            _maps_bytes += size
+            while _maps_bytes > UNDISTORT_MAP_CACHE_MAX_BYTES and len(_maps) > 1:
+                _, old_entry = _maps.popitem(last=False)
+                _maps_bytes -= old_entry[0].nbytes + old_entry[1].nbytes
+        return _maps[key]
+
+def undistortion_maps(mtx, dist, image_size, alpha=1.0, camera_model="Standard"):
+    """
+    Fixed-point remap tables for undistorting `image_size` (width, height)
+    images: (map1, map2, new camera matrix, valid ROI). The new camera matrix
+    comes from getOptimalNewCameraMatrix with `alpha` (the fisheye balance
+    for the Fisheye model). Cached by (calibration id, image size, alpha).
+    """
+    image_size = (int(image_size[0]), int(image_size[1]))
+    key = (calibration_id(mtx, dist, camera_model), image_size, float(alpha))
+    return _cached_maps(key, lambda: _build_maps(mtx, dist, image_size, alpha, camera_model))
+
+def rectification_maps(mtx, dist, R, P, image_size):
+    """
+    Fixed-point remap tables (map1, map2) that undistort and rectify one
+    camera of a stereo pair for `image_size` (width, height) images, from its
+    stereoRectify rotation R and projection P. Cached like undistortion_maps.
+    """
+    image_size = (int(image_size[0]), int(image_size[1]))
+    key = (calibration_id(mtx, dist, "Standard", R, P), image_size, "rectify")
+
+    def build():
+        return cv2.initUndistortRectifyMap(
+            np.asarray(mtx, dtype=np.float64), np.asarray(dist, dtype=np.float64),
+            np.asarray(R, dtype=np.float64), np.asarray(P, dtype=np.float64), image_size, cv2.CV_16SC2
+        )
+
+    return _cached_maps(key, build)
+
+def undistort_image(img, mtx, dist, alpha=1.0, camera_model="Standard", crop=True, interpolation=cv2.INTER_LINEAR):
+    """
+    Undistort an image with the cached maps for its size, optionally
+    cropped to the valid region. `mtx` must match the image's resolution.
+    """
+    h, w = img.shape[:2]
+    map1, map2, _, roi = undistortion_maps(mtx, dist, (w, h), alpha, camera_model)
+    undistorted = cv2.remap(img, map1, map2, interpolation)
+
+    x, y, w_roi, h_roi = roi
+    if crop and h_roi > 0 and w_roi > 0:
+        return undistorted[y:y+h_roi, x:x+w_roi]
+    return undistorted
+
+def clear():
+    """Drop every cached map"""
+    global _maps_bytes
+    with _lock:
+        _maps.clear()
+        _maps_bytes = 0
@@ -0,0 +1,97 @@
+"""
+View subset selection.
+
+Picks the calibration views that add the most information, using only the
+detected corners: image-plane coverage on a coarse grid (as the quality
+advisor measures it) and spread of board poses. Sessions with many
+near-identical frames can then be solved on a small subset, with the
+remaining views held out for validation.
+"""
+
+import cv2
+import numpy as np
+
+# Fewest views a selection may solve on
+MIN_SELECTED_VIEWS = 3
+
+def view_descriptors(objpoints, imgpoints, image_size):
+    """
+    Pose descriptor per view from the board-to-image homography: board
+    centre position, apparent size, in-plane rotation and the two
+    perspective (tilt) terms, standardized across views.
+    """
+    w, h = image_size
+    descriptors = []
+    for obj, img in zip(objpoints, imgpoints):
+        obj = np.asarray(obj, dtype=np.float64).reshape(-1, 3)[:, :2]
+        img = np.asarray(img, dtype=np.float64).reshape(-1, 2) / (w, h)
+        extent = np.ptp(obj, axis=0).max() or 1.0
+        board = (obj - obj.min(axis=0)) / extent
+
+        H = None
+        if len(board) >= 4:
+            H, _ = cv2.findHomography(board, img)
+        if H is None:
+            H = np.eye(3)
+        H = H / H[2, 2]
+
+        centre = img.mean(axis=0)
+        size = np.sqrt(np.abs(np.linalg.det(H[:2, :2])))
+        rotation = np.arctan2(H[1, 0], H[0, 0])
+        descriptors.append([centre[0], centre[1], size, np.cos(rotation), np.sin(rotation), H[2, 0], H[2, 1]])
+
+    descriptors = np.array(descriptors)
+    std = descriptors.std(axis=0)
+    std[std == 0] = 1.0
+    return (descriptors - descriptors.mean(axis=0)) / std
+
+def coverage_cells(imgpoints, image_size, grid_size=8):
+    """(views, grid_size * grid_size) boolean matrix of grid cells each view has corners in"""
+    w, h = image_size
+    cells = np.zeros((len(imgpoints), grid_size * grid_size), dtype=bool)
+    for i, img in enumerate(imgpoints):
+        img = np.asarray(img, dtype=np.float64).reshape(-1, 2)
+        col = np.clip((img[:, 0] * grid_size / w).astype(int), 0, grid_size - 1)
+        row = np.clip((img[:, 1] * grid_size / h).astype(int), 0, grid_size - 1)
+        cells[i, row * grid_size + col] = True
+    return cells
+
+def select_views(objpoints, imgpoints, image_size, max_views, grid_size=8, pose_weight=1.0):
+    """
+    Greedily pick up to `max_views` views. Each step takes the view with the
+    largest gain in covered grid cells (as a fraction of the grid) plus
+    `pose_weight` times its pose-descriptor distance to the closest view
+    already picked (relative to the largest such distance). At least
+    MIN_SELECTED_VIEWS are picked. Returns the selected view indices in
+    ascending order.
+    """
+    num_views = len(objpoints)
+    if max_views is None:
+        return list(range(num_views))
+    max_views = max(max_views, MIN_SELECTED_VIEWS)
+    if num_views <= max_views:
+        return list(range(num_views))
+
+    cells = coverage_cells(imgpoints, image_size, grid_size)
+    descriptors = view_descriptors(objpoints, imgpoints, image_size)
+
+    # Start from the view covering the most cells
+    first = int(cells.sum(axis=1).argmax())
+    selected = [first]
+    available = np.ones(num_views, dtype=bool)
+    available[first] = False
+    covered = cells[first].copy()
+    nearest = np.linalg.norm(descriptors - descriptors[first], axis=1)
+
+    while len(selected) < max_views:
+        gain = (cells & ~covered).sum(axis=1) / cells.shape[1]
+        spread = nearest / (nearest[available].max() or 1.0)
+        score = np.where(available, gain + pose_weight * spread, -np.inf)
+        best = int(score.argmax())
+
+        selected.append(best)
+        available[best] = False
+        covered |= cells[best]
+        np.minimum(nearest, np.linalg.norm(descriptors - descriptors[best], axis=1), out=nearest)
+
+    return sorted(selected)
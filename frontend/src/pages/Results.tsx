@@ -10,19 +10,23 @@ import { Button } from '@/components/ui/button';
 import { Camera, ArrowRight, Upload, ImagePlus, Dices, Download } from 'lucide-react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 
+const API_URL = import.meta.env.VITE_API_URL || (
+  import.meta.env.DEV ? 'http://127.0.0.1:8000/api/v1' : '/api/v1'
+);
+
 interface PerImageResult {
   image_index: number;
   image_name: string;
   reprojection_error: number;
-  detection_image: string;
+  detection_image_url: string;
   used_in_calibration: boolean;
 }
 
 interface UndistortedPreview {
   image_index: number;
   image_name: string;
-  original_image: string;
-  undistorted_image: string;
+  original_image_url: string;
+  undistorted_image_url: string;
 }
 
 interface CalibrationResults {
@@ -349,7 +353,7 @@ const Results = () => {
                   <div key={result.image_index} className="border border-stone-200 dark:border-stone-700 rounded-lg overflow-hidden">
                     <div className="aspect-video bg-stone-100 dark:bg-stone-800">
                       <img
-                        src={`data:image/jpeg;base64,${result.detection_image}`}
+                        src={`${API_URL}${result.detection_image_url}`}
                         alt={result.image_name}
                         className="w-full h-full object-contain"
                       />
@@ -406,7 +410,7 @@ const Results = () => {
                           </div>
                           <div className="border border-stone-300 dark:border-stone-600 rounded overflow-hidden bg-stone-50 dark:bg-stone-900">
                             <img
-                              src={`data:image/jpeg;base64,${preview.original_image}`}
+                              src={`${API_URL}${preview.original_image_url}`}
                               alt={`Original ${preview.image_name}`}
                               className="w-full h-auto"
                             />
@@ -419,7 +423,7 @@ const Results = () => {
                           </div>
                           <div className="border border-green-500 dark:border-green-600 rounded overflow-hidden bg-stone-50 dark:bg-stone-900">
                             <img
-                              src={`data:image/jpeg;base64,${preview.undistorted_image}`}
+                              src={`${API_URL}${preview.undistorted_image_url}`}
                               alt={`Undistorted ${preview.image_name}`}
                               className="w-full h-auto"
                             />
@@ -36,6 +36,11 @@ def show():
         st.success("Calibration reset successfully!")
     
     if calibration_type == "Single Camera":
+        st.info(
+            "To undistort many images, a zip archive or a video at once, use "
+            "`python -m backend.undistort --calibration calibration_data.json INPUT --output OUT` "
+            "or POST them to `/api/v1/undistort/{session_id}`."
+        )
         if camera_model == "Standard":
             st.markdown("""
             ### Python Example for Single Camera with Standard Model
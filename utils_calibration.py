@@ -5,23 +5,12 @@ import os
 import glob
 import streamlit as st
 from streamlit import session_state as state
+from backend.utils.patterns import get_aruco_detector, get_charuco_board, get_object_points
 
 def calibrate_camera(images_path, checkerboard_size, square_size, pattern_type, marker_size, aruco_dict_name, camera_model="Standard", optimize=False):
     criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
 
-    print(checkerboard_size)
-    # Correct: Create an array with the proper number of checkerboard corners
-    objp = np.zeros(((checkerboard_size[0]) * (checkerboard_size[1]), 3), np.float32)
-    print(objp.shape)
-    # This line now correctly fills the array
-    objp[:, :2] = np.mgrid[0:checkerboard_size[0], 0:checkerboard_size[1]].T.reshape(-1, 2)
-    print(objp.shape)
-    objp *= square_size
-
-    if pattern_type == 'ChArUcoboard':
-        objp = np.zeros((checkerboard_size[0] * checkerboard_size[1], 3), np.float32)
-        objp[:, :2] = np.mgrid[0:checkerboard_size[0], 0:checkerboard_size[1]].T.reshape(-1, 2)
-        objp *= square_size
+    objp = get_object_points(checkerboard_size[0], checkerboard_size[1], square_size)
     
     objpoints = []
     imgpoints = []
@@ -32,34 +21,8 @@ def calibrate_camera(images_path, checkerboard_size, square_size, pattern_type,
     if not images:
         return None, None, None, None, None, None, None, None, images_with_detections
     
-    aruco_dicts = {
-        'DICT_4X4_50': cv2.aruco.DICT_4X4_50,
-        'DICT_4X4_100': cv2.aruco.DICT_4X4_100,
-        'DICT_4X4_250': cv2.aruco.DICT_4X4_250,
-        'DICT_4X4_1000': cv2.aruco.DICT_4X4_1000,
-        'DICT_5X5_50': cv2.aruco.DICT_5X5_50,
-        'DICT_5X5_100': cv2.aruco.DICT_5X5_100,
-        'DICT_5X5_250': cv2.aruco.DICT_5X5_250,
-        'DICT_5X5_1000': cv2.aruco.DICT_5X5_1000,
-        'DICT_6X6_50': cv2.aruco.DICT_6X6_50,
-        'DICT_6X6_100': cv2.aruco.DICT_6X6_100,
-        'DICT_6X6_250': cv2.aruco.DICT_6X6_250,
-        'DICT_6X6_1000': cv2.aruco.DICT_6X6_1000,
-        'DICT_7X7_50': cv2.aruco.DICT_7X7_50,
-        'DICT_7X7_100': cv2.aruco.DICT_7X7_100,
-        'DICT_7X7_250': cv2.aruco.DICT_7X7_250,
-        'DICT_7X7_1000': cv2.aruco.DICT_7X7_1000,
-        'DICT_ARUCO_ORIGINAL': cv2.aruco.DICT_ARUCO_ORIGINAL,
-        'DICT_APRILTAG_16h5': cv2.aruco.DICT_APRILTAG_16h5,
-        'DICT_APRILTAG_25h9': cv2.aruco.DICT_APRILTAG_25h9,
-        'DICT_APRILTAG_36h10': cv2.aruco.DICT_APRILTAG_36h10,
-        'DICT_APRILTAG_36h11': cv2.aruco.DICT_APRILTAG_36h11
-    }
-    
-
     if pattern_type == 'ChArUcoboard':
-        aruco_dict = cv2.aruco.getPredefinedDictionary(aruco_dicts[aruco_dict_name])
-        board = cv2.aruco.CharucoBoard((checkerboard_size[0], checkerboard_size[1]), square_size, marker_size, aruco_dict)
+        board = get_charuco_board(checkerboard_size[0], checkerboard_size[1], square_size, marker_size, aruco_dict_name)
     
     for fname in images:
         img = cv2.imread(fname)
@@ -82,7 +45,7 @@ def calibrate_camera(images_path, checkerboard_size, square_size, pattern_type,
                 frame_obj_points = objp
                 img_with_detections = cv2.drawChessboardCorners(img, checkerboard_size, corners, found)
         elif pattern_type == 'ChArUcoboard':
-            corners, ids, _ = cv2.aruco.detectMarkers(gray, aruco_dict)
+            corners, ids, _ = get_aruco_detector(aruco_dict_name).detectMarkers(gray)
             if ids is not None and len(corners) > 0:
                 _, charuco_corners, charuco_ids = cv2.aruco.interpolateCornersCharuco(corners, ids, gray, board)
                 if charuco_corners is not None and charuco_ids is not None and len(charuco_corners) > 3: